@@ -1,52 +1,136 @@
+from django import forms
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Post, PostImage, Comment, Like
+from django.forms.models import BaseInlineFormSet
+from .models import Post, PostImage, Comment, Like, Task
+from .pagination import EstimatedCountPaginator
 
 
 class PostImageInline(admin.TabularInline):
     """Инлайн для отображения изображений поста в админке."""
     model = PostImage
-    extra = 10
+    extra = 1
+    fields = ('image', 'width', 'height', 'format', 'file_size')
+    readonly_fields = ('width', 'height', 'format', 'file_size')
+
+
+class RecentPostsFormSet(BaseInlineFormSet):
+    """
+    Формсет постов пользователя, ограниченный последними recent_limit.
+
+    Ограничение применяется после фильтра по автору, который
+    формсет добавляет к queryset инлайна.
+    """
+    recent_limit = 20
+
+    def get_queryset(self):
+        """Возвращает последние посты автора."""
+        if not hasattr(self, '_recent_queryset'):
+            self._recent_queryset = super().get_queryset().order_by(
+                '-created_at', '-pk'
+            )[:self.recent_limit]
+        return self._recent_queryset
 
 
 class PostInline(admin.TabularInline):
-    """Инлайн для отображения постов пользователя в админке."""
+    """
+    Инлайн для отображения последних постов пользователя в админке.
+
+    Показываются только последние RecentPostsFormSet.recent_limit
+    постов, остальные доступны в списке постов с фильтром по автору.
+    """
     model = Post
+    formset = RecentPostsFormSet
     extra = 0
     fields = ('text', 'created_at')
     readonly_fields = ('created_at',)
-    inlines = [PostImageInline]
+    show_change_link = True
+
+
+class PostAdminForm(forms.ModelForm):
+    """
+    Форма поста с версией, которую видел сотрудник.
+
+    Если пост успели изменить (например, через API), сохранение
+    отклоняется, как запрос с устаревшим If-Match.
+    """
+    expected_version = forms.IntegerField(
+        widget=forms.HiddenInput, required=False
+    )
+
+    class Meta:
+        model = Post
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['expected_version'].initial = self.instance.version
+
+    def clean(self):
+        """Проверяет, что пост не изменился после открытия формы."""
+        cleaned_data = super().clean()
+        version = cleaned_data.get('expected_version')
+        if self.instance.pk and version != self.instance.version:
+            raise forms.ValidationError(
+                'Пост был изменен после открытия формы. '
+                'Обновите страницу и повторите.'
+            )
+        return cleaned_data
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    """Административный интерфейс для модели Post."""
+    """
+    Административный интерфейс для модели Post.
 
-    list_display = ('id', 'author', 'text', 'likes_count', 'created_at')
+    Изменение текста проходит через Post.edit(): с проверкой версии
+    и записью прежнего текста в историю. Число лайков и комментариев
+    берется из счетчиков поста, без подсчета строк на каждой странице.
+    """
+
+    list_display = (
+        'id', 'author', 'text', 'likes', 'comments', 'created_at'
+    )
     list_display_links = ('id', 'text')
+    list_select_related = ('author',)
     list_filter = ('author', 'created_at')
     search_fields = ('text', 'author__username')
     autocomplete_fields = ['author']
-    readonly_fields = ('created_at', 'likes_count')
+    readonly_fields = ('created_at', 'likes_count', 'comments_count')
     inlines = [PostImageInline]
+    form = PostAdminForm
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {
-            'fields': ('author', 'text')
+            'fields': ('author', 'text', 'expected_version')
         }),
         ('Дополнительно', {
-            'fields': ('created_at', 'likes_count'),
+            'fields': ('created_at', 'likes_count', 'comments_count'),
             'classes': ('collapse',)
         }),
     )
 
-    def likes_count(self, obj):
+    def likes(self, obj):
         """Возвращает количество лайков у поста."""
-        return obj.likes.count()
+        return obj.likes_count
+
+    likes.short_description = 'Лайки'
+    likes.admin_order_field = 'likes_count'
 
-    likes_count.short_description = 'Лайки'
-    likes_count.admin_order_field = 'likes__count'
+    def comments(self, obj):
+        """Возвращает количество комментариев к посту."""
+        return obj.comments_count
+
+    comments.short_description = 'Комментарии'
+    comments.admin_order_field = 'comments_count'
+
+    def save_model(self, request, obj, form, change):
+        """Сохраняет пост, указывая сотрудника автором правки."""
+        obj.save(editor=request.user)
 
 
 @admin.register(Comment)
@@ -54,9 +138,24 @@ class CommentAdmin(admin.ModelAdmin):
     """Административный интерфейс для модели Comment."""
 
     list_display = ('id', 'post', 'author', 'text', 'created_at')
+    list_select_related = ('post', 'author')
     list_filter = ('author', 'created_at')
     search_fields = ('text', 'author__username')
     raw_id_fields = ('post', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def delete_model(self, request, obj):
+        """Удаляет комментарий мягко, как API."""
+        obj.soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        """
+        Удаляет комментарии по одному: удаление queryset не меняет
+        счетчики постов.
+        """
+        for comment in queryset:
+            comment.soft_delete()
 
 
 @admin.register(Like)
@@ -64,22 +163,52 @@ class LikeAdmin(admin.ModelAdmin):
     """Административный интерфейс для модели Like."""
 
     list_display = ('id', 'post', 'user')
+    list_select_related = ('post', 'user')
     list_filter = ('user',)
     raw_id_fields = ('post', 'user')
-    date_hierarchy = 'post__created_at'
+    date_hierarchy = 'post_created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def delete_queryset(self, request, queryset):
+        """
+        Удаляет лайки по одному: удаление queryset не меняет
+        счетчики постов.
+        """
+        for like in queryset:
+            like.delete()
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Административный интерфейс для очереди фоновых задач."""
+
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'locked_until', 'last_error')
 
 
 class UserAdmin(BaseUserAdmin):
-    """Расширенный административный интерфейс для модели User."""
+    """
+    Расширенный административный интерфейс для модели User.
+
+    Количество постов берется из UserStats, загруженных вместе
+    с пользователями.
+    """
 
     list_display = ('username', 'email', 'date_joined', 'post_count')
+    list_select_related = ('stats',)
     inlines = [PostInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def post_count(self, obj):
         """Возвращает количество постов пользователя."""
-        return obj.posts.count()
+        stats = getattr(obj, 'stats', None)
+        return stats.posts_count if stats is not None else 0
 
     post_count.short_description = 'Количество постов'
+    post_count.admin_order_field = 'stats__posts_count'
 
 
 # Перерегистрируем стандартную модель User с нашим кастомным админ-классом
@@ -0,0 +1,228 @@
+"""
+Кеширование данных популярных постов с объединением промахов.
+
+Когда запись кеша популярного поста устаревает, сотни одновременных
+запросов не должны пересчитывать одни и те же данные в базе.
+``coalesced`` пересчитывает значение в одном запросе на ключ:
+
+* внутри процесса потоки ждут на локальной блокировке, а затем берут
+  значение, уже положенное в кеш первым потоком;
+* между процессами блокировкой служит ``cache.add`` ключа ``<key>:lock``:
+  процессы, не получившие ее, отдают устаревшее значение или недолго
+  ждут, пока владелец блокировки не запишет новое;
+* запись обновляется заранее с вероятностью, растущей к концу срока
+  жизни (алгоритм XFetch): чем дольше вычисление, тем раньше начинается
+  обновление, поэтому одновременного истечения под нагрузкой не бывает.
+
+Ключи данных поста включают его поколение (``post_key``); любое
+изменение поста, его изображений или комментариев увеличивает поколение
+(``invalidate_post``), и старые записи больше не читаются. Лайки
+поколение не меняют: число лайков обновляется не реже раза
+в POST_CACHE_TIMEOUT секунд.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+GENERATION_PREFIX = 'post-gen:'
+
+# Поток ждет владельца распределенной блокировки, проверяя кеш
+# с таким интервалом
+POLL_INTERVAL = 0.05
+
+# Локальные блокировки по хешу ключа: их число не растет с числом
+# ключей, а совпадение ключей в одной блокировке лишь ненадолго
+# задерживает промах по второму ключу
+_LOCAL_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+def _cache():
+    """Возвращает кеш данных постов (POST_CACHE)."""
+    return caches[settings.POST_CACHE]
+
+
+def _read(cache, key):
+    """
+    Читает запись кеша.
+
+    Returns:
+        tuple | None: (значение, длительность вычисления, срок жизни)
+        или None, если записи нет или кеш недоступен
+    """
+    try:
+        return cache.get(key)
+    except Exception:
+        return None
+
+
+def _needs_refresh(entry):
+    """
+    Решает, пора ли обновить запись (XFetch).
+
+    Чем ближе срок жизни и чем дольше вычислялось значение, тем выше
+    вероятность обновления.
+    """
+    _, delta, expiry = entry
+    gap = -math.log(1 - random.random())
+    return time.time() + delta * settings.POST_CACHE_BETA * gap >= expiry
+
+
+def _compute(cache, key, compute, timeout):
+    """Вычисляет значение и записывает его в кеш."""
+    started = time.perf_counter()
+    value = compute()
+    delta = time.perf_counter() - started
+    try:
+        # Запись живет дольше срока: устаревшее значение отдается,
+        # пока другой процесс вычисляет новое
+        cache.set(
+            key, (value, delta, time.time() + timeout),
+            timeout + settings.POST_CACHE_LOCK_TIMEOUT
+        )
+    except Exception:
+        pass
+    return value
+
+
+def _refresh(cache, key, compute, timeout, stale):
+    """
+    Вычисляет значение под распределенной блокировкой.
+
+    Процесс, не получивший блокировку, возвращает устаревшее значение,
+    а если его нет — ждет новое не дольше POST_CACHE_LOCK_TIMEOUT
+    секунд и затем вычисляет его сам.
+    """
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.POST_CACHE_LOCK_TIMEOUT
+    token = uuid.uuid4().hex
+    try:
+        locked = cache.add(lock_key, token, lock_timeout)
+    except Exception:
+        return compute()
+
+    if locked:
+        try:
+            return _compute(cache, key, compute, timeout)
+        finally:
+            try:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+            except Exception:
+                pass
+
+    if stale is not None:
+        return stale[0]
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = _read(cache, key)
+        if entry is not None:
+            return entry[0]
+    return _compute(cache, key, compute, timeout)
+
+
+def coalesced(key, compute, timeout=None):
+    """
+    Возвращает значение из кеша, вычисляя его не более одного раза
+    одновременно на ключ.
+
+    Args:
+        key: Ключ кеша; None, если кеш отключен (см. post_key)
+        compute: Функция без аргументов, вычисляющая значение
+        timeout: Срок жизни значения в секундах; по умолчанию
+            POST_CACHE_TIMEOUT. При 0 кеш не используется
+
+    Returns:
+        Значение из кеша или результат compute()
+    """
+    if timeout is None:
+        timeout = settings.POST_CACHE_TIMEOUT
+    if timeout <= 0:
+        return compute()
+    cache = _cache()
+    entry = _read(cache, key)
+    if entry is not None and not _needs_refresh(entry):
+        return entry[0]
+
+    lock = _LOCAL_LOCKS[hash(key) % len(_LOCAL_LOCKS)]
+    if entry is not None:
+        # Значение еще годится: обновляет один поток, остальные
+        # отдают текущее, не дожидаясь
+        acquired = lock.acquire(blocking=False)
+        if not acquired:
+            return entry[0]
+    else:
+        acquired = lock.acquire(timeout=settings.POST_CACHE_LOCK_TIMEOUT)
+    try:
+        if acquired and entry is None:
+            # Пока поток ждал, значение мог вычислить другой поток
+            entry = _read(cache, key)
+            if entry is not None:
+                return entry[0]
+        return _refresh(cache, key, compute, timeout, entry)
+    finally:
+        if acquired:
+            lock.release()
+
+
+def _generation(cache, post_id):
+    """
+    Возвращает текущее поколение данных поста.
+
+    Начальное значение берется из времени: если запись поколения
+    вытеснена из кеша, новое поколение не совпадет ни с одним прежним.
+    """
+    key = f'{GENERATION_PREFIX}{post_id}'
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def post_key(post_id, *parts):
+    """
+    Возвращает ключ кеша данных поста текущего поколения.
+
+    Args:
+        post_id: ID поста
+        parts: Уточнения ключа, например 'detail' или адрес запроса
+
+    Returns:
+        str | None: Ключ кеша или None, если кеш данных постов отключен
+        (POST_CACHE_TIMEOUT равен 0)
+    """
+    if settings.POST_CACHE_TIMEOUT <= 0:
+        return None
+    try:
+        generation = _generation(_cache(), post_id)
+    except Exception:
+        generation = None
+    digest = hashlib.md5(
+        ':'.join(map(str, parts)).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'post:{post_id}:{generation}:{digest}'
+
+
+def invalidate_post(post_id):
+    """
+    Делает устаревшими все закешированные данные поста.
+
+    Args:
+        post_id: ID поста
+    """
+    if settings.POST_CACHE_TIMEOUT <= 0:
+        return
+    try:
+        _cache().incr(f'{GENERATION_PREFIX}{post_id}')
+    except Exception:
+        # Поколения нет (ValueError) или кеш недоступен: следующее
+        # чтение начнет новое поколение
+        pass
@@ -0,0 +1,102 @@
+"""
+Рассылка событий об изменениях ленты подписчикам (SSE).
+
+Бэкенд pub/sub выбирается настройкой EVENTS_BACKEND. Бэкенд должен
+реализовывать синхронный ``publish(event)`` и асинхронный контекстный
+менеджер ``subscribe()``, который возвращает очередь с методом ``get()``.
+"""
+import asyncio
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class InProcessBroker:
+    """
+    Брокер событий в памяти процесса.
+
+    Подходит для одного ASGI-процесса. Для нескольких процессов нужен
+    бэкенд с общим хранилищем (например, Redis pub/sub).
+    """
+
+    queue_size = 100
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        """
+        Отправляет событие всем подписчикам. Можно вызывать из любого потока.
+
+        Args:
+            event: Словарь с данными события
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            loop, queue = subscriber
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт
+                self._remove(subscriber)
+
+    @staticmethod
+    def _put(queue, event):
+        """Кладет событие в очередь, вытесняя самое старое при переполнении."""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def subscribe(self):
+        """Возвращает контекстный менеджер подписки с очередью событий."""
+        return _Subscription(self)
+
+    def _add(self, subscriber):
+        """Регистрирует подписчика."""
+        with self._lock:
+            self._subscribers.add(subscriber)
+
+    def _remove(self, subscriber):
+        """Удаляет подписчика."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+
+class _Subscription:
+    """Подписка текущего цикла событий на InProcessBroker."""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.subscriber = None
+
+    async def __aenter__(self):
+        queue = asyncio.Queue(maxsize=self.broker.queue_size)
+        self.subscriber = (asyncio.get_running_loop(), queue)
+        self.broker._add(self.subscriber)
+        return queue
+
+    async def __aexit__(self, *exc_info):
+        self.broker._remove(self.subscriber)
+
+
+@lru_cache(maxsize=1)
+def get_broker():
+    """Возвращает экземпляр бэкенда событий из настроек."""
+    return import_string(settings.EVENTS_BACKEND)()
+
+
+def publish_event(event_type, **data):
+    """
+    Публикует событие после фиксации текущей транзакции.
+
+    Args:
+        event_type: Тип события (post_created, like_changed и т.д.)
+        data: Данные события
+    """
+    event = {'type': event_type, **data}
+    transaction.on_commit(lambda: get_broker().publish(event))
@@ -0,0 +1,27 @@
+"""
+Исключения API и моделей.
+"""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    """Объект изменен после того, как клиент его прочитал (If-Match)."""
+
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = (
+        'Пост был изменен другим запросом. Обновите его и повторите.'
+    )
+    default_code = 'precondition_failed'
+
+
+class Conflict(APIException):
+    """Запрос противоречит текущему состоянию объекта."""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Запрос противоречит текущему состоянию объекта.'
+    default_code = 'conflict'
+
+
+class VersionConflict(Exception):
+    """Пост изменен после загрузки экземпляра (см. Post.save)."""
@@ -0,0 +1,92 @@
+"""
+Потоковая выгрузка данных для аналитики.
+
+Строки читаются серверным курсором (``.iterator(chunk_size=...)``) по
+возрастанию id, поэтому память не зависит от размера таблицы, а выгрузку
+можно продолжить с последнего выгруженного id.
+
+Мягко удаленные посты и комментарии не выгружаются, как и лайки,
+комментарии и изображения удаленных постов: до фоновой очистки
+(purge_post) их строки еще лежат в таблицах.
+"""
+from .fast_serializers import iter_batches
+from .models import Post, Comment, Like, PostImage
+from .renderers import dumps
+
+
+# Условие для строк, связанных с постом, который не удален
+LIVE_POST = {'post__deleted_at__isnull': True}
+
+EXPORTS = {
+    'posts': (
+        Post,
+        ('id', 'author_id', 'author__username', 'text', 'created_at'),
+        {},
+    ),
+    'comments': (
+        Comment,
+        ('id', 'post_id', 'author_id', 'author__username', 'text',
+         'created_at'),
+        LIVE_POST,
+    ),
+    'likes': (
+        Like,
+        ('id', 'post_id', 'user_id'),
+        LIVE_POST,
+    ),
+    'images': (
+        PostImage,
+        ('id', 'post_id', 'image', 'width', 'height', 'format', 'file_size'),
+        LIVE_POST,
+    ),
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def iter_chunks(name, after_id=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Возвращает строки таблицы пачками по возрастанию id.
+
+    Args:
+        name: Имя выгрузки из EXPORTS
+        after_id: Выгружать строки с id больше этого значения
+        chunk_size: Размер пачки и курсора
+
+    Returns:
+        Iterator[list]: Пачки словарей
+    """
+    model, fields, filters = EXPORTS[name]
+    rows = (
+        model.objects.filter(id__gt=after_id, **filters)
+        .order_by('id')
+        .values(*fields)
+        .iterator(chunk_size=chunk_size)
+    )
+    return iter_batches(rows, chunk_size)
+
+
+def encode_ndjson(chunk):
+    """Кодирует пачку строк в NDJSON: одна строка JSON на объект."""
+    return b''.join(dumps(row) + b'\n' for row in chunk)
+
+
+def encode_columnar(chunk):
+    """
+    Кодирует пачку строк в одну строку JSON с данными по столбцам.
+
+    Формат: ``{"rows", "first_id", "last_id", "columns": {поле: [...]}}``.
+    """
+    fields = list(chunk[0])
+    return dumps({
+        'rows': len(chunk),
+        'first_id': chunk[0]['id'],
+        'last_id': chunk[-1]['id'],
+        'columns': {field: [row[field] for row in chunk] for field in fields},
+    }) + b'\n'
+
+
+ENCODERS = {
+    'ndjson': encode_ndjson,
+    'columnar': encode_columnar,
+}
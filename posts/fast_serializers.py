@@ -0,0 +1,229 @@
+"""
+Быстрая сериализация постов и комментариев только для чтения.
+
+Строит словари напрямую из строк ``.values()``, минуя поля DRF.
+Результат совпадает побайтно с ``PostSerializer`` и ``CommentSerializer``
+после рендеринга в JSON.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from .models import PostImage, Comment
+from .partitioning import comments_since
+
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+POST_FIELDS = (
+    'id', 'author_id', 'author__username', 'text', 'created_at',
+    'likes_count', 'version'
+)
+COMMENT_FIELDS = ('id', 'post_id', 'author__username', 'text', 'created_at')
+
+
+def format_datetimes(values):
+    """
+    Форматирует список дат так же, как ``DateTimeField(format=...)`` в DRF.
+
+    Часовой пояс определяется один раз на всю пачку значений.
+
+    Args:
+        values: Список объектов datetime
+
+    Returns:
+        list: Строки в формате DATETIME_FORMAT
+    """
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+    result = []
+    for value in values:
+        if not value:
+            result.append(None)
+            continue
+        if tz is not None:
+            if timezone.is_aware(value):
+                value = value.astimezone(tz)
+            else:
+                value = timezone.make_aware(value, tz)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, datetime.timezone.utc)
+        result.append(value.strftime(DATETIME_FORMAT))
+    return result
+
+
+def iter_batches(rows, size):
+    """
+    Разбивает поток строк на списки фиксированного размера.
+
+    Args:
+        rows: Итерируемый объект со строками
+        size: Размер пачки
+
+    Yields:
+        list: Очередная пачка строк
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def media_url_prefix(request=None):
+    """
+    Возвращает общий префикс URL для файлов изображений.
+
+    Args:
+        request: HTTP-запрос для построения абсолютного URL
+
+    Returns:
+        str: Префикс, к которому добавляется имя файла
+    """
+    prefix = PostImage._meta.get_field('image').storage.url('')
+    if request is not None:
+        prefix = request.build_absolute_uri(prefix)
+    return prefix
+
+
+class CommentReadSerializer:
+    """
+    Сериализатор комментариев только для чтения.
+
+    Принимает строки ``Comment.objects.values(*COMMENT_FIELDS)``.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @staticmethod
+    def values(queryset):
+        """Возвращает queryset строк с полями, нужными сериализатору."""
+        return queryset.values(*COMMENT_FIELDS)
+
+    @property
+    def data(self):
+        """Возвращает список словарей комментариев."""
+        dates = format_datetimes([row['created_at'] for row in self.rows])
+        return [
+            {
+                'id': row['id'],
+                'author': row['author__username'],
+                'text': row['text'],
+                'created_at': created_at,
+            }
+            for row, created_at in zip(self.rows, dates)
+        ]
+
+
+class PostReadSerializer:
+    """
+    Сериализатор постов только для чтения.
+
+    Принимает строки ``Post.objects.values(*POST_FIELDS)`` и догружает
+    изображения и комментарии двумя запросами на всю пачку. Число лайков
+    берется из счетчика в строке поста.
+    При include_comments=False поле comments не выводится и не загружается.
+    """
+
+    def __init__(self, rows, request=None, include_comments=True):
+        self.rows = rows
+        self.request = request
+        self.include_comments = include_comments
+
+    @staticmethod
+    def values(queryset):
+        """Возвращает queryset строк с полями, нужными сериализатору."""
+        return queryset.values(*POST_FIELDS)
+
+    def get_images(self, post_ids):
+        """Возвращает словарь post_id -> список изображений."""
+        prefix = media_url_prefix(self.request)
+        images = defaultdict(list)
+        rows = (
+            PostImage.objects.filter(post_id__in=post_ids)
+            .order_by('id')
+            .values_list(
+                'post_id', 'image', 'width', 'height', 'format',
+                'file_size', 'placeholder'
+            )
+        )
+        for post_id, name, width, height, fmt, size, placeholder in rows:
+            if name:
+                images[post_id].append({
+                    'url': prefix + filepath_to_uri(name).lstrip('/'),
+                    'width': width,
+                    'height': height,
+                    'format': fmt,
+                    'size': size,
+                    'placeholder': placeholder,
+                })
+        return images
+
+    def get_comments(self, post_ids, oldest=None):
+        """
+        Возвращает словарь post_id -> список комментариев.
+
+        Args:
+            post_ids: ID постов
+            oldest: Дата создания самого старого поста; ограничивает
+                created_at комментариев, чтобы не читать старые секции
+        """
+        queryset = Comment.objects.filter(post_id__in=post_ids)
+        if oldest is not None:
+            queryset = queryset.filter(created_at__gte=comments_since(oldest))
+        rows = list(CommentReadSerializer.values(queryset.order_by('id')))
+        comments = defaultdict(list)
+        for row, data in zip(rows, CommentReadSerializer(rows).data):
+            comments[row['post_id']].append(data)
+        return comments
+
+    def get_can_edit(self):
+        """
+        Возвращает функцию author_id -> bool для текущего пользователя.
+        """
+        if not self.request:
+            return lambda author_id: None
+        user = self.request.user
+        if user.is_staff:
+            return lambda author_id: True
+        user_id = user.pk if user.is_authenticated else None
+        return lambda author_id: user_id is not None and author_id == user_id
+
+    @property
+    def data(self):
+        """Возвращает список словарей постов."""
+        if not self.rows:
+            return []
+        post_ids = [row['id'] for row in self.rows]
+        created = [row['created_at'] for row in self.rows]
+        images = self.get_images(post_ids)
+        comments = (
+            self.get_comments(post_ids, min(created))
+            if self.include_comments else None
+        )
+        can_edit = self.get_can_edit()
+        dates = format_datetimes(created)
+        result = []
+        for row, created_at in zip(self.rows, dates):
+            post_images = images.get(row['id'], [])
+            data = {
+                'id': row['id'],
+                'author': row['author__username'],
+                'text': row['text'],
+                'images': [image['url'] for image in post_images],
+                'image_details': post_images,
+                'created_at': created_at,
+            }
+            if comments is not None:
+                data['comments'] = comments.get(row['id'], [])
+            data['likes_count'] = row['likes_count']
+            data['can_edit'] = can_edit(row['author_id'])
+            result.append(data)
+        return result
+
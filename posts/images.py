@@ -0,0 +1,163 @@
+"""
+Обработка изображений постов при загрузке.
+
+Pillow импортируется внутри функций: модуль загружается вместе
+с моделями, а изображения обрабатывает только запрос с загрузкой.
+"""
+import base64
+import io
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+
+PLACEHOLDER_SIZE = 16
+
+# Ключи image.info с метаданными, из-за которых файл перекодируется
+_METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+
+_SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'WEBP': {'quality': 90},
+    'PNG': {'optimize': True},
+}
+
+# Анимированные форматы и параметры, очищающие их метаданные
+# при сохранении всех кадров
+_ANIMATED_SAVE_OPTIONS = {
+    'GIF': {'comment': b''},
+    'WEBP': {'quality': 90, 'exif': b'', 'xmp': b''},
+    'PNG': {'optimize': True},
+}
+
+
+def _make_placeholder(image):
+    """
+    Создает крошечное размытое превью (LQIP) в виде data URI.
+
+    Args:
+        image: Открытое изображение Pillow
+
+    Returns:
+        str: data URI с JPEG размером не больше PLACEHOLDER_SIZE пикселей
+    """
+    from PIL import Image
+
+    thumb = image.convert('RGB')
+    thumb.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BILINEAR)
+    buffer = io.BytesIO()
+    thumb.save(buffer, 'JPEG', quality=40)
+    return 'data:image/jpeg;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode('ascii')
+
+
+def _has_metadata(image):
+    """Проверяет, есть ли в изображении EXIF, XMP или комментарий."""
+    return (
+        bool(image.getexif())
+        or any(key in image.info for key in _METADATA_KEYS)
+    )
+
+
+def _save_frames(image, image_format):
+    """
+    Сохраняет все кадры анимированного изображения без метаданных.
+
+    Длительность кадров и число повторов сохраняются; ориентация EXIF
+    не применяется, поскольку exif_transpose поворачивает только
+    текущий кадр.
+
+    Returns:
+        bytes: Новое содержимое файла
+    """
+    from PIL import ImageSequence
+
+    durations = []
+    for frame in ImageSequence.Iterator(image):
+        frame.load()
+        durations.append(frame.info.get('duration', 0))
+    image.seek(0)
+    options = dict(_ANIMATED_SAVE_OPTIONS[image_format])
+    if 'loop' in image.info:
+        options['loop'] = image.info['loop']
+    buffer = io.BytesIO()
+    image.save(
+        buffer, image_format, save_all=True, duration=durations, **options
+    )
+    return buffer.getvalue()
+
+
+def ingest_image(file):
+    """
+    Извлекает метаданные изображения и удаляет из него EXIF.
+
+    Файл декодируется один раз. Если метаданных нет, для превью
+    используется режим draft (уменьшенное декодирование JPEG).
+    Однокадровые изображения с EXIF/XMP перекодируются с учетом
+    ориентации, анимированные — покадрово с прежними длительностями.
+
+    Args:
+        file: Объект загруженного файла
+
+    Returns:
+        tuple: (bytes | None, dict) — новое содержимое файла или None,
+        если файл не изменился, и словарь с полями width, height,
+        format, file_size, placeholder (пустой, если файл не является
+        изображением)
+
+    Raises:
+        ValidationError: Если в изображении больше пикселей, чем
+            Image.MAX_IMAGE_PIXELS (защита от «бомб» распаковки)
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    file.seek(0)
+    try:
+        image = Image.open(file)
+        image_format = image.format
+        width, height = image.size
+        if width * height > Image.MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError
+        frames = getattr(image, 'n_frames', 1)
+
+        content = None
+        if frames == 1 and image_format in _SAVE_OPTIONS and (
+            _has_metadata(image)
+        ):
+            image = ImageOps.exif_transpose(image)
+            width, height = image.size
+            options = dict(_SAVE_OPTIONS[image_format])
+            icc_profile = image.info.get('icc_profile')
+            if icc_profile:
+                options['icc_profile'] = icc_profile
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, **options)
+            content = buffer.getvalue()
+        elif frames > 1 and image_format in _ANIMATED_SAVE_OPTIONS and (
+            _has_metadata(image)
+        ):
+            content = _save_frames(image, image_format)
+        else:
+            size = PLACEHOLDER_SIZE * 8
+            image.draft('RGB', (size, size))
+
+        meta = {
+            'width': width,
+            'height': height,
+            'format': image_format.lower(),
+            'file_size': len(content) if content is not None else file.size,
+            'placeholder': _make_placeholder(image),
+        }
+    except Image.DecompressionBombError:
+        raise ValidationError(
+            _('Слишком большое разрешение изображения'),
+            code='decompression_bomb'
+        )
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None, {}
+    finally:
+        file.seek(0)
+    return content, meta
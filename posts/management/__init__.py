@@ -0,0 +1,26 @@
+"""Общие функции команд управления."""
+from django.conf import settings
+from django.core.management.base import CommandError
+
+
+def client_host():
+    """
+    Возвращает имя хоста из ALLOWED_HOSTS для запросов тестового клиента.
+
+    Тестовый клиент по умолчанию отправляет Host: testserver, который
+    в рабочих настройках не разрешен.
+
+    Returns:
+        str: Имя хоста
+
+    Raises:
+        CommandError: Если ALLOWED_HOSTS пуст при DEBUG = False
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host == '*':
+            return 'localhost'
+        # '.example.com' разрешает сам домен и его поддомены
+        return host.lstrip('.')
+    if settings.DEBUG:
+        return 'localhost'
+    raise CommandError('ALLOWED_HOSTS пуст: запросы будут отклонены')
@@ -0,0 +1,151 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+from posts.management import client_host
+
+
+MODES = {
+    'reconnect': 0,
+    'persistent': 60,
+}
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает задержку эндпоинта с новым соединением на каждый запрос
+    и с постоянными соединениями (CONN_MAX_AGE).
+
+    Запросы выполняются в процессе через тестовый клиент Django
+    в нескольких потоках, поэтому включают полный цикл запроса,
+    в том числе открытие и закрытие соединений с базой.
+
+    Пример:
+        python manage.py bench_connections --requests 500 --concurrency 8
+        python manage.py bench_connections --mode persistent --check
+    """
+
+    help = 'Бенчмарк переиспользования соединений с базой данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/posts/')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--mode', choices=sorted(MODES), action='append',
+            help='Режим соединений; по умолчанию все'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Завершиться с ошибкой, если есть ответы с ошибкой или '
+                 'в режиме persistent соединения открывались чаще, '
+                 'чем по одному на поток'
+        )
+
+    def handle(self, *args, **options):
+        settings_dict = connections.settings['default']
+        if settings_dict.get('OPTIONS', {}).get('pool'):
+            raise CommandError(
+                'Включен пул соединений (DATABASE_POOL): сравнение '
+                'CONN_MAX_AGE к нему неприменимо'
+            )
+        host = client_host()
+        original = settings_dict.get('CONN_MAX_AGE', 0)
+        failures = []
+        try:
+            for mode in options['mode'] or list(MODES):
+                settings_dict['CONN_MAX_AGE'] = MODES[mode]
+                latencies, opened, errors = self._run(
+                    options['path'], options['requests'],
+                    options['concurrency'], host
+                )
+                self._report(mode, latencies, opened, errors)
+                if errors:
+                    failures.append(f'{mode}: ответов с ошибкой {errors}')
+                if mode == 'persistent' and opened > options['concurrency']:
+                    failures.append(
+                        f'{mode}: соединения не переиспользуются '
+                        f'между запросами'
+                    )
+        finally:
+            settings_dict['CONN_MAX_AGE'] = original
+        if options['check'] and failures:
+            raise CommandError('; '.join(failures))
+
+    def _run(self, path, total, concurrency, host):
+        """
+        Выполняет total запросов в concurrency потоках.
+
+        Args:
+            path: Путь эндпоинта
+            total: Число запросов
+            concurrency: Число потоков
+            host: Имя хоста из ALLOWED_HOSTS
+
+        Returns:
+            tuple: (задержки в секундах, число открытых соединений,
+            число ответов с ошибкой)
+        """
+        latencies = []
+        counters = {'opened': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def on_connect(sender, connection, **kwargs):
+            with lock:
+                counters['opened'] += 1
+
+        def worker(index, count):
+            client = Client(SERVER_NAME=host, HTTP_HOST=host)
+            try:
+                for n in range(count):
+                    # Свой адрес на каждый запрос, чтобы бенчмарк
+                    # не упирался в ограничение частоты запросов
+                    address = f'10.{index % 256}.{n // 256 % 256}.{n % 256}'
+                    started = time.perf_counter()
+                    # Тестовый клиент отключает закрытие соединений по
+                    # сигналам request_started/request_finished; вызываем
+                    # его сами, как обработчик WSGI/ASGI
+                    close_old_connections()
+                    response = client.get(path, REMOTE_ADDR=address)
+                    close_old_connections()
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code >= 400:
+                            counters['errors'] += 1
+            finally:
+                connections.close_all()
+
+        per_thread = [total // concurrency] * concurrency
+        for i in range(total % concurrency):
+            per_thread[i] += 1
+        threads = [
+            threading.Thread(target=worker, args=(index, count))
+            for index, count in enumerate(per_thread)
+        ]
+        connection_created.connect(on_connect)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            connection_created.disconnect(on_connect)
+        return latencies, counters['opened'], counters['errors']
+
+    def _report(self, mode, latencies, opened, errors):
+        """Выводит статистику задержек одного режима."""
+        latencies.sort()
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        self.stdout.write(
+            f'{mode:>10}: запросов {len(latencies)}, ошибок {errors}, '
+            f'соединений открыто {opened}, '
+            f'среднее {statistics.mean(latencies) * 1000:.1f} мс, '
+            f'p50 {statistics.median(latencies) * 1000:.1f} мс, '
+            f'p95 {p95 * 1000:.1f} мс'
+        )
@@ -0,0 +1,91 @@
+import gzip
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import DEFAULT_CHUNK_SIZE, ENCODERS, EXPORTS, iter_chunks
+
+
+class Command(BaseCommand):
+    """
+    Выгружает посты, комментарии, лайки или изображения в файл.
+
+    Пример:
+        python manage.py export_social comments --output comments.ndjson.gz
+        python manage.py export_social comments --output comments.ndjson.gz \
+            --resume
+    """
+
+    help = (
+        'Потоковая выгрузка таблицы в NDJSON или колоночные пачки. '
+        'Файлы с расширением .gz сжимаются gzip.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(EXPORTS))
+        parser.add_argument(
+            '--format', choices=sorted(ENCODERS), default='ndjson',
+            help='Формат: ndjson (строка на объект) или columnar '
+                 '(строка на пачку, данные по столбцам)'
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Путь к файлу или "-" для stdout'
+        )
+        parser.add_argument(
+            '--after-id', type=int, default=0,
+            help='Выгружать строки с id больше указанного'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить выгрузку с id из файла <output>.checkpoint'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        after_id = options['after_id']
+        checkpoint = None if output == '-' else output + '.checkpoint'
+
+        if options['resume']:
+            if checkpoint is None:
+                raise CommandError('--resume требует --output с путем к файлу')
+            if os.path.exists(checkpoint):
+                with open(checkpoint) as f:
+                    after_id = int(f.read().strip() or 0)
+
+        encode = ENCODERS[options['format']]
+        chunks = iter_chunks(
+            options['table'], after_id=after_id,
+            chunk_size=options['chunk_size']
+        )
+
+        if output == '-':
+            target = sys.stdout.buffer
+        else:
+            mode = 'ab' if options['resume'] else 'wb'
+            if output.endswith('.gz'):
+                target = gzip.open(output, mode)
+            else:
+                target = open(output, mode)
+
+        exported = 0
+        try:
+            for chunk in chunks:
+                target.write(encode(chunk))
+                target.flush()
+                exported += len(chunk)
+                after_id = chunk[-1]['id']
+                if checkpoint is not None:
+                    with open(checkpoint, 'w') as f:
+                        f.write(str(after_id))
+        finally:
+            if target is not sys.stdout.buffer:
+                target.close()
+
+        self.stderr.write(
+            f'Выгружено строк: {exported}, последний id: {after_id}'
+        )
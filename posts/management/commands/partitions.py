@@ -0,0 +1,144 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts.partitioning import (
+    PARTITIONED, add_months, convert_sql, create_partition_sql,
+    is_partitioned, list_partitions, month_start
+)
+
+
+class Command(BaseCommand):
+    """
+    Управляет помесячными секциями комментариев и лайков (PostgreSQL).
+
+    Пример:
+        python manage.py partitions convert comments
+        python manage.py partitions create --months-ahead 3
+        python manage.py partitions detach comments --before 2025-01 \
+            --archive-schema archive
+    """
+
+    help = (
+        'Секционирование таблиц по времени: convert — превратить таблицу '
+        'в секционированную, create — создать секции на будущие месяцы, '
+        'detach — отсоединить старые секции для архивации.'
+    )
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        convert = subparsers.add_parser('convert')
+        convert.add_argument('table', choices=sorted(PARTITIONED))
+        convert.add_argument('--months-ahead', type=int, default=3)
+
+        create = subparsers.add_parser('create')
+        create.add_argument(
+            'tables', nargs='*', choices=sorted(PARTITIONED),
+            help='По умолчанию все секционированные таблицы'
+        )
+        create.add_argument('--months-ahead', type=int, default=3)
+
+        detach = subparsers.add_parser('detach')
+        detach.add_argument('table', choices=sorted(PARTITIONED))
+        detach.add_argument(
+            '--before', required=True,
+            help='Месяц YYYY-MM: отсоединить секции, которые целиком '
+                 'старше его начала'
+        )
+        detach.add_argument(
+            '--archive-schema',
+            help='Перенести отсоединенные секции в эту схему'
+        )
+        detach.add_argument(
+            '--drop', action='store_true',
+            help='Удалить отсоединенные секции вместо архивации'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование доступно только в PostgreSQL')
+        getattr(self, 'handle_' + options['action'])(**options)
+
+    def _table(self, name):
+        """Возвращает имя таблицы и ключ секционирования."""
+        model, key = PARTITIONED[name]
+        return model._meta.db_table, key
+
+    def _create_partitions(self, cursor, table, first, months_ahead):
+        """Создает секции с месяца first на months_ahead месяцев вперед."""
+        last = add_months(month_start(timezone.now()), months_ahead)
+        month = first
+        while month <= last:
+            cursor.execute(
+                create_partition_sql(table, month, connection.ops.quote_name)
+            )
+            month = add_months(month, 1)
+
+    def handle_convert(self, table, months_ahead, **options):
+        table, key = self._table(table)
+        boundary = add_months(month_start(timezone.now()), 1)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if is_partitioned(cursor, table):
+                raise CommandError(f'Таблица {table} уже секционирована')
+            statements = convert_sql(
+                cursor, table, key, boundary, connection.ops.quote_name
+            )
+            for statement in statements:
+                cursor.execute(statement)
+            self._create_partitions(cursor, table, boundary, months_ahead)
+        self.stdout.write(f'{table}: секционирована с {boundary:%Y-%m}')
+
+    def handle_create(self, tables, months_ahead, **options):
+        for name in tables or sorted(PARTITIONED):
+            table, _ = self._table(name)
+            with transaction.atomic(), connection.cursor() as cursor:
+                if not is_partitioned(cursor, table):
+                    self.stdout.write(f'{table}: не секционирована, пропуск')
+                    continue
+                uppers = [
+                    upper for _, _, upper in list_partitions(cursor, table)
+                    if upper is not None
+                ]
+                first = max(uppers, default=month_start(timezone.now()))
+                self._create_partitions(cursor, table, first, months_ahead)
+            self.stdout.write(f'{table}: секции созданы')
+
+    def handle_detach(self, table, before, archive_schema, drop, **options):
+        if archive_schema and drop:
+            raise CommandError('--archive-schema и --drop несовместимы')
+        try:
+            cutoff = month_start(datetime.datetime.strptime(before, '%Y-%m'))
+        except ValueError:
+            raise CommandError('--before должен быть в формате YYYY-MM')
+
+        table, _ = self._table(table)
+        quote = connection.ops.quote_name
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not is_partitioned(cursor, table):
+                raise CommandError(f'Таблица {table} не секционирована')
+            old = [
+                name for name, _, upper in list_partitions(cursor, table)
+                if upper is not None and upper <= cutoff
+            ]
+            if archive_schema:
+                cursor.execute(
+                    f'CREATE SCHEMA IF NOT EXISTS {quote(archive_schema)}'
+                )
+            for name in old:
+                cursor.execute(
+                    f'ALTER TABLE {quote(table)} '
+                    f'DETACH PARTITION {quote(name)}'
+                )
+                if drop:
+                    cursor.execute(f'DROP TABLE {quote(name)}')
+                elif archive_schema:
+                    cursor.execute(
+                        f'ALTER TABLE {quote(name)} '
+                        f'SET SCHEMA {quote(archive_schema)}'
+                    )
+                self.stdout.write(f'{table}: отсоединена секция {name}')
+        if not old:
+            self.stdout.write(f'{table}: нет секций старше {cutoff:%Y-%m}')
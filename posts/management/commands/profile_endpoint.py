@@ -0,0 +1,163 @@
+import cProfile
+import io
+import pstats
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import NoReverseMatch, reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from posts.management import client_host
+from posts.profiling import capture_queries
+
+
+# Маршруты posts.urls подключены и под /api/, и в корне сайта; reverse
+# по корневой конфигурации вернул бы путь без /api/, поэтому маршрут
+# сначала ищется в конфигурации процессов, обслуживающих только API
+API_URLCONF = 'social_media.urls_api'
+
+
+class Command(BaseCommand):
+    """
+    Повторяет запрос к эндпоинту N раз под cProfile и выводит сводку
+    самых затратных функций и SQL-запросов.
+
+    Запросы выполняются в процессе через тестовый клиент Django,
+    поэтому профиль включает middleware, представление, сериализацию
+    и ORM.
+
+    Пример:
+        python manage.py profile_endpoint post-list-create --runs 50
+        python manage.py profile_endpoint post-detail --url-args 42 \\
+            --user admin --sort tottime
+    """
+
+    help = 'Профилирование эндпоинта по имени маршрута.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'url_name', help='Имя маршрута, например post-list-create'
+        )
+        parser.add_argument(
+            '--url-args', nargs='*', default=[],
+            help='Позиционные аргументы маршрута'
+        )
+        parser.add_argument(
+            '--query', default='',
+            help='Строка запроса, например "page=2&ordering=hot"'
+        )
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument(
+            '--user', help='Выполнять запросы от имени пользователя (JWT)'
+        )
+        parser.add_argument(
+            '--sort', choices=['cumulative', 'tottime', 'ncalls'],
+            default='cumulative'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=25,
+            help='Сколько функций показать'
+        )
+        parser.add_argument(
+            '--output', help='Сохранить сводный профиль в файл .prof'
+        )
+
+    def handle(self, *args, **options):
+        path = self._path(options['url_name'], options['url_args'])
+        if options['query']:
+            path = f"{path}?{options['query']}"
+
+        headers = {}
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(
+                    f"Пользователь {options['user']} не найден"
+                )
+            token = RefreshToken.for_user(user).access_token
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+        host = client_host()
+        client = Client(SERVER_NAME=host, HTTP_HOST=host)
+        # Прогрев: первый запрос загружает модули и URL-конфигурацию
+        client.get(path, **headers)
+
+        profiler = cProfile.Profile()
+        latencies = []
+        query_counts = []
+        query_times = {}
+        # Выборочное профилирование middleware не должно включаться
+        # поверх профилировщика команды
+        with override_settings(PROFILE_SAMPLE_RATE=0):
+            for n in range(options['runs']):
+                # Свой адрес на каждый запрос, чтобы не упираться
+                # в ограничение частоты запросов
+                address = f'10.1.{n // 256 % 256}.{n % 256}'
+                with capture_queries() as collector:
+                    started = time.perf_counter()
+                    profiler.enable()
+                    response = client.get(
+                        path, REMOTE_ADDR=address, **headers
+                    )
+                    profiler.disable()
+                    latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f'{path}: ответ {response.status_code}'
+                    )
+                query_counts.append(len(collector.queries))
+                for query in collector.queries:
+                    total = query_times.setdefault(query['sql'], [0, 0.0])
+                    total[0] += 1
+                    total[1] += query['time']
+
+        self._report(
+            path, options, profiler, latencies, query_counts, query_times
+        )
+
+    def _path(self, name, args):
+        """
+        Возвращает путь маршрута, для маршрутов API — с префиксом /api/.
+
+        Raises:
+            CommandError: Если маршрут не найден
+        """
+        for urlconf in (API_URLCONF, None):
+            try:
+                return reverse(name, urlconf=urlconf, args=args)
+            except NoReverseMatch as exc:
+                error = exc
+        raise CommandError(str(error))
+
+    def _report(self, path, options, profiler, latencies, query_counts,
+                query_times):
+        """Выводит задержки, SQL-запросы и самые затратные функции."""
+        runs = len(latencies)
+        self.stdout.write(
+            f'{path}: запросов {runs}, '
+            f'среднее {statistics.mean(latencies) * 1000:.1f} мс, '
+            f'p50 {statistics.median(latencies) * 1000:.1f} мс, '
+            f'SQL на запрос {statistics.mean(query_counts):.1f}'
+        )
+
+        self.stdout.write('\nSQL (суммарное время за все запросы):')
+        slowest = sorted(
+            query_times.items(), key=lambda item: item[1][1], reverse=True
+        )
+        for sql, (count, total) in slowest[:10]:
+            self.stdout.write(
+                f'{total * 1000:8.1f} мс {count:5d}x  {sql[:100]}'
+            )
+
+        if options['output']:
+            profiler.dump_stats(options['output'])
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.strip_dirs().sort_stats(options['sort'])
+        stats.print_stats(options['limit'])
+        self.stdout.write(stream.getvalue())
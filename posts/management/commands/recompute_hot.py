@@ -0,0 +1,89 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from posts.models import Post, Comment, Like
+from posts.partitioning import comments_since
+from posts.ranking import hot_score
+
+
+def _count(queryset):
+    """Возвращает подзапрос с количеством строк, относящихся к посту."""
+    counts = queryset.order_by().values('post').annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает счетчики лайков и комментариев и рейтинг постов.
+
+    Счетчики поддерживаются при каждом лайке и комментарии; команда
+    исправляет возможное расхождение (например, после ручных правок
+    в базе) и запускается периодически, например раз в сутки.
+
+    Пример:
+        python manage.py recompute_hot --days 7
+    """
+
+    help = 'Пересчет счетчиков и рейтинга «горячих» постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='Пересчитать только посты за последние N дней'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['days']:
+            since = timezone.now() - datetime.timedelta(days=options['days'])
+            posts = posts.filter(created_at__gte=since)
+
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # Блокировка строк постов: параллельный лайк дождется
+                # фиксации пачки и применит свое изменение поверх пересчета
+                batch = list(
+                    posts.filter(pk__gt=last_id)
+                    .order_by('pk')
+                    .select_for_update()
+                    .annotate(
+                        likes_total=_count(Like.objects.filter(
+                            post=OuterRef('pk'),
+                            post_created_at=OuterRef('created_at')
+                        )),
+                        comments_total=_count(Comment.objects.filter(
+                            post=OuterRef('pk'),
+                            created_at__gte=comments_since(
+                                OuterRef('created_at')
+                            )
+                        )),
+                    )
+                    .only('pk', 'created_at')[:batch_size]
+                )
+                if not batch:
+                    break
+                for post in batch:
+                    post.likes_count = post.likes_total
+                    post.comments_count = post.comments_total
+                    post.hot_score = hot_score(
+                        post.likes_total, post.comments_total,
+                        post.created_at
+                    )
+                Post.objects.bulk_update(
+                    batch, ['likes_count', 'comments_count', 'hot_score']
+                )
+            updated += len(batch)
+            last_id = batch[-1].pk
+
+        self.stdout.write(f'Пересчитано постов: {updated}')
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts.taskqueue import LEASE_SECONDS, claim, run
+
+
+class Command(BaseCommand):
+    """
+    Выполняет фоновые задачи из очереди в пуле потоков.
+
+    Пример:
+        python manage.py run_worker --concurrency 4
+        python manage.py run_worker --once
+    """
+
+    help = 'Воркер очереди фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Число потоков, выполняющих задачи'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, секунд'
+        )
+        parser.add_argument(
+            '--lease', type=int, default=LEASE_SECONDS,
+            help='Срок выполнения задачи, после которого ее заберет '
+                 'другой воркер, секунд'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        succeeded = failed = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            try:
+                while True:
+                    tasks = claim(concurrency, lease=options['lease'])
+                    if not tasks:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+                    for task, ok in zip(tasks, pool.map(run, tasks)):
+                        if ok:
+                            succeeded += 1
+                        else:
+                            failed += 1
+                            self.stderr.write(
+                                f'Задача {task.pk} {task.name}: ошибка, '
+                                f'попытка {task.attempts}/'
+                                f'{task.max_attempts}'
+                            )
+            except KeyboardInterrupt:
+                self.stderr.write('Остановка: ожидание текущих задач')
+        self.stdout.write(
+            f'Выполнено задач: {succeeded}, с ошибкой: {failed}'
+        )
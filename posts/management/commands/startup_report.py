@@ -0,0 +1,103 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+PROFILES = {
+    'full': ('social_media.settings', 'social_media.wsgi'),
+    'api': ('social_media.settings_api', 'social_media.wsgi_api'),
+}
+
+# Выполняется в отдельном интерпретаторе: загружает WSGI-приложение
+# и все модули URL-конфигурации, как перед первым запросом
+_PROBE = '''
+import importlib, json, resource, sys, time
+started = time.perf_counter()
+application = importlib.import_module(sys.argv[1]).application
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    'setup': elapsed,
+    'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+    'pillow': 'PIL' in sys.modules,
+}))
+'''
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает время запуска и потребление памяти процесса с полными
+    настройками и с настройками только для API (settings_api).
+
+    Каждый замер выполняется в новом интерпретаторе: загружается
+    WSGI-приложение и URL-конфигурация, после чего фиксируются время,
+    пиковый RSS и число загруженных модулей.
+
+    Пример:
+        python manage.py startup_report --runs 5
+        python manage.py startup_report --profile api
+    """
+
+    help = 'Отчет о времени запуска и памяти рабочих процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument(
+            '--profile', choices=sorted(PROFILES), action='append',
+            help='Профиль настроек; по умолчанию все'
+        )
+
+    def handle(self, *args, **options):
+        for profile in options['profile'] or list(PROFILES):
+            samples = [
+                self._probe(*PROFILES[profile])
+                for _ in range(options['runs'])
+            ]
+            self._report(profile, samples)
+
+    def _probe(self, settings_module, entry_module):
+        """
+        Запускает приложение в отдельном процессе.
+
+        Returns:
+            dict: Поля setup и total (секунды), rss (КБ), modules, pillow
+
+        Raises:
+            CommandError: Если процесс завершился с ошибкой
+        """
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', _PROBE, entry_module],
+            cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True
+        )
+        total = time.perf_counter() - started
+        if result.returncode:
+            raise CommandError(
+                f'{settings_module}: {result.stderr.strip()}'
+            )
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample['total'] = total
+        return sample
+
+    def _report(self, profile, samples):
+        """Выводит медианы замеров одного профиля."""
+        def median(field):
+            return statistics.median(sample[field] for sample in samples)
+
+        self.stdout.write(
+            f'{profile:>5}: запуск {median("total") * 1000:.0f} мс '
+            f'(из них Django {median("setup") * 1000:.0f} мс), '
+            f'RSS {median("rss") / 1024:.1f} МБ, '
+            f'модулей {median("modules"):.0f}, '
+            f'Pillow {"загружен" if samples[0]["pillow"] else "не загружен"}'
+        )
@@ -0,0 +1,198 @@
+"""
+Промежуточные слои (middleware) приложения posts.
+"""
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+from .profiling import RequestProfiler, should_profile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/',
+)
+
+# Потоки событий отдаются клиенту по мере появления: сжатие по частям
+# задерживает или ломает их доставку через браузеры и прокси
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+
+def parse_accept_encoding(header):
+    """
+    Разбирает заголовок Accept-Encoding.
+
+    Args:
+        header: Значение заголовка
+
+    Returns:
+        dict: Кодировка -> вес (q)
+    """
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def choose_encoding(header, available=('br', 'gzip')):
+    """
+    Выбирает лучшую поддерживаемую клиентом кодировку сжатия.
+
+    Args:
+        header: Значение заголовка Accept-Encoding
+        available: Кодировки в порядке предпочтения сервера
+
+    Returns:
+        str | None: Выбранная кодировка или None
+    """
+    accepted = parse_accept_encoding(header)
+    default = accepted.get('*', 0.0)
+    for encoding in available:
+        if encoding == 'br' and brotli is None:
+            continue
+        if accepted.get(encoding, default) > 0:
+            return encoding
+    return None
+
+
+def brotli_compress_sequence(sequence):
+    """Потоково сжимает последовательность байтовых строк в brotli."""
+    compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=5)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def abrotli_compress_sequence(sequence):
+    """Асинхронный вариант brotli_compress_sequence."""
+    compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=5)
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def agzip_compress_sequence(sequence, max_random_bytes):
+    """Асинхронно сжимает каждую часть ответа отдельным gzip-блоком."""
+    async for chunk in sequence:
+        yield compress_string(chunk, max_random_bytes=max_random_bytes)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает ответы в brotli или gzip в зависимости от Accept-Encoding.
+
+    Обычные ответы сжимаются, только если они больше
+    COMPRESSION_MIN_SIZE байт. Потоковые ответы сжимаются по частям
+    без буферизации всего тела. Потоки событий (text/event-stream
+    и ответы с X-Accel-Buffering: no) не сжимаются.
+    """
+
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        """Сжимает ответ, если это возможно и выгодно."""
+        min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        if response.has_header('Content-Encoding'):
+            return response
+
+        content_type = response.get('Content-Type', '')
+        if (not content_type.startswith(COMPRESSIBLE_TYPES)
+                or content_type.startswith(UNCOMPRESSED_TYPES)
+                or response.get('X-Accel-Buffering') == 'no'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            content = response.streaming_content
+            if encoding == 'br' and response.is_async:
+                content = abrotli_compress_sequence(content)
+            elif encoding == 'br':
+                content = brotli_compress_sequence(content)
+            elif response.is_async:
+                content = agzip_compress_sequence(
+                    content, self.max_random_bytes
+                )
+            else:
+                content = compress_sequence(
+                    content, max_random_bytes=self.max_random_bytes
+                )
+            response.streaming_content = content
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(
+                    response.content, mode=brotli.MODE_TEXT, quality=5
+                )
+            else:
+                compressed = compress_string(
+                    response.content, max_random_bytes=self.max_random_bytes
+                )
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """
+    Профилирует запросы по флагу сотрудника или выборке (posts.profiling).
+
+    Профиль и SQL-запросы сохраняются в PROFILE_DIR, имя файлов
+    возвращается в заголовке X-Profile-Id. В асинхронной цепочке
+    (ASGI) запросы пропускаются без профилирования.
+    """
+
+    def __call__(self, request):
+        """Выполняет запрос, при необходимости под профилировщиком."""
+        if iscoroutinefunction(self) or not should_profile(request):
+            return super().__call__(request)
+        profiler = RequestProfiler(request)
+        with profiler.capture():
+            response = self.get_response(request)
+        response.headers['X-Profile-Id'] = profiler.save(
+            response.status_code
+        )
+        return response
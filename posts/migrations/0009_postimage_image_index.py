@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:50
+
+import django.core.validators
+import posts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_remove_comment_location_remove_post_location_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postimage',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='posts/', validators=[posts.models.validate_image_size, django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif', 'webp'])]),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:51
+
+import django.core.validators
+import posts.models
+import posts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_postimage_image_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postimage',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', validators=[posts.models.validate_image_size, django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif', 'webp'])]),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_postimage_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('post', 'Пост'), ('comment', 'Комментарий'), ('like', 'Лайк'), ('image', 'Изображение')], max_length=10)),
+                ('entity_id', models.BigIntegerField()),
+                ('post_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Создание или изменение'), ('delete', 'Удаление')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
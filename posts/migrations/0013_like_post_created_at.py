@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_post_created_at(apps, schema_editor):
+    """Копирует дату создания поста в существующие лайки."""
+    Like = apps.get_model('posts', 'Like')
+    Post = apps.get_model('posts', 'Post')
+    Like.objects.update(post_created_at=Subquery(
+        Post.objects.filter(pk=OuterRef('post_id')).values('created_at')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='like',
+            name='post_created_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_post_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='like',
+            name='post_created_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(
+                fields=['post', '-created_at'],
+                name='posts_comment_post_created'
+            ),
+        ),
+    ]
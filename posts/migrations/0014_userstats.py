@@ -0,0 +1,72 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    """Возвращает подзапрос с количеством строк, сгруппированных по field."""
+    counts = queryset.order_by().values(field).annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def fill_user_stats(apps, schema_editor):
+    """Заполняет счетчики для существующих пользователей."""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserStats = apps.get_model('posts', 'UserStats')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Like = apps.get_model('posts', 'Like')
+    users = User.objects.annotate(
+        posts_total=_count(
+            Post.objects.filter(author=OuterRef('pk')), 'author'
+        ),
+        likes_total=_count(
+            Like.objects.filter(post__author=OuterRef('pk')), 'post__author'
+        ),
+        comments_total=_count(
+            Comment.objects.filter(post__author=OuterRef('pk')),
+            'post__author'
+        ),
+    ).values_list('pk', 'posts_total', 'likes_total', 'comments_total')
+    UserStats.objects.bulk_create(
+        (
+            UserStats(
+                user_id=pk, posts_count=posts, likes_received=likes,
+                comments_received=comments
+            )
+            for pk, posts, likes, comments in users.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('posts', '0013_like_post_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.IntegerField(default=0)),
+                ('likes_received', models.IntegerField(default=0)),
+                ('comments_received', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created_at', 'id'], name='posts_post_author_created'),
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.3 on 2026-10-19 07:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.ranking import hot_score
+
+
+def _count(queryset):
+    """Возвращает подзапрос с количеством строк, относящихся к посту."""
+    counts = queryset.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счетчики и рейтинг существующих постов."""
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Like = apps.get_model('posts', 'Like')
+    rows = Post.objects.annotate(
+        likes_total=_count(Like.objects.all()),
+        comments_total=_count(Comment.objects.all()),
+    ).values_list('pk', 'likes_total', 'comments_total', 'created_at')
+    batch = []
+    for pk, likes, comments, created_at in rows.iterator(chunk_size=1000):
+        batch.append(Post(
+            pk=pk, likes_count=likes, comments_count=comments,
+            hot_score=hot_score(likes, comments, created_at)
+        ))
+        if len(batch) == 1000:
+            Post.objects.bulk_update(
+                batch, ['likes_count', 'comments_count', 'hot_score']
+            )
+            batch = []
+    Post.objects.bulk_update(
+        batch, ['likes_count', 'comments_count', 'hot_score']
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_userstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-hot_score', '-id'], name='posts_post_hot'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
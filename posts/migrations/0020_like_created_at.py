@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='like',
+            name='created_at',
+            field=models.DateTimeField(
+                auto_now_add=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
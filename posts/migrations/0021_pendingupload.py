@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_like_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingUpload',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID'
+                )),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(
+                    auto_now_add=True, db_index=True
+                )),
+                ('user', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+', to=settings.AUTH_USER_MODEL
+                )),
+            ],
+        ),
+    ]
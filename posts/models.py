@@ -1,10 +1,24 @@
-from django.db import models
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import models, transaction
+from django.db.models import F, Q, Subquery
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
-from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_delete, post_save, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from .storage import ContentAddressedStorage
+from .exceptions import VersionConflict
+from .images import ingest_image
+from .ranking import engagement_update, hot_score
+from .taskqueue import enqueue
+from .notifications import schedule_flush
+from .coalescing import invalidate_post
 
 
 def validate_image_size(value):
@@ -23,6 +37,35 @@ def validate_image_size(value):
         raise ValidationError(_("Максимальный размер изображения 5MB"))
 
 
+# Условие частичных индексов: мягко удаленные строки в них не попадают
+ALIVE = Q(deleted_at__isnull=True)
+
+_purging = ContextVar('purging', default=False)
+
+
+@contextmanager
+def purging():
+    """
+    Отмечает фоновую очистку мягко удаленных объектов.
+
+    Счетчики и журнал изменений уже учли удаление в момент пометки,
+    поэтому обработчики post_delete внутри блока их не меняют.
+    """
+    token = _purging.set(True)
+    try:
+        yield
+    finally:
+        _purging.reset(token)
+
+
+class AliveManager(models.Manager):
+    """Менеджер по умолчанию: скрывает мягко удаленные объекты."""
+
+    def get_queryset(self):
+        """Возвращает queryset без объектов с deleted_at."""
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Post(models.Model):
     """
     Модель для хранения постов пользователей.
@@ -31,33 +74,240 @@ class Post(models.Model):
         author: Автор поста
         text: Текст поста
         created_at: Дата и время создания поста
+        likes_count: Количество лайков (денормализованный счетчик)
+        comments_count: Количество комментариев (денормализованный счетчик)
+        hot_score: Рейтинг для ленты ?ordering=hot (см. posts.ranking)
+        version: Номер версии текста для оптимистической блокировки
+            (ETag и If-Match в /api/posts/<id>/)
+        deleted_at: Дата мягкого удаления; такие посты скрыты менеджером
+            objects и удаляются задачей posts.tasks.purge_post
     """
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='posts'
     )
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    likes_count = models.IntegerField(default=0, editable=False)
+    comments_count = models.IntegerField(default=0, editable=False)
+    hot_score = models.FloatField(default=0, editable=False)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = AliveManager()
+    all_objects = models.Manager()
+
+    # Поля, которые записывает полное сохранение существующего поста.
+    # Счетчики и рейтинг меняются только атомарными UPDATE, и save()
+    # не должен затирать их значениями, прочитанными раньше
+    SAVE_FIELDS = ('author', 'text', 'version')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-created_at'], name='posts_post_feed',
+                condition=ALIVE
+            ),
+            models.Index(
+                fields=['author', '-created_at', 'id'],
+                name='posts_post_author_created', condition=ALIVE
+            ),
+            models.Index(
+                fields=['-hot_score', '-id'], name='posts_post_hot',
+                condition=ALIVE
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженный текст, чтобы save() видел его изменение."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_text = instance.__dict__.get('text')
+        return instance
+
+    def save(self, *args, editor=None, **kwargs):
+        """
+        Задает начальный рейтинг нового поста перед сохранением.
+
+        У существующего поста сохраняются только SAVE_FIELDS (или
+        переданные update_fields). Измененный текст записывается через
+        edit(): с проверкой версии, увеличением версии и записью
+        в историю, как при изменении через API.
+
+        Args:
+            editor: Пользователь, изменяющий пост (для истории)
+
+        Raises:
+            VersionConflict: Если пост изменили после загрузки
+        """
+        if self._state.adding:
+            self.hot_score = hot_score(
+                self.likes_count, self.comments_count,
+                self.created_at or timezone.now()
+            )
+        else:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = self.SAVE_FIELDS
+            update_fields = set(update_fields)
+            if 'text' in update_fields:
+                update_fields -= {'text', 'version'}
+                self._save_text(editor)
+                if not update_fields:
+                    return
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+    def _save_text(self, editor):
+        """
+        Записывает измененный текст через edit().
+
+        Raises:
+            VersionConflict: Если версия в базе уже не равна self.version
+        """
+        loaded = getattr(self, '_loaded_text', None)
+        if loaded is None:
+            loaded = Post.all_objects.filter(pk=self.pk).values_list(
+                'text', flat=True
+            ).first()
+        text, self.text = self.text, loaded
+        if not self.edit(text, self.version, editor):
+            self.text = text
+            raise VersionConflict(
+                f'Пост {self.pk} изменен после загрузки (версия '
+                f'{self.version})'
+            )
+
+    def edit(self, text, version, editor=None):
+        """
+        Изменяет текст поста, если его версия в базе все еще равна version.
+
+        Выполняется один условный UPDATE ... WHERE version=version,
+        меняющий только text и version, и в той же транзакции прежний
+        текст добавляется в историю PostRevision. Сигнал post_save
+        отправляется вручную, чтобы изменение попало в журнал изменений.
+        Если текст не изменился, версия и история не меняются.
+
+        Args:
+            text: Новый текст поста
+            version: Версия, которую видел клиент
+            editor: Пользователь, изменяющий пост
+
+        Returns:
+            bool: True, если пост изменен или текст тот же;
+            False, если версия устарела
+        """
+        if version != self.version:
+            return False
+        if text == self.text:
+            return True
+        with transaction.atomic():
+            updated = Post.objects.filter(
+                pk=self.pk, version=version
+            ).update(text=text, version=F('version') + 1)
+            if not updated:
+                return False
+            PostRevision.objects.create(
+                post=self, version=version, text=self.text, editor=editor
+            )
+            self.text = text
+            self._loaded_text = text
+            self.version = version + 1
+            post_save.send(
+                sender=Post, instance=self, created=False,
+                update_fields=frozenset({'text', 'version'}), raw=False,
+                using=self._state.db
+            )
+        return True
+
+    def soft_delete(self):
+        """
+        Помечает пост удаленным.
+
+        Запрос меняет одну строку: счетчики автора уменьшаются на
+        счетчики поста, в журнал пишется удаление. Комментарии, лайки,
+        изображения и их файлы удаляет фоновая задача purge_post.
+
+        Returns:
+            bool: False, если пост уже удален
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            if not Post.objects.filter(pk=self.pk).update(deleted_at=now):
+                return False
+            self.deleted_at = now
+            counters = Post.all_objects.filter(pk=self.pk)
+            UserStats.objects.filter(user_id=self.author_id).update(
+                posts_count=F('posts_count') - 1,
+                likes_received=F('likes_received') - Subquery(
+                    counters.values('likes_count')
+                ),
+                comments_received=F('comments_received') - Subquery(
+                    counters.values('comments_count')
+                ),
+            )
+            _log_change(self, ChangeLog.DELETE)
+            _invalidate_cache(self)
+            enqueue('posts.tasks.purge_post', self.pk)
+        return True
 
     def __str__(self):
         """Возвращает строковое представление поста."""
         return self.text[:50]
 
 
+class PostRevision(models.Model):
+    """
+    История изменений текста поста (только добавление записей).
+
+    Attributes:
+        post: Пост
+        version: Версия поста, которой принадлежал текст
+        text: Текст поста в этой версии
+        editor: Пользователь, заменивший этот текст новым
+        created_at: Дата и время замены
+    """
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='revisions'
+    )
+    version = models.PositiveIntegerField()
+    text = models.TextField()
+    editor = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('post', 'version')
+
+    def __str__(self):
+        """Возвращает строковое представление версии."""
+        return f"Post {self.post_id} v{self.version}"
+
+
 class PostImage(models.Model):
     """
     Модель для хранения изображений к постам.
 
     Attributes:
         post: Связанный пост
-        image: Изображение
+        image: Изображение (имя файла — хеш содержимого, один файл
+            может принадлежать нескольким PostImage)
+        width: Ширина изображения в пикселях
+        height: Высота изображения в пикселях
+        format: Формат изображения (jpeg, png, gif, webp)
+        file_size: Размер файла в байтах
+        placeholder: Размытое превью (LQIP) в виде data URI
     """
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE, related_name='images'
     )
     image = models.ImageField(
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         null=True,
+        db_index=True,
         validators=[
             validate_image_size,
             FileExtensionValidator(
@@ -65,11 +315,40 @@ class PostImage(models.Model):
             )
         ]
     )
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    format = models.CharField(max_length=10, blank=True)
+    file_size = models.PositiveIntegerField(null=True, blank=True)
+    placeholder = models.TextField(blank=True)
 
     def __str__(self):
         """Возвращает строковое представление изображения."""
         return f"Image for post {self.post.id}"
 
+    def save(self, *args, **kwargs):
+        """
+        Обрабатывает новый файл изображения перед сохранением.
+
+        Если метаданные уже заполнены (ingest вызван заранее для
+        проверки файла), изображение повторно не декодируется.
+        """
+        if self.image and not self.image._committed and not self.format:
+            self.ingest()
+        super().save(*args, **kwargs)
+
+    def ingest(self):
+        """
+        Заполняет метаданные изображения и заменяет файл версией без EXIF.
+
+        Raises:
+            ValidationError: Если разрешение изображения слишком велико
+        """
+        content, meta = ingest_image(self.image.file)
+        if content is not None:
+            self.image = ContentFile(content, name=self.image.name)
+        for field, value in meta.items():
+            setattr(self, field, value)
+
 
 class Comment(models.Model):
     """
@@ -80,6 +359,8 @@ class Comment(models.Model):
         author: Автор комментария
         text: Текст комментария
         created_at: Дата и время создания комментария
+        deleted_at: Дата мягкого удаления; такие комментарии скрыты
+            менеджером objects и удаляются задачей purge_comment
     """
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE, related_name='comments'
@@ -87,6 +368,59 @@ class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = AliveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', '-created_at'],
+                name='posts_comment_post_created', condition=ALIVE
+            ),
+        ]
+
+    def soft_delete(self):
+        """
+        Помечает комментарий удаленным и уменьшает счетчики.
+
+        Строку удаляет фоновая задача purge_comment.
+
+        Returns:
+            bool: False, если комментарий уже удален
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            # created_at в условии отсекает лишние секции таблицы
+            updated = Comment.objects.filter(
+                pk=self.pk, created_at=self.created_at
+            ).update(deleted_at=now)
+            if not updated:
+                return False
+            self.deleted_at = now
+            _update_engagement(self, -1)
+            _update_stats(self, -1)
+            _log_change(self, ChangeLog.DELETE)
+            _invalidate_cache(self)
+            enqueue('posts.tasks.purge_comment', self.pk)
+        return True
+
+    def delete(self, *args, **kwargs):
+        """
+        Удаляет комментарий сразу, без мягкого удаления.
+
+        Счетчики и журнал изменений обновляются здесь, а не в post_delete:
+        без обработчиков post_delete Django удаляет комментарии пачками
+        и каскадом одним запросом DELETE (fast delete).
+        """
+        with transaction.atomic():
+            if self.deleted_at is None:
+                _update_engagement(self, -1)
+                _update_stats(self, -1)
+                _log_change(self, ChangeLog.DELETE)
+                _invalidate_cache(self)
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         """Возвращает строковое представление комментария."""
@@ -100,6 +434,9 @@ class Like(models.Model):
     Attributes:
         post: Связанный пост
         user: Пользователь, который поставил лайк
+        post_created_at: Дата создания поста (ключ секционирования
+            таблицы лайков, см. manage.py partitions)
+        created_at: Дата и время создания
 
     Meta:
         unique_together: Уникальное ограничение на пару (post, user)
@@ -108,19 +445,529 @@ class Like(models.Model):
         Post, on_delete=models.CASCADE, related_name='likes'
     )
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    post_created_at = models.DateTimeField(editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('post', 'user')
 
+    def save(self, *args, **kwargs):
+        """Заполняет дату создания поста перед сохранением."""
+        if self.post_created_at is None:
+            self.post_created_at = self.post.created_at
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """
+        Удаляет лайк и уменьшает счетчики поста и его автора.
+
+        Как и у комментариев, счетчики меняются здесь, а не в post_delete,
+        чтобы лайки удалялись пачками одним запросом (fast delete).
+        """
+        with transaction.atomic():
+            _update_engagement(self, -1)
+            _update_stats(self, -1)
+            _log_change(self, ChangeLog.DELETE)
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         """Возвращает строковое представление лайка."""
         return f"{self.user.username} likes {self.post.id}"
 
 
+class ChangeLog(models.Model):
+    """
+    Журнал изменений постов, комментариев, лайков и изображений.
+
+    Монотонно растущий id служит токеном синхронизации для /api/changes/.
+    Записи об удалении (tombstone) позволяют клиентам удалить у себя
+    объекты, которых больше нет.
+
+    Attributes:
+        entity: Тип объекта
+        entity_id: ID измененного объекта
+        post_id: ID поста, к которому относится объект
+        action: Вид изменения (создание/изменение или удаление)
+        created_at: Дата и время изменения
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    LIKE = 'like'
+    IMAGE = 'image'
+    ENTITY_CHOICES = [
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+        (LIKE, 'Лайк'),
+        (IMAGE, 'Изображение'),
+    ]
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [
+        (UPSERT, 'Создание или изменение'),
+        (DELETE, 'Удаление'),
+    ]
+
+    entity = models.CharField(max_length=10, choices=ENTITY_CHOICES)
+    entity_id = models.BigIntegerField()
+    post_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """Возвращает строковое представление записи журнала."""
+        return f"{self.action} {self.entity} {self.entity_id}"
+
+
+class UserStats(models.Model):
+    """
+    Денормализованные счетчики профиля пользователя.
+
+    Обновляются сигналами при создании и удалении постов, комментариев
+    и лайков, поэтому статистика профиля читается одной строкой.
+
+    Attributes:
+        user: Пользователь
+        posts_count: Количество постов пользователя
+        likes_received: Количество лайков на постах пользователя
+        comments_received: Количество комментариев к постам пользователя
+        unread_notifications: Количество непрочитанных уведомлений
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.IntegerField(default=0)
+    likes_received = models.IntegerField(default=0)
+    comments_received = models.IntegerField(default=0)
+    unread_notifications = models.IntegerField(default=0)
+
+    def __str__(self):
+        """Возвращает строковое представление счетчиков."""
+        return f"Stats for {self.user_id}"
+
+    @classmethod
+    def recalculate(cls, user):
+        """
+        Пересчитывает счетчики пользователя по данным таблиц.
+
+        Args:
+            user: Пользователь
+
+        Returns:
+            UserStats: Сохраненные счетчики
+        """
+        stats, _ = cls.objects.update_or_create(
+            user=user,
+            defaults={
+                'posts_count': Post.objects.filter(author=user).count(),
+                'likes_received': Like.objects.filter(
+                    post__author=user, post__deleted_at__isnull=True
+                ).count(),
+                'comments_received': Comment.objects.filter(
+                    post__author=user, post__deleted_at__isnull=True
+                ).count(),
+                'unread_notifications': Notification.objects.filter(
+                    recipient=user, is_read=False
+                ).count(),
+            }
+        )
+        return stats
+
+
+_STAT_FIELDS = {
+    Post: 'posts_count',
+    Comment: 'comments_received',
+    Like: 'likes_received',
+}
+
+
+def _update_stats(instance, delta):
+    """Изменяет счетчик автора поста на delta одним запросом UPDATE."""
+    if isinstance(instance, Post):
+        author = instance.author_id
+    else:
+        author = Subquery(
+            Post.objects.filter(pk=instance.post_id).values('author_id')[:1]
+        )
+    field = _STAT_FIELDS[type(instance)]
+    UserStats.objects.filter(user_id=author).update(
+        **{field: F(field) + delta}
+    )
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    """
+    Создает счетчики для нового пользователя.
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Сохраненный пользователь
+        created: True, если пользователь только что создан
+        raw: True при загрузке фикстур
+        kwargs: Дополнительные аргументы
+    """
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Like)
+def count_created(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик профиля при создании объекта.
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Сохраненный экземпляр
+        created: True, если объект только что создан
+        kwargs: Дополнительные аргументы
+    """
+    if created:
+        _update_stats(instance, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted(sender, instance, **kwargs):
+    """
+    Уменьшает счетчики автора при удалении поста без мягкого удаления.
+
+    Комментарии и лайки поста удаляются каскадом одним запросом,
+    поэтому их вклад вычитается по счетчикам поста. У комментариев
+    и лайков обработчиков post_delete нет (см. Comment.delete).
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Удаленный пост
+        kwargs: Дополнительные аргументы
+    """
+    if not _purging.get():
+        UserStats.objects.filter(user_id=instance.author_id).update(
+            posts_count=F('posts_count') - 1,
+            likes_received=F('likes_received') - instance.likes_count,
+            comments_received=(
+                F('comments_received') - instance.comments_count
+            ),
+        )
+
+
+@receiver(pre_delete, sender=User)
+def release_user_engagement(sender, instance, **kwargs):
+    """
+    Удаляет лайки и комментарии пользователя к чужим постам
+    по одному, чтобы уменьшить счетчики этих постов и их авторов.
+
+    Каскад удалил бы их одним запросом без изменения счетчиков.
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Удаляемый пользователь
+        kwargs: Дополнительные аргументы
+    """
+    for like in Like.objects.filter(user=instance).exclude(
+        post__author=instance
+    ):
+        like.delete()
+    for comment in Comment.objects.filter(author=instance).exclude(
+        post__author=instance
+    ):
+        comment.delete()
+
+
+_ENGAGEMENT_FIELDS = {
+    Comment: 'comments',
+    Like: 'likes',
+}
+
+
+def _update_engagement(instance, delta):
+    """Изменяет счетчик поста и его рейтинг одним запросом UPDATE."""
+    field = _ENGAGEMENT_FIELDS[type(instance)]
+    Post.objects.filter(pk=instance.post_id).update(
+        **engagement_update(**{field: delta})
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Like)
+def engagement_created(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчик и рейтинг поста при новом комментарии или лайке.
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Сохраненный экземпляр
+        created: True, если объект только что создан
+        kwargs: Дополнительные аргументы
+    """
+    if created:
+        _update_engagement(instance, 1)
+
+
+class Task(models.Model):
+    """
+    Фоновая задача в очереди (см. posts.taskqueue и manage.py run_worker).
+
+    Attributes:
+        name: Путь к функции задачи (например, posts.tasks.delete_...)
+        args: Позиционные аргументы (JSON)
+        kwargs: Именованные аргументы (JSON)
+        status: Состояние задачи
+        attempts: Число начатых попыток
+        max_attempts: Максимальное число попыток
+        run_at: Время, не раньше которого задачу можно выполнить
+        locked_until: Срок, до которого задачу выполняет воркер
+        last_error: Трассировка последней ошибки
+        created_at: Дата и время постановки в очередь
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='posts_task_status_run_at'
+            ),
+        ]
+
+    def __str__(self):
+        """Возвращает строковое представление задачи."""
+        return f"{self.name} ({self.status})"
+
+
+class Notification(models.Model):
+    """
+    Уведомление автора о лайках или комментариях к его посту.
+
+    События не записываются по одному: фоновая задача
+    posts.tasks.flush_notifications раз в окно NOTIFICATION_WINDOW
+    добавляет к непрочитанному уведомлению все новые события
+    («Ваш пост оценили: 12»). Прочитанное уведомление не меняется,
+    следующие события создают новое.
+
+    Attributes:
+        recipient: Автор поста
+        post: Пост
+        verb: Вид событий (лайк или комментарий)
+        count: Количество событий
+        last_actor: Пользователь, совершивший последнее событие
+        last_event_id: ID последнего учтенного лайка или комментария
+        is_read: Прочитано ли уведомление
+        created_at: Дата и время создания
+        updated_at: Дата и время последнего добавления событий
+    """
+    LIKE = 'like'
+    COMMENT = 'comment'
+    VERB_CHOICES = [
+        (LIKE, 'Лайки'),
+        (COMMENT, 'Комментарии'),
+    ]
+
+    recipient = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='notifications'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='notifications'
+    )
+    verb = models.CharField(max_length=10, choices=VERB_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    last_actor = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+'
+    )
+    last_event_id = models.BigIntegerField(default=0)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['recipient', '-updated_at'],
+                name='posts_notif_recipient_updated'
+            ),
+            models.Index(
+                fields=['post', 'verb', '-id'], name='posts_notif_post_verb'
+            ),
+        ]
+
+    def __str__(self):
+        """Возвращает строковое представление уведомления."""
+        return f"{self.verb} x{self.count} on {self.post_id}"
+
+
+class PendingUpload(models.Model):
+    """
+    Выданный и еще не подтвержденный слот прямой загрузки
+    (см. posts.uploads).
+
+    Подтверждение удаляет запись в своей транзакции: токен слота
+    нельзя подтвердить дважды, даже если запросы пришли одновременно.
+
+    Attributes:
+        key: Имя временного файла слота
+        user: Пользователь, получивший слот
+        created_at: Дата и время выдачи слота
+    """
+    key = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        """Возвращает строковое представление слота."""
+        return self.key
+
+
+_NOTIFICATION_VERBS = {
+    Comment: Notification.COMMENT,
+    Like: Notification.LIKE,
+}
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Like)
+def notify_created(sender, instance, created, raw=False, **kwargs):
+    """
+    Планирует уведомление автора поста о новом лайке или комментарии.
+
+    В запросе только отмечается, что у поста есть новые события;
+    уведомление записывает фоновая задача раз в окно.
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Сохраненный экземпляр
+        created: True, если объект только что создан
+        raw: True при загрузке фикстур
+        kwargs: Дополнительные аргументы
+    """
+    if created and not raw:
+        schedule_flush(instance.post_id, _NOTIFICATION_VERBS[sender])
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    """
+    Уменьшает счетчик непрочитанных при удалении уведомления
+    (например, вместе с постом).
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Удаленный экземпляр
+        kwargs: Дополнительные аргументы
+    """
+    if not instance.is_read:
+        UserStats.objects.filter(user_id=instance.recipient_id).update(
+            unread_notifications=F('unread_notifications') - 1
+        )
+
+
+_CHANGE_ENTITIES = {
+    Post: ChangeLog.POST,
+    Comment: ChangeLog.COMMENT,
+    Like: ChangeLog.LIKE,
+    PostImage: ChangeLog.IMAGE,
+}
+
+
+def _log_change(instance, action):
+    """Добавляет запись в журнал изменений."""
+    post_id = instance.pk if isinstance(instance, Post) else instance.post_id
+    ChangeLog.objects.create(
+        entity=_CHANGE_ENTITIES[type(instance)],
+        entity_id=instance.pk,
+        post_id=post_id,
+        action=action,
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=PostImage)
+def log_saved(sender, instance, **kwargs):
+    """
+    Записывает создание или изменение объекта в журнал изменений.
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Сохраненный экземпляр
+        kwargs: Дополнительные аргументы
+    """
+    _log_change(instance, ChangeLog.UPSERT)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=PostImage)
+def log_deleted(sender, instance, **kwargs):
+    """
+    Записывает удаление объекта в журнал изменений.
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Удаленный экземпляр
+        kwargs: Дополнительные аргументы
+    """
+    if not _purging.get():
+        _log_change(instance, ChangeLog.DELETE)
+
+
+def _invalidate_cache(instance):
+    """Сбрасывает кеш данных поста после фиксации транзакции."""
+    post_id = instance.pk if isinstance(instance, Post) else instance.post_id
+    transaction.on_commit(partial(invalidate_post, post_id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=PostImage)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=PostImage)
+def invalidate_cached_post(sender, instance, **kwargs):
+    """
+    Сбрасывает закешированные данные поста (posts.coalescing) при
+    изменении поста, его комментариев или изображений.
+
+    Args:
+        sender: Класс модели, отправляющий сигнал
+        instance: Сохраненный или удаленный экземпляр
+        kwargs: Дополнительные аргументы
+    """
+    if not _purging.get():
+        _invalidate_cache(instance)
+
+
 @receiver(pre_delete, sender=PostImage)
 def delete_post_image_files(sender, instance, **kwargs):
     """
-    Удаляет файлы изображений при удалении объекта PostImage.
+    Удаляет файл изображения при удалении последнего PostImage,
+    который на него ссылается.
+
+    Проверка и удаление выполняются фоновой задачей после фиксации
+    транзакции и не задерживают запрос. Недавно использованный файл
+    задача не удаляет: на него может сослаться параллельная загрузка,
+    еще не зафиксировавшая свою строку (см. delete_unreferenced_image).
 
     Args:
         sender: Класс модели, отправляющий сигнал
@@ -128,7 +975,10 @@ def delete_post_image_files(sender, instance, **kwargs):
         kwargs: Дополнительные аргументы
     """
     if instance.image:
-        instance.image.delete(save=False)
+        enqueue(
+            'posts.tasks.delete_unreferenced_image',
+            instance.image.name, instance.pk
+        )
 
 
 @receiver(pre_delete, sender=Post)
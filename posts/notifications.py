@@ -0,0 +1,59 @@
+"""
+Планирование уведомлений о лайках и комментариях.
+
+Лайк или комментарий не записывает уведомление сам: ``schedule_flush``
+ставит задачу posts.tasks.flush_notifications на конец текущего окна
+NOTIFICATION_WINDOW, один раз на пост и вид событий (повтор отсекается
+``cache.add``). Задача считает новые события по таблице лайков или
+комментариев после последнего учтенного ID, поэтому популярный пост
+дает одну запись уведомления за окно, а события не теряются, даже если
+кеш у процессов свой: в худшем случае задача выполнится несколько раз.
+
+Задача учитывает только события старше CHANGES_SAFE_HORIZON секунд
+и ставится на конец окна плюс этот запас. Транзакция лайка с меньшим
+ID может зафиксироваться позже транзакции с большим — к моменту
+подсчета она уже видна, и курсор по ID ее не пропустит.
+
+В режиме TASKS_EAGER окно и запас не применяются: задача выполняется
+после фиксации каждого лайка или комментария, и события учитываются
+по одному, без объединения.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .taskqueue import enqueue
+
+
+def schedule_flush(post_id, verb):
+    """
+    Планирует запись уведомления о новых событиях поста.
+
+    Args:
+        post_id: ID поста
+        verb: Вид событий (Notification.LIKE или Notification.COMMENT)
+    """
+    window = settings.NOTIFICATION_WINDOW
+    horizon = settings.CHANGES_SAFE_HORIZON
+    if settings.TASKS_EAGER or window <= 0:
+        enqueue(
+            'posts.tasks.flush_notifications', post_id, verb,
+            delay=horizon
+        )
+        return
+
+    now = time.time()
+    number = int(now // window)
+    key = f'notify:{verb}:{post_id}:{number}'
+    try:
+        scheduled = not caches[settings.NOTIFICATIONS_CACHE].add(
+            key, 1, 2 * window
+        )
+    except Exception:
+        scheduled = False
+    if not scheduled:
+        enqueue(
+            'posts.tasks.flush_notifications', post_id, verb,
+            delay=(number + 1) * window - now + horizon
+        )
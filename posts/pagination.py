@@ -0,0 +1,143 @@
+"""
+Пагинация с приблизительным подсчетом строк для больших таблиц.
+
+Точный ``COUNT(*)`` по таблице с миллионами строк занимает секунды.
+Для запросов без фильтров PostgreSQL хранит оценку числа строк
+в ``pg_class.reltuples`` (обновляется VACUUM/ANALYZE), ее и используем.
+В других СУБД оценкой служит последний точный подсчет, сохраненный
+в кеше на COUNT_CACHE_TIMEOUT секунд. Оценка применяется, только если
+она не меньше COUNT_ESTIMATE_THRESHOLD. Запросы с условиями (например,
+комментарии к посту) всегда считаются точно: это небольшие выборки.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+COUNT_CACHE_PREFIX = 'row-count:'
+
+
+def is_unfiltered(queryset):
+    """
+    Проверяет, что запрос выбирает все строки таблицы.
+
+    Условие менеджера по умолчанию (например, скрытие мягко удаленных
+    строк) фильтром не считается: таких строк мало, и оценка по всей
+    таблице остается приемлемой.
+    """
+    query = queryset.query
+    base = queryset.model._default_manager.all().query
+    return (
+        query.where == base.where
+        and not query.distinct and not query.is_sliced
+    )
+
+
+def _cache_key(queryset):
+    """Возвращает ключ кеша с количеством строк таблицы."""
+    return f'{COUNT_CACHE_PREFIX}{queryset.db}:{queryset.model._meta.db_table}'
+
+
+def estimate_count(queryset):
+    """
+    Возвращает оценку числа строк таблицы.
+
+    В PostgreSQL оценка берется из pg_class (для секционированной
+    таблицы суммируются оценки секций), иначе — из кеша.
+
+    Args:
+        queryset: QuerySet модели без условий
+
+    Returns:
+        int | None: Оценка или None, если у запроса есть условия
+        или оценки нет
+    """
+    if not is_unfiltered(queryset):
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return cache.get(_cache_key(queryset))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT sum(reltuples)::bigint FROM pg_class
+            WHERE relkind = 'r' AND reltuples >= 0 AND (
+                oid = to_regclass(%s) OR oid IN (
+                    SELECT inhrelid FROM pg_inherits
+                    WHERE inhparent = to_regclass(%s)
+                )
+            )
+            """,
+            [queryset.model._meta.db_table] * 2
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, который для больших таблиц берет оценку числа строк.
+
+    Attributes:
+        estimated: True, если count — оценка, а не точное значение
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        """Возвращает оценку числа строк или точное значение."""
+        estimate = estimate_count(self.object_list)
+        if (estimate is not None
+                and estimate >= settings.COUNT_ESTIMATE_THRESHOLD):
+            self.estimated = True
+            return estimate
+        count = super().count
+        if is_unfiltered(self.object_list):
+            cache.set(
+                _cache_key(self.object_list), count,
+                settings.COUNT_CACHE_TIMEOUT
+            )
+        return count
+
+
+class EstimatedPageNumberPagination(PageNumberPagination):
+    """
+    Постраничная пагинация API с приблизительным count для больших таблиц.
+
+    Ответ содержит поле ``count_approximate``: True, если count — оценка.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        """
+        Возвращает страницу с количеством строк и признаком оценки.
+
+        Args:
+            data: Сериализованные объекты страницы
+
+        Returns:
+            Response: Ответ с полями count, count_approximate, next,
+            previous, results
+        """
+        return Response({
+            'count': self.page.paginator.count,
+            'count_approximate': self.page.paginator.estimated,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        """Добавляет поле count_approximate в схему ответа."""
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_approximate'] = {
+            'type': 'boolean',
+            'example': False,
+        }
+        return response_schema
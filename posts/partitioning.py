@@ -0,0 +1,256 @@
+"""
+Секционирование таблиц комментариев и лайков по времени (PostgreSQL).
+
+Секционирование необязательно: приложение работает и с обычными
+таблицами. Команда ``manage.py partitions convert`` превращает таблицу
+в секционированную по диапазонам (RANGE) помесячно. Существующая
+таблица без копирования данных становится первой секцией, поэтому
+конвертация выполняется за одну транзакцию.
+
+Комментарии секционируются по ``created_at``, лайки — по
+``post_created_at`` (дата создания поста). Уникальный ключ
+секционированной таблицы обязан включать ключ секционирования;
+дата поста однозначно определяется постом, поэтому ограничение
+``(post_id, user_id, post_created_at)`` по-прежнему запрещает второй
+лайк того же пользователя. Таблица постов не секционируется: на нее
+ссылаются внешние ключи, а они требуют уникальности одного ``id``.
+
+Запросы приложения добавляют условие на ключ секционирования, чтобы
+PostgreSQL отбрасывал лишние секции (partition pruning).
+"""
+import datetime
+
+from .models import Comment, Like
+
+
+# Комментарий не может быть старше поста. Запас покрывает расхождение
+# часов между серверами приложения, которые заполняют created_at.
+CLOCK_SKEW_MARGIN = datetime.timedelta(days=1)
+
+PARTITIONED = {
+    'comments': (Comment, 'created_at'),
+    'likes': (Like, 'post_created_at'),
+}
+
+LEGACY_SUFFIX = '_legacy'
+DEFAULT_SUFFIX = '_default'
+
+
+def comments_since(post_created_at):
+    """
+    Возвращает нижнюю границу created_at для комментариев к посту.
+
+    Args:
+        post_created_at: Дата создания самого старого из постов
+
+    Returns:
+        datetime: Граница с запасом CLOCK_SKEW_MARGIN
+    """
+    return post_created_at - CLOCK_SKEW_MARGIN
+
+
+def month_start(value):
+    """Возвращает первое число месяца для даты или даты-времени."""
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    """Сдвигает первое число месяца на указанное число месяцев."""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    """Возвращает имя помесячной секции, например posts_comment_p2026_10."""
+    return f'{table}_p{month:%Y_%m}'
+
+
+def _truncate(name, suffix):
+    """Добавляет суффикс к имени, укладываясь в 63 байта PostgreSQL."""
+    return name[:63 - len(suffix)] + suffix
+
+
+def is_partitioned(cursor, table):
+    """
+    Проверяет, секционирована ли таблица.
+
+    Args:
+        cursor: Курсор подключения PostgreSQL
+        table: Имя таблицы
+
+    Returns:
+        bool: True для секционированной таблицы
+    """
+    cursor.execute(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table]
+    )
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def list_partitions(cursor, table):
+    """
+    Возвращает секции таблицы с их границами.
+
+    Args:
+        cursor: Курсор подключения PostgreSQL
+        table: Имя секционированной таблицы
+
+    Returns:
+        list: Кортежи (имя, нижняя граница, верхняя граница) с датами;
+        для секции по умолчанию и открытых границ значения равны None
+    """
+    cursor.execute(
+        """
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        ORDER BY child.relname
+        """,
+        [table]
+    )
+    partitions = []
+    for name, bound in cursor.fetchall():
+        lower = upper = None
+        if bound.startswith('FOR VALUES FROM'):
+            values = bound[len('FOR VALUES FROM ('):-1].split(') TO (')
+            lower, upper = [
+                None if value == 'MINVALUE'
+                else datetime.date.fromisoformat(value.strip("'")[:10])
+                for value in values
+            ]
+        partitions.append((name, lower, upper))
+    return partitions
+
+
+def create_partition_sql(table, month, quote):
+    """
+    Возвращает SQL создания секции за месяц, если ее еще нет.
+
+    Args:
+        table: Имя секционированной таблицы
+        month: Первое число месяца
+        quote: Функция экранирования имен (connection.ops.quote_name)
+
+    Returns:
+        str: Команда CREATE TABLE ... PARTITION OF
+    """
+    return (
+        f'CREATE TABLE IF NOT EXISTS {quote(partition_name(table, month))} '
+        f'PARTITION OF {quote(table)} '
+        f"FOR VALUES FROM ('{month.isoformat()}') "
+        f"TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def convert_sql(cursor, table, key, boundary, quote):
+    """
+    Возвращает SQL превращения обычной таблицы в секционированную.
+
+    Таблица переименовывается в ``<table>_legacy`` и подключается как
+    секция с границами от MINVALUE до ``boundary``. Первичный ключ
+    и уникальные ограничения дополняются ключом секционирования,
+    внешние ключи и индексы переносятся на новую таблицу, id
+    продолжает выдаваться из новой последовательности.
+
+    Args:
+        cursor: Курсор подключения PostgreSQL
+        table: Имя таблицы
+        key: Столбец ключа секционирования
+        boundary: Первое число месяца, с которого начинаются новые секции
+        quote: Функция экранирования имен (connection.ops.quote_name)
+
+    Returns:
+        list: Команды SQL в порядке выполнения
+    """
+    legacy = _truncate(table, LEGACY_SUFFIX)
+    sequence = _truncate(table, '_part_id_seq')
+
+    cursor.execute(
+        """
+        SELECT conname, contype, pg_get_constraintdef(oid),
+               ARRAY(
+                   SELECT a.attname
+                   FROM unnest(conkey) WITH ORDINALITY AS k(attnum, n)
+                   JOIN pg_attribute a
+                       ON a.attrelid = conrelid AND a.attnum = k.attnum
+                   ORDER BY k.n
+               )
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f')
+        ORDER BY conname
+        """,
+        [table]
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename = %s AND indexname NOT IN (
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = to_regclass(%s)
+        )
+        ORDER BY indexname
+        """,
+        [table, table]
+    )
+    indexes = cursor.fetchall()
+
+    statements = [f'ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}']
+    for name, _, _, _ in constraints:
+        statements.append(
+            f'ALTER TABLE {quote(legacy)} RENAME CONSTRAINT {quote(name)} '
+            f'TO {quote(_truncate(name, LEGACY_SUFFIX))}'
+        )
+    for name, _ in indexes:
+        statements.append(
+            f'ALTER INDEX {quote(name)} '
+            f'RENAME TO {quote(_truncate(name, LEGACY_SUFFIX))}'
+        )
+
+    statements += [
+        f'CREATE TABLE {quote(table)} (LIKE {quote(legacy)} '
+        f'INCLUDING DEFAULTS INCLUDING STORAGE) '
+        f'PARTITION BY RANGE ({quote(key)})',
+        f'CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.id',
+        f"SELECT setval('{sequence}', "
+        f'COALESCE((SELECT max(id) FROM {quote(legacy)}), 0) + 1, false)',
+        f'ALTER TABLE {quote(legacy)} ALTER COLUMN id '
+        f'DROP IDENTITY IF EXISTS',
+        f'ALTER TABLE {quote(legacy)} ALTER COLUMN id DROP DEFAULT',
+        f'ALTER TABLE {quote(table)} ALTER COLUMN id '
+        f"SET DEFAULT nextval('{sequence}')",
+    ]
+
+    for name, kind, definition, columns in constraints:
+        if kind == 'f':
+            statements.append(
+                f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} '
+                f'{definition}'
+            )
+            continue
+        if key not in columns:
+            columns = [*columns, key]
+        column_list = ', '.join(quote(column) for column in columns)
+        constraint = 'PRIMARY KEY' if kind == 'p' else 'UNIQUE'
+        statements += [
+            f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} '
+            f'{constraint} ({column_list})',
+            f'ALTER TABLE {quote(legacy)} DROP CONSTRAINT '
+            f'{quote(_truncate(name, LEGACY_SUFFIX))}',
+        ]
+
+    for name, definition in indexes:
+        method = definition[definition.index(' USING '):]
+        statements.append(
+            f'CREATE INDEX {quote(name)} ON {quote(table)}{method}'
+        )
+
+    statements += [
+        f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(legacy)} '
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')",
+        f'CREATE TABLE {quote(_truncate(table, DEFAULT_SUFFIX))} '
+        f'PARTITION OF {quote(table)} DEFAULT',
+    ]
+    return statements
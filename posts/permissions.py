@@ -0,0 +1,76 @@
+"""
+Права доступа к объектам.
+
+Владелец объекта определяется в том же запросе, которым объект
+загружается: queryset аннотируется флагом is_owner (owned_by), поэтому
+проверка прав не загружает ни пост, ни автора отдельными запросами.
+"""
+from django.db.models import BooleanField, ExpressionWrapper, Q, Value
+from rest_framework import permissions
+
+
+def owned_by(queryset, user, owner_field):
+    """
+    Добавляет к queryset флаг is_owner: принадлежит ли объект user.
+
+    Args:
+        queryset: Исходный queryset
+        user: Текущий пользователь (может быть анонимным)
+        owner_field: Путь к пользователю-владельцу, например 'author'
+            или 'post__author'
+
+    Returns:
+        QuerySet: queryset с аннотацией is_owner
+    """
+    if user.is_authenticated:
+        condition = Q(**{owner_field: user.pk})
+    else:
+        condition = Value(False)
+    return queryset.annotate(
+        is_owner=ExpressionWrapper(condition, output_field=BooleanField())
+    )
+
+
+class IsOwnerOrStaff(permissions.BasePermission):
+    """
+    Изменять объект может только его владелец или сотрудник.
+
+    Безопасные методы разрешены всем. Объект должен быть загружен
+    из queryset, обработанного owned_by (см. OwnerScopedMixin).
+    """
+
+    message = 'У вас нет прав на изменение этого объекта.'
+
+    def has_object_permission(self, request, view, obj):
+        """
+        Проверяет права на объект без дополнительных запросов.
+
+        Args:
+            request: HTTP-запрос
+            view: Представление
+            obj: Объект с аннотацией is_owner
+
+        Returns:
+            bool: True, если доступ разрешен
+        """
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return bool(request.user.is_staff or getattr(obj, 'is_owner', False))
+
+
+class OwnerScopedMixin:
+    """
+    Примесь к generic-представлениям: аннотирует queryset флагом
+    is_owner для IsOwnerOrStaff.
+
+    Attributes:
+        owner_field: Путь к пользователю-владельцу объекта
+    """
+
+    owner_field = 'author'
+
+    def get_queryset(self):
+        """Возвращает queryset с флагом is_owner для текущего пользователя."""
+        return owned_by(
+            super().get_queryset(), self.request.user, self.owner_field
+        )
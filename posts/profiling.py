@@ -0,0 +1,191 @@
+"""
+Профилирование отдельных запросов.
+
+Запрос профилируется, если его прислал сотрудник с заголовком
+``X-Profile: 1`` или параметром ``?profile=1``, либо если он попал
+в выборку «один из PROFILE_SAMPLE_RATE». Профиль (cProfile или,
+при PROFILER = 'pyinstrument', pyinstrument) и список SQL-запросов
+с длительностью сохраняются в PROFILE_DIR; имя файлов возвращается
+в заголовке ответа X-Profile-Id.
+
+Профилируется синхронная обработка запроса (WSGI, manage.py
+profile_endpoint). Тело потокового ответа в профиль не входит.
+"""
+import cProfile
+import json
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+
+
+class QueryCollector:
+    """
+    Обертка выполнения SQL (connection.execute_wrapper), которая
+    запоминает каждый запрос и его длительность.
+
+    Attributes:
+        queries: Список словарей sql, time (секунды), many
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """Выполняет запрос и записывает его длительность."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'time': time.perf_counter() - started,
+                'many': many,
+            })
+
+
+@contextmanager
+def capture_queries():
+    """
+    Собирает SQL-запросы всех соединений внутри блока.
+
+    Yields:
+        QueryCollector: Сборщик с накопленными запросами
+    """
+    collector = QueryCollector()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(collector))
+        yield collector
+
+
+def _requested_by_staff(request):
+    """
+    Проверяет, что флаг профилирования прислал сотрудник.
+
+    JWT проверяется здесь же: DRF аутентифицирует пользователя позже,
+    внутри представления.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except Exception:
+        return False
+    return result is not None and result[0].is_staff
+
+
+def should_profile(request):
+    """
+    Решает, профилировать ли запрос.
+
+    Args:
+        request: HTTP-запрос Django
+
+    Returns:
+        bool: True для запроса сотрудника с флагом или попавшего
+        в выборку PROFILE_SAMPLE_RATE
+    """
+    flagged = (
+        request.META.get(PROFILE_HEADER) == '1'
+        or request.GET.get(PROFILE_PARAM) == '1'
+    )
+    if flagged and _requested_by_staff(request):
+        return True
+    rate = settings.PROFILE_SAMPLE_RATE
+    return rate > 0 and random.random() < 1 / rate
+
+
+class RequestProfiler:
+    """
+    Профиль одного запроса: время функций и SQL-запросы.
+
+    Attributes:
+        name: Базовое имя файлов профиля
+    """
+
+    def __init__(self, request):
+        slug = re.sub(r'[^\w]+', '-', request.path).strip('-') or 'root'
+        self.name = '{}-{}-{}-{}'.format(
+            timezone.now().strftime('%Y%m%d-%H%M%S'),
+            request.method.lower(), slug[:60], uuid.uuid4().hex[:8]
+        )
+        self.request = request
+        self.queries = []
+        self.elapsed = 0.0
+        if settings.PROFILER == 'pyinstrument' and pyinstrument:
+            self._profiler = pyinstrument.Profiler()
+            self._start = self._profiler.start
+            self._stop = self._profiler.stop
+        else:
+            self._profiler = cProfile.Profile()
+            self._start = self._profiler.enable
+            self._stop = self._profiler.disable
+
+    @contextmanager
+    def capture(self):
+        """Профилирует код внутри блока."""
+        started = time.perf_counter()
+        with capture_queries() as collector:
+            self._start()
+            try:
+                yield self
+            finally:
+                self._stop()
+                self.elapsed = time.perf_counter() - started
+                self.queries = collector.queries
+
+    def save(self, status_code=None):
+        """
+        Сохраняет профиль и SQL-запросы в PROFILE_DIR.
+
+        Создаются файлы <name>.prof (cProfile, читается pstats или
+        snakeviz) или <name>.html (pyinstrument) и <name>.json
+        со сведениями о запросе и списком SQL.
+
+        Args:
+            status_code: Код ответа
+
+        Returns:
+            str: Базовое имя файлов
+        """
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        if isinstance(self._profiler, cProfile.Profile):
+            self._profiler.dump_stats(directory / f'{self.name}.prof')
+        else:
+            (directory / f'{self.name}.html').write_text(
+                self._profiler.output_html(), encoding='utf-8'
+            )
+        summary = {
+            'method': self.request.method,
+            'path': self.request.get_full_path(),
+            'status': status_code,
+            'elapsed': self.elapsed,
+            'sql_count': len(self.queries),
+            'sql_time': sum(query['time'] for query in self.queries),
+            'queries': self.queries,
+        }
+        (directory / f'{self.name}.json').write_text(
+            json.dumps(summary, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
+        return self.name
@@ -0,0 +1,75 @@
+"""
+Рейтинг «горячих» постов для ленты ``/api/posts/?ordering=hot``.
+
+    hot_score = log10(max(вовлеченность, 1))
+                + (created_at - HOT_EPOCH) / HOT_DECAY_SECONDS
+
+Вовлеченность — лайки плюс комментарии с весом COMMENT_WEIGHT. Второе
+слагаемое растет со временем создания: пост, опубликованный на
+HOT_DECAY_SECONDS секунд позже, равен посту с вдесятеро большей
+вовлеченностью. Поэтому старение не требует пересчета, а счет меняется
+только при лайке или комментарии и хранится в индексированном столбце.
+"""
+import datetime
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Log
+
+
+HOT_EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+HOT_DECAY_SECONDS = 45000
+COMMENT_WEIGHT = 2
+
+
+def hot_score(likes, comments, created_at):
+    """
+    Вычисляет рейтинг поста.
+
+    Args:
+        likes: Количество лайков
+        comments: Количество комментариев
+        created_at: Дата создания поста
+
+    Returns:
+        float: Рейтинг
+    """
+    engagement = likes + COMMENT_WEIGHT * comments
+    age = (created_at - HOT_EPOCH).total_seconds()
+    return math.log10(max(engagement, 1)) + age / HOT_DECAY_SECONDS
+
+
+def _log_engagement(likes, comments):
+    """Возвращает SQL-выражение log10(max(вовлеченность, 1))."""
+    return Log(
+        Value(10.0),
+        Greatest(likes + COMMENT_WEIGHT * comments, Value(1)),
+        output_field=FloatField()
+    )
+
+
+def engagement_update(likes=0, comments=0):
+    """
+    Возвращает аргументы UPDATE, меняющие счетчики и рейтинг поста.
+
+    Рейтинг пересчитывается в том же запросе: из него вычитается
+    слагаемое со старыми счетчиками и прибавляется с новыми (в SET
+    столбцы читаются до изменения), поэтому параллельные лайки
+    не теряются.
+
+    Args:
+        likes: Изменение количества лайков
+        comments: Изменение количества комментариев
+
+    Returns:
+        dict: Аргументы для QuerySet.update()
+    """
+    old = _log_engagement(F('likes_count'), F('comments_count'))
+    new = _log_engagement(
+        F('likes_count') + likes, F('comments_count') + comments
+    )
+    return {
+        'likes_count': F('likes_count') + likes,
+        'comments_count': F('comments_count') + comments,
+        'hot_score': F('hot_score') - old + new,
+    }
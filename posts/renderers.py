@@ -0,0 +1,100 @@
+"""
+Рендеринг JSON для REST API.
+
+Если установлен ``orjson``, данные кодируются им, иначе используется
+стандартный модуль ``json`` с теми же настройками, что и в DRF.
+"""
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_encoder = encoders.JSONEncoder()
+
+
+def dumps(data):
+    """
+    Кодирует данные в компактный JSON.
+
+    Даты и прочие нестандартные типы кодируются так же, как в
+    ``rest_framework.utils.encoders.JSONEncoder``.
+
+    Args:
+        data: Данные для кодирования
+
+    Returns:
+        bytes: JSON в кодировке UTF-8
+    """
+    if orjson is not None:
+        ret = orjson.dumps(
+            data,
+            default=_encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Как и DRF, экранируем U+2028 и U+2029 для совместимости с JS
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+    ret = json.dumps(
+        data, cls=encoders.JSONEncoder, ensure_ascii=False,
+        allow_nan=False, separators=(',', ':')
+    )
+    ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+    return ret.encode()
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSON-рендерер на базе orjson с откатом на стандартный рендерер DRF.
+
+    Запросы с отступами (``indent``) и окружения без orjson
+    обрабатываются родительским классом.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Преобразует данные в JSON."""
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+def iter_json_array(batches):
+    """
+    Постепенно кодирует JSON-массив из пачек элементов.
+
+    Args:
+        batches: Итерируемый объект со списками элементов
+
+    Yields:
+        bytes: Части JSON-массива
+    """
+    yield b'['
+    first = True
+    for batch in batches:
+        if not batch:
+            continue
+        body = dumps(batch)[1:-1]
+        yield body if first else b',' + body
+        first = False
+    yield b']'
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """
+    Потоковый ответ с JSON-массивом, который не собирается целиком в памяти.
+    """
+
+    def __init__(self, batches, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(iter_json_array(batches), **kwargs)
@@ -1,7 +1,12 @@
 import os
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Post, PostImage, Comment, Like
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .exceptions import PreconditionFailed
+from .models import (
+    Post, PostImage, Comment, Like, UserStats, Notification
+)
+from .uploads import ALLOWED_EXTENSIONS, MAX_UPLOAD_FILES, MAX_UPLOAD_SIZE
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -114,6 +119,38 @@ class CommentSerializer(serializers.ModelSerializer):
         return data
 
 
+class UserStatsSerializer(serializers.ModelSerializer):
+    username = serializers.ReadOnlyField(source='user.username')
+
+    class Meta:
+        model = UserStats
+        fields = [
+            'username', 'posts_count', 'likes_received', 'comments_received'
+        ]
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    last_actor = serializers.ReadOnlyField(source='last_actor.username')
+    message = serializers.SerializerMethodField()
+    updated_at = serializers.DateTimeField(
+        format='%Y-%m-%d %H:%M:%S',
+        read_only=True
+    )
+
+    class Meta:
+        model = Notification
+        fields = [
+            'id', 'verb', 'post', 'count', 'last_actor', 'message',
+            'is_read', 'updated_at'
+        ]
+
+    def get_message(self, obj):
+        """Возвращает текст уведомления."""
+        if obj.verb == Notification.LIKE:
+            return f'Ваш пост оценили: {obj.count}'
+        return f'Новых комментариев к вашему посту: {obj.count}'
+
+
 class LikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Like
@@ -124,6 +161,7 @@ class LikeSerializer(serializers.ModelSerializer):
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
     images = serializers.SerializerMethodField()
+    image_details = serializers.SerializerMethodField()
     comments = CommentSerializer(many=True, read_only=True)
     likes_count = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(
@@ -135,14 +173,14 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = [
-            'id', 'author', 'text', 'images', 'created_at',
-            'comments', 'likes_count', 'can_edit'
+            'id', 'author', 'text', 'images', 'image_details',
+            'created_at', 'comments', 'likes_count', 'can_edit'
         ]
         read_only_fields = ['id', 'created_at', 'likes_count']
 
     def get_likes_count(self, obj):
         """Возвращает количество лайков для поста."""
-        return obj.likes.count()
+        return obj.likes_count
 
     def get_can_edit(self, obj):
         """
@@ -156,6 +194,12 @@ class PostSerializer(serializers.ModelSerializer):
         """
         Возвращает список URL изображений поста.
         """
+        return [image['url'] for image in self.get_image_details(obj)]
+
+    def get_image_details(self, obj):
+        """
+        Возвращает список изображений поста с URL и метаданными.
+        """
         request = self.context.get('request')
         images = obj.images.all()
         result = []
@@ -166,7 +210,14 @@ class PostSerializer(serializers.ModelSerializer):
                     url = image.image.url
                     if request:
                         url = request.build_absolute_uri(url)
-                    result.append(url)
+                    result.append({
+                        'url': url,
+                        'width': image.width,
+                        'height': image.height,
+                        'format': image.format,
+                        'size': image.file_size,
+                        'placeholder': image.placeholder,
+                    })
             except ValueError:
                 # Если файл отсутствует, пропускаем его
                 continue
@@ -193,21 +244,66 @@ class PostSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Необходимо загрузить не более 10 изображений."
             )
-        for image_data in images_data:
-            PostImage.objects.create(post=post, image=image_data)
+        try:
+            for image_data in images_data:
+                PostImage.objects.create(post=post, image=image_data)
+        except DjangoValidationError as e:
+            post.delete()
+            raise serializers.ValidationError({'images': e.messages})
         return post
 
     def update(self, instance, validated_data):
         """
         Обновляет существующий пост и добавляет новые изображения.
+
+        Текст меняется условным UPDATE по версии поста (Post.edit),
+        прежний текст сохраняется в историю.
+
+        Raises:
+            PreconditionFailed: Если пост изменили после чтения
         """
-        # Обновляем текст
-        instance.text = validated_data.get('text', instance.text)
-        instance.save()
+        editor = validated_data.pop('editor', None)
+        text = validated_data.get('text', instance.text)
+        if not instance.edit(text, instance.version, editor):
+            raise PreconditionFailed()
 
         # Обработка новых изображений
         if 'images' in self.context.get('request').FILES:
             for image in self.context.get('request').FILES.getlist('images'):
-                PostImage.objects.create(post=instance, image=image)
+                try:
+                    PostImage.objects.create(post=instance, image=image)
+                except DjangoValidationError as e:
+                    raise serializers.ValidationError({'images': e.messages})
 
         return instance
+
+
+class UploadFileSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1, max_value=MAX_UPLOAD_SIZE)
+
+    def validate_name(self, value):
+        """
+        Проверяет расширение файла изображения.
+        """
+        extension = os.path.splitext(value)[1].lower()
+        if extension not in ALLOWED_EXTENSIONS:
+            raise serializers.ValidationError(
+                "Неподдерживаемый формат изображения. "
+                "Допустимые форматы: JPG, JPEG, PNG, GIF, WEBP"
+            )
+        return value
+
+
+class UploadSlotsSerializer(serializers.Serializer):
+    files = UploadFileSerializer(
+        many=True, min_length=1, max_length=MAX_UPLOAD_FILES
+    )
+
+
+class FinalizeImagesSerializer(serializers.Serializer):
+    uploads = serializers.ListField(
+        child=serializers.CharField(max_length=512),
+        min_length=1,
+        max_length=MAX_UPLOAD_FILES
+    )
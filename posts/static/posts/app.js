@@ -24,6 +24,15 @@ document.addEventListener('DOMContentLoaded', () => {
     // Инициализированные Swiper-карусели
     const swiperInstances = [];
 
+    // Посты текущей страницы по ID (для точечного обновления из событий)
+    const postsById = new Map();
+
+    // Подключен ли поток событий ленты
+    let liveUpdates = false;
+
+    // Интервал загрузки ленты, когда поток событий недоступен (мс)
+    const POLL_INTERVAL = 30000;
+
     /**
      * Показывает индикатор загрузки
      * @param {HTMLElement} element - Элемент, к которому прикрепляется индикатор
@@ -161,78 +170,82 @@ document.addEventListener('DOMContentLoaded', () => {
     };
 
     /**
-     * Отрисовывает список постов на странице
-     * @param {Array} posts - Массив объектов постов
+     * Возвращает подпись кнопки лайка
+     * @param {number} count - Количество лайков
+     * @returns {string} - Текст кнопки
      */
-    const renderPosts = (posts) => {
-        // Уничтожаем старые карусели
-        swiperInstances.forEach(swiper => swiper.destroy());
-        swiperInstances.length = 0;
-
-        if (!posts || posts.length === 0) {
-            elements.postsContainer.innerHTML = '<p class="no-posts">Пока нет постов</p>';
-            return;
-        }
+    const likeLabel = (count) => `❤️ ${count} ${count === 1 ? 'лайк' : 'лайков'}`;
 
-        elements.postsContainer.innerHTML = posts.map(post => `
-            <div class="post" data-id="${post.id}">
-                <div class="post-header">
-                    <h3>${post.author}</h3>
-                    ${post.can_edit ? `
-                        <div class="post-actions">
-                            <button class="edit-post-btn" data-id="${post.id}">✏️</button>
-                            <button class="delete-post-btn" data-id="${post.id}">🗑️</button>
-                        </div>
-                    ` : ''}
-                </div>
-                <p class="post-text">${post.text}</p>
-                ${post.images && post.images.length ? `
-                    <div class="swiper post-images">
-                        <div class="swiper-wrapper">
-                            ${post.images.map(img => `
-                                <div class="swiper-slide">
-                                    <img src="${img}" 
-                                        loading="lazy" 
-                                        alt="Изображение поста ${post.author}"
-                                        onerror="this.src='${DEFAULT_IMAGE}';this.onerror=null;"
-                                        class="post-image">
-                                </div>
-                            `).join('')}
-                        </div>
-                        <div class="swiper-pagination"></div>
-                        <div class="swiper-button-prev"></div>
-                        <div class="swiper-button-next"></div>
+    /**
+     * Возвращает HTML-разметку одного поста
+     * @param {Object} post - Объект поста
+     * @returns {string} - Разметка поста
+     */
+    const postHtml = (post) => `
+        <div class="post" data-id="${post.id}">
+            <div class="post-header">
+                <h3>${post.author}</h3>
+                ${post.can_edit ? `
+                    <div class="post-actions">
+                        <button class="edit-post-btn" data-id="${post.id}">✏️</button>
+                        <button class="delete-post-btn" data-id="${post.id}">🗑️</button>
                     </div>
                 ` : ''}
-                <p class="post-date">${new Date(post.created_at).toLocaleString('ru-RU', { timeZone: 'Europe/Moscow' })}</p>
-                <button class="like-btn" data-id="${post.id}" ${!localStorage.getItem('access_token') ? 'disabled' : ''}>
-                    ❤️ ${post.likes_count} ${post.likes_count === 1 ? 'лайк' : 'лайков'}
-                </button>
-                <div class="comments">
-                    <h5>Комментарии (${post.comments ? post.comments.length : 0})</h5>
-                    ${(post.comments || []).map(comment => `
-                        <div class="comment">
-                            <strong>${comment.author}:</strong> ${comment.text}
-                            <small>${new Date(comment.created_at).toLocaleString('ru-RU', { timeZone: 'Europe/Moscow' })}</small>
-                            ${localStorage.getItem('access_token') ? (
-                                post.can_edit ? `
-                                    <button class="btn btn-link text-danger ms-auto delete-comment-btn" data-id="${comment.id}">❌ Удалить</button>
-                                ` : ''
-                            ) : ''}
-                        </div>
-                    `).join('')}
-                    ${localStorage.getItem('access_token') ? `
-                        <form class="comment-form" data-id="${post.id}">
-                            <input type="text" placeholder="Ваш комментарий" required>
-                            <button type="submit">Отправить</button>
-                        </form>
-                    ` : '<p>Зарегистрируйтесь и войдите, чтобы оставить комментарий или поставить лайк</p>'}
+            </div>
+            <p class="post-text">${post.text}</p>
+            ${post.image_details && post.image_details.length ? `
+                <div class="swiper post-images">
+                    <div class="swiper-wrapper">
+                        ${post.image_details.map(img => `
+                            <div class="swiper-slide">
+                                <img src="${img.url}" 
+                                    loading="lazy" 
+                                    ${img.width && img.height ? `width="${img.width}" height="${img.height}"` : ''}
+                                    ${img.placeholder ? `style="background: url('${img.placeholder}') center / cover no-repeat"` : ''}
+                                    alt="Изображение поста ${post.author}"
+                                    onerror="this.src='${DEFAULT_IMAGE}';this.onerror=null;"
+                                    class="post-image">
+                            </div>
+                        `).join('')}
+                    </div>
+                    <div class="swiper-pagination"></div>
+                    <div class="swiper-button-prev"></div>
+                    <div class="swiper-button-next"></div>
                 </div>
+            ` : ''}
+            <p class="post-date">${new Date(post.created_at).toLocaleString('ru-RU', { timeZone: 'Europe/Moscow' })}</p>
+            <button class="like-btn" data-id="${post.id}" ${!localStorage.getItem('access_token') ? 'disabled' : ''}>
+                ${likeLabel(post.likes_count)}
+            </button>
+            <div class="comments">
+                <h5>Комментарии (${post.comments ? post.comments.length : 0})</h5>
+                ${(post.comments || []).map(comment => `
+                    <div class="comment">
+                        <strong>${comment.author}:</strong> ${comment.text}
+                        <small>${new Date(comment.created_at).toLocaleString('ru-RU', { timeZone: 'Europe/Moscow' })}</small>
+                        ${localStorage.getItem('access_token') ? (
+                            post.can_edit ? `
+                                <button class="btn btn-link text-danger ms-auto delete-comment-btn" data-id="${comment.id}">❌ Удалить</button>
+                            ` : ''
+                        ) : ''}
+                    </div>
+                `).join('')}
+                ${localStorage.getItem('access_token') ? `
+                    <form class="comment-form" data-id="${post.id}">
+                        <input type="text" placeholder="Ваш комментарий" required>
+                        <button type="submit">Отправить</button>
+                    </form>
+                ` : '<p>Зарегистрируйтесь и войдите, чтобы оставить комментарий или поставить лайк</p>'}
             </div>
-        `).join('');
+        </div>
+    `;
 
-        // Инициализация каруселей
-        document.querySelectorAll('.swiper').forEach(swiperEl => {
+    /**
+     * Инициализирует карусели изображений внутри элемента
+     * @param {HTMLElement} root - Элемент, в котором ищутся карусели
+     */
+    const initSwipers = (root) => {
+        root.querySelectorAll('.swiper').forEach(swiperEl => {
             const swiper = new Swiper(swiperEl, {
                 loop: true,
                 pagination: {
@@ -255,13 +268,31 @@ document.addEventListener('DOMContentLoaded', () => {
             });
             swiperInstances.push(swiper);
         });
+    };
 
-        // Назначение обработчиков событий
-        document.querySelectorAll('.like-btn').forEach(btn => {
+    /**
+     * Уничтожает карусели изображений внутри элемента
+     * @param {HTMLElement} root - Элемент, в котором ищутся карусели
+     */
+    const destroySwipers = (root) => {
+        for (let i = swiperInstances.length - 1; i >= 0; i--) {
+            if (root.contains(swiperInstances[i].el)) {
+                swiperInstances[i].destroy();
+                swiperInstances.splice(i, 1);
+            }
+        }
+    };
+
+    /**
+     * Назначает обработчики событий элементам постов
+     * @param {HTMLElement} root - Элемент, содержащий посты
+     */
+    const bindPostHandlers = (root) => {
+        root.querySelectorAll('.like-btn').forEach(btn => {
             btn.addEventListener('click', () => handleLike(btn.dataset.id));
         });
 
-        document.querySelectorAll('.comment-form').forEach(form => {
+        root.querySelectorAll('.comment-form').forEach(form => {
             form.addEventListener('submit', (e) => {
                 e.preventDefault();
                 const input = form.querySelector('input');
@@ -270,11 +301,11 @@ document.addEventListener('DOMContentLoaded', () => {
             });
         });
 
-        document.querySelectorAll('.edit-post-btn').forEach(btn => {
+        root.querySelectorAll('.edit-post-btn').forEach(btn => {
             btn.addEventListener('click', () => showEditForm(btn.dataset.id));
         });
 
-        document.querySelectorAll('.delete-comment-btn').forEach(btn => {
+        root.querySelectorAll('.delete-comment-btn').forEach(btn => {
             btn.addEventListener('click', async () => {
                 const commentId = btn.dataset.id;
                 const postId = btn.closest('.post').dataset.id;
@@ -298,7 +329,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     }
 
                     alert('Комментарий успешно удален');
-                    await fetchPosts(); // Обновляем список постов
+                    await refreshIfOffline(); // Обновляем список постов
                 } catch (error) {
                     console.error('Error:', error);
                     showError(error.message);
@@ -306,7 +337,7 @@ document.addEventListener('DOMContentLoaded', () => {
             });
         });
 
-        document.querySelectorAll('.delete-post-btn').forEach(btn => {
+        root.querySelectorAll('.delete-post-btn').forEach(btn => {
             btn.addEventListener('click', async () => {
                 const postId = btn.dataset.id;
 
@@ -331,7 +362,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     }
 
                     showError(result.message || 'Пост успешно удален'); // Показываем сообщение
-                    await fetchPosts(); // Обновляем список
+                    await refreshIfOffline(); // Обновляем список
                 } catch (error) {
                     console.error('Error:', error);
                     showError(error.message);
@@ -340,6 +371,243 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     };
 
+    /**
+     * Отрисовывает список постов на странице
+     * @param {Array} posts - Массив объектов постов
+     */
+    const renderPosts = (posts) => {
+        // Уничтожаем старые карусели
+        swiperInstances.forEach(swiper => swiper.destroy());
+        swiperInstances.length = 0;
+
+        postsById.clear();
+        (posts || []).forEach(post => postsById.set(post.id, post));
+
+        if (!posts || posts.length === 0) {
+            elements.postsContainer.innerHTML = '<p class="no-posts">Пока нет постов</p>';
+            return;
+        }
+
+        elements.postsContainer.innerHTML = posts.map(postHtml).join('');
+        initSwipers(elements.postsContainer);
+        bindPostHandlers(elements.postsContainer);
+    };
+
+    /**
+     * Создает DOM-элемент поста с обработчиками событий.
+     * Карусели инициализируются после вставки элемента в документ.
+     * @param {Object} post - Объект поста
+     * @returns {HTMLElement} - Элемент поста
+     */
+    const createPostElement = (post) => {
+        const wrapper = document.createElement('div');
+        wrapper.innerHTML = postHtml(post).trim();
+        const element = wrapper.firstElementChild;
+        bindPostHandlers(element);
+        return element;
+    };
+
+    /**
+     * Перерисовывает один пост, не перезагружая ленту
+     * @param {Object} post - Обновленный объект поста
+     */
+    const patchPost = (post) => {
+        postsById.set(post.id, post);
+        const current = elements.postsContainer.querySelector(`.post[data-id="${post.id}"]`);
+        if (!current) return;
+        destroySwipers(current);
+        const element = createPostElement(post);
+        current.replaceWith(element);
+        initSwipers(element);
+    };
+
+    /**
+     * Загружает один пост от имени текущего пользователя
+     * @param {number} postId - ID поста
+     * @returns {Promise<Object|null>} - Пост или null, если он недоступен
+     */
+    const fetchPost = async (postId) => {
+        const headers = {};
+        const token = localStorage.getItem('access_token');
+        if (token) headers['Authorization'] = `Bearer ${token}`;
+        const response = await fetch(`${API_BASE_URL}/posts/${postId}/`, { headers });
+        return response.ok ? response.json() : null;
+    };
+
+    /**
+     * Применяет событие из потока /api/events/ к отображаемой ленте.
+     * События содержат только ID поста: новый или измененный пост
+     * загружается отдельным запросом
+     * @param {Object} event - Событие с полем type
+     */
+    const applyEvent = async (event) => {
+        const postId = event.post_id;
+        const post = postsById.get(postId);
+
+        switch (event.type) {
+            case 'post_created': {
+                if (currentPage !== 1 || post) return;
+                const created = await fetchPost(postId);
+                if (!created || postsById.has(postId)) return;
+                if (!postsById.size) {
+                    renderPosts([created]);
+                    return;
+                }
+                postsById.set(created.id, created);
+                const element = createPostElement(created);
+                elements.postsContainer.prepend(element);
+                initSwipers(element);
+                break;
+            }
+            case 'post_updated': {
+                if (!post) return;
+                const updated = await fetchPost(postId);
+                if (updated && postsById.has(postId)) patchPost(updated);
+                break;
+            }
+            case 'post_deleted': {
+                if (!post) return;
+                postsById.delete(postId);
+                const element = elements.postsContainer.querySelector(`.post[data-id="${postId}"]`);
+                if (element) {
+                    destroySwipers(element);
+                    element.remove();
+                }
+                break;
+            }
+            case 'like_changed': {
+                if (!post) return;
+                post.likes_count = event.likes_count;
+                const button = elements.postsContainer.querySelector(`.like-btn[data-id="${postId}"]`);
+                if (button) button.textContent = likeLabel(event.likes_count);
+                break;
+            }
+            case 'comment_added':
+                if (!post || post.comments.some(c => c.id === event.comment.id)) return;
+                patchPost({ ...post, comments: [...post.comments, event.comment] });
+                break;
+            case 'comment_removed':
+                if (!post) return;
+                patchPost({ ...post, comments: post.comments.filter(c => c.id !== event.comment_id) });
+                break;
+        }
+    };
+
+    /**
+     * Периодически загружает ленту, пока вкладка открыта.
+     * Используется, если поток событий недоступен
+     */
+    const startPolling = () => {
+        setInterval(() => {
+            if (!document.hidden) fetchPosts(currentPage);
+        }, POLL_INTERVAL);
+    };
+
+    /**
+     * Подключается к потоку событий ленты.
+     * После переподключения лента загружается заново, чтобы не пропустить изменения.
+     * Если сервер не поддерживает поток (ответ 204 вне ASGI), лента
+     * загружается периодически.
+     */
+    const connectEvents = () => {
+        if (!window.EventSource) {
+            startPolling();
+            return;
+        }
+        const source = new EventSource(`${API_BASE_URL}/events/`);
+        let disconnected = false;
+
+        source.onopen = () => {
+            liveUpdates = true;
+            if (disconnected) {
+                disconnected = false;
+                fetchPosts(currentPage);
+            }
+        };
+        source.onerror = () => {
+            liveUpdates = false;
+            disconnected = true;
+            // Браузер не переподключается после 204 или ошибки HTTP
+            if (source.readyState === EventSource.CLOSED) startPolling();
+        };
+        source.onmessage = (message) => {
+            try {
+                applyEvent(JSON.parse(message.data)).catch(error => {
+                    console.error('Error:', error);
+                });
+            } catch (error) {
+                console.error('Error:', error);
+            }
+        };
+    };
+
+    /**
+     * Перезагружает ленту, только если поток событий недоступен
+     */
+    const refreshIfOffline = async () => {
+        if (!liveUpdates) await fetchPosts(currentPage);
+    };
+
+    /**
+     * Загружает изображения напрямую в хранилище по подписанным ссылкам.
+     * Сервер приложения получает только JSON-запросы: байты файлов
+     * отправляются по ссылкам. Вызывается до создания или изменения
+     * поста, чтобы неудачная загрузка не оставила пост без изображений
+     * @param {File[]} files - Файлы изображений
+     * @param {string} token - JWT-токен доступа
+     * @returns {Promise<string[]>} ID загрузок для attachImages
+     */
+    const stageImages = async (files, token) => {
+        if (!files.length) return [];
+
+        const slotsResponse = await fetch(`${API_BASE_URL}/uploads/`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                files: files.map(file => ({ name: file.name, size: file.size }))
+            })
+        });
+        if (!slotsResponse.ok) {
+            const errorData = await slotsResponse.json();
+            throw new Error(errorData.detail || 'Ошибка загрузки изображений');
+        }
+        const { uploads } = await slotsResponse.json();
+
+        await Promise.all(uploads.map(async (slot, index) => {
+            const response = await fetch(slot.url, {
+                method: slot.method,
+                body: files[index]
+            });
+            if (!response.ok) throw new Error('Ошибка загрузки изображений');
+        }));
+        return uploads.map(slot => slot.upload_id);
+    };
+
+    /**
+     * Прикрепляет загруженные изображения к посту
+     * @param {string|number} postId - ID поста
+     * @param {string[]} uploadIds - ID загрузок из stageImages
+     * @param {string} token - JWT-токен доступа
+     */
+    const attachImages = async (postId, uploadIds, token) => {
+        if (!uploadIds.length) return;
+        const response = await fetch(`${API_BASE_URL}/posts/${postId}/images/`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ uploads: uploadIds })
+        });
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.detail || errorData.uploads || 'Ошибка загрузки изображений');
+        }
+    };
+
     /**
      * Создает новый пост
      * @param {Event} e - Событие отправки формы
@@ -352,20 +620,21 @@ document.addEventListener('DOMContentLoaded', () => {
         if (!text) return showError('Введите текст поста не менее 5 символов');
         if (images.length > 10) return showError('Не более 10 изображений');
 
-        const formData = new FormData();
-        formData.append('text', text);
-        Array.from(images).forEach(img => formData.append('images', img));
-
         const loadingIndicator = showLoading(elements.newPostForm, 'Публикация поста...');
 
         try {
             const token = localStorage.getItem('access_token');
             if (!token) throw new Error('Требуется авторизация');
 
+            const uploadIds = await stageImages(Array.from(images), token);
+
             const response = await fetch(`${API_BASE_URL}/posts/`, {
                 method: 'POST',
-                headers: { 'Authorization': `Bearer ${token}` },
-                body: formData
+                headers: {
+                    'Authorization': `Bearer ${token}`,
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ text })
             });
 
             if (!response.ok) {
@@ -373,9 +642,21 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(errorData.detail || 'Ошибка создания поста');
             }
 
+            const post = await response.json();
+            try {
+                await attachImages(post.id, uploadIds, token);
+            } catch (error) {
+                // Пост без изображений не публикуется
+                await fetch(`${API_BASE_URL}/posts/${post.id}/`, {
+                    method: 'DELETE',
+                    headers: { 'Authorization': `Bearer ${token}` }
+                }).catch(() => {});
+                throw error;
+            }
+
             elements.newPostText.value = '';
             elements.newPostImages.value = '';
-            await fetchPosts();
+            await refreshIfOffline();
         } catch (error) {
             console.error('Error:', error);
             showError(error.message);
@@ -402,6 +683,9 @@ document.addEventListener('DOMContentLoaded', () => {
             const post = await response.json();
             const modal = document.createElement('div');
             modal.className = 'modal';
+            // Версия поста: при сохранении сервер отклонит изменение (412),
+            // если пост успели отредактировать в другом окне
+            modal.dataset.etag = response.headers.get('ETag') || '';
             modal.innerHTML = `
                 <div class="modal-content">
                     <h2>Редактировать пост</h2>
@@ -465,16 +749,18 @@ document.addEventListener('DOMContentLoaded', () => {
 
         if (!text) throw new Error('Введите текст поста не менее 5 символов');
 
-        const formData = new FormData();
-        formData.append('text', text);
-        Array.from(images).forEach(img => formData.append('images', img));
-
         try {
             const token = localStorage.getItem('access_token');
+            const uploadIds = await stageImages(Array.from(images), token);
+            const headers = {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json'
+            };
+            if (modal.dataset.etag) headers['If-Match'] = modal.dataset.etag;
             const response = await fetch(`${API_BASE_URL}/posts/${postId}/`, {
                 method: 'PUT',
-                headers: { 'Authorization': `Bearer ${token}` },
-                body: formData
+                headers,
+                body: JSON.stringify({ text })
             });
 
             if (!response.ok) {
@@ -482,8 +768,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(errorData.detail || 'Ошибка редактирования поста');
             }
 
+            await attachImages(postId, uploadIds, token);
+
             modal.remove();
-            await fetchPosts();
+            await refreshIfOffline();
         } catch (error) {
             throw error;
         }
@@ -540,7 +828,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
             if (!response.ok) throw new Error('Ошибка лайка');
 
-            await fetchPosts();
+            await refreshIfOffline();
         } catch (error) {
             console.error('Error:', error);
             showError(error.message);
@@ -570,7 +858,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
             if (!response.ok) throw new Error('Ошибка комментария');
 
-            await fetchPosts();
+            await refreshIfOffline();
         } catch (error) {
             console.error('Error:', error);
             showError(error.message);
@@ -676,6 +964,7 @@ document.addEventListener('DOMContentLoaded', () => {
             elements.loginForm.classList.add('hidden');
         });
         updateUI();
+        connectEvents();
     };
 
     init();
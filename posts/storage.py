@@ -0,0 +1,156 @@
+"""
+Хранилища файлов приложения posts.
+"""
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Имя файла, совпадающее с SHA-256 его содержимого (неизменяемый файл)
+CONTENT_ADDRESSED_NAME_RE = re.compile(r'(?:^|/)[0-9a-f]{64}\.[0-9a-z]+$')
+
+
+def is_content_addressed(name):
+    """Проверяет, что имя файла является хешем его содержимого."""
+    return bool(CONTENT_ADDRESSED_NAME_RE.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла — SHA-256 его содержимого.
+
+    Файлы раскладываются по каталогам ``<префикс>/ab/cd/<хеш>.<расширение>``.
+    Одинаковое содержимое сохраняется на диск один раз: повторная загрузка
+    возвращает имя уже существующего файла. Удалять такой файл можно,
+    только когда на него не осталось ссылок и его давно не использовали
+    (см. задачу delete_unreferenced_image).
+    """
+
+    def hashed_name(self, name, content):
+        """
+        Возвращает имя файла по хешу содержимого.
+
+        Args:
+            name: Исходное имя с учетом upload_to
+            content: Объект файла
+
+        Returns:
+            str: Имя файла в хранилище
+        """
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], digest + extension
+        )
+
+    def _save(self, name, content):
+        """
+        Сохраняет файл, если файла с таким содержимым еще нет.
+
+        Время изменения существующего файла обновляется: задача удаления
+        файлов без ссылок не трогает недавно использованные файлы, пока
+        загрузка, сославшаяся на них, не зафиксирует свою строку.
+        """
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            self.touch(name)
+            return name
+        # Файл пишется под уникальным временным именем и затем заменяет
+        # целевой: FileSystemStorage._save при занятом имени повторяет
+        # попытку с get_available_name, которое здесь возвращает то же
+        # имя. Если параллельная загрузка с тем же содержимым успела
+        # сохранить файл, замена оставляет те же байты
+        root, extension = os.path.splitext(name)
+        partial = super()._save(
+            f'{root}.{uuid.uuid4().hex}.part{extension}', content
+        )
+        os.replace(self.path(partial), self.path(name))
+        return name
+
+    def touch(self, name):
+        """Обновляет время изменения файла, если он есть."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def get_available_name(self, name, max_length=None):
+        """Не подбирает свободное имя: оно определяется содержимым."""
+        return name
+
+    def locate(self, prefix, basename):
+        """
+        Восстанавливает полное имя файла по последнему сегменту URL.
+
+        Args:
+            prefix: Каталог из upload_to
+            basename: Имя файла вида ``<хеш>.<расширение>``
+
+        Returns:
+            str | None: Полное имя или None, если имя не является хешем
+        """
+        if not is_content_addressed(basename) or '/' in basename:
+            return None
+        return posixpath.join(
+            prefix.rstrip('/'), basename[:2], basename[2:4], basename
+        )
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище статики с хешем содержимого в имени файла.
+
+    После collectstatic рядом с каждым хешированным текстовым файлом
+    создаются заранее сжатые копии ``.gz`` и, если установлен brotli, ``.br``.
+    Манифест строгий: без collectstatic ссылка на статику в шаблоне
+    вызывает ошибку, а не молча отдает файл без хеша и кеширования.
+    """
+
+    compress_extensions = (
+        '.css', '.js', '.json', '.map', '.svg', '.txt', '.html',
+        '.eot', '.ttf',
+    )
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Хеширует файлы, затем создает их сжатые копии."""
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(self.compress_extensions):
+                self.compress_file(name)
+
+    def compress_file(self, name):
+        """
+        Сохраняет сжатые копии файла, если они меньше оригинала.
+
+        Args:
+            name: Имя файла в хранилище
+        """
+        with self.open(name) as original:
+            content = original.read()
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            if len(compressed) >= len(content):
+                continue
+            with open(self.path(name + suffix), 'wb') as target:
+                target.write(compressed)
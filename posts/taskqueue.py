@@ -0,0 +1,157 @@
+"""
+Очередь фоновых задач в базе данных.
+
+Задача — обычная функция, которая указывается строкой с путем
+(``posts.tasks.delete_unreferenced_image``) и получает аргументы,
+сериализуемые в JSON. ``enqueue`` добавляет задачу в таблицу после
+фиксации текущей транзакции, ``manage.py run_worker`` забирает
+и выполняет задачи в пуле потоков. Неудачные попытки повторяются
+с экспоненциальной задержкой, после max_attempts задача помечается
+как failed и остается в таблице для разбора.
+
+При TASKS_EAGER = True задачи выполняются сразу после фиксации
+транзакции в том же процессе — без воркера, например в тестах.
+"""
+import datetime
+import random
+import traceback
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE = 10
+BACKOFF_MAX = 3600
+# Время, за которое воркер должен выполнить задачу; после него задачу
+# может забрать другой воркер (например, если первый упал)
+LEASE_SECONDS = 300
+
+
+def _task_model():
+    """Возвращает модель Task (без импорта models на уровне модуля)."""
+    return apps.get_model('posts', 'Task')
+
+
+def enqueue(name, *args, max_attempts=DEFAULT_MAX_ATTEMPTS, delay=0,
+            **kwargs):
+    """
+    Ставит задачу в очередь после фиксации текущей транзакции.
+
+    Args:
+        name: Путь к функции задачи
+        args: Позиционные аргументы задачи
+        max_attempts: Максимальное число попыток
+        delay: Задержка перед первой попыткой, секунд
+        kwargs: Именованные аргументы задачи
+    """
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: import_string(name)(*args, **kwargs))
+        return
+
+    def create():
+        _task_model().objects.create(
+            name=name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=max_attempts,
+            run_at=timezone.now() + datetime.timedelta(seconds=delay),
+        )
+
+    transaction.on_commit(create)
+
+
+def backoff(attempt):
+    """
+    Возвращает задержку перед повтором задачи.
+
+    Args:
+        attempt: Номер неудачной попытки (с 1)
+
+    Returns:
+        float: Задержка в секундах с удвоением и случайным разбросом
+    """
+    delay = min(BACKOFF_BASE * 2 ** (attempt - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim(limit, lease=LEASE_SECONDS):
+    """
+    Забирает готовые к выполнению задачи.
+
+    Берутся ожидающие задачи с наступившим run_at и задачи, срок
+    выполнения которых истек. В PostgreSQL строки блокируются
+    с SKIP LOCKED, поэтому несколько воркеров не получат одну задачу.
+
+    Args:
+        limit: Максимальное число задач
+        lease: Срок выполнения задачи воркером, секунд
+
+    Returns:
+        list: Экземпляры Task со статусом running
+    """
+    Task = _task_model()
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Task.PENDING, run_at__lte=now)
+                | Q(status=Task.RUNNING, locked_until__lt=now)
+            )
+            .order_by('run_at')[:limit]
+        )
+        locked_until = now + datetime.timedelta(seconds=lease)
+        Task.objects.filter(pk__in=[task.pk for task in tasks]).update(
+            status=Task.RUNNING,
+            locked_until=locked_until,
+            attempts=F('attempts') + 1,
+        )
+    for task in tasks:
+        task.status = Task.RUNNING
+        task.locked_until = locked_until
+        task.attempts += 1
+    return tasks
+
+
+def run(task):
+    """
+    Выполняет задачу и записывает результат.
+
+    Успешная задача удаляется из очереди. После ошибки задача
+    возвращается в очередь с задержкой backoff() или, если попытки
+    исчерпаны, помечается как failed.
+
+    Args:
+        task: Экземпляр Task, полученный из claim()
+
+    Returns:
+        bool: True, если задача выполнена успешно
+    """
+    Task = _task_model()
+    close_old_connections()
+    try:
+        import_string(task.name)(*task.args, **task.kwargs)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            task.status = Task.FAILED
+        else:
+            task.status = Task.PENDING
+            task.run_at = timezone.now() + datetime.timedelta(
+                seconds=backoff(task.attempts)
+            )
+        task.locked_until = None
+        task.save(update_fields=[
+            'status', 'run_at', 'locked_until', 'last_error'
+        ])
+        return False
+    else:
+        task.delete()
+        return True
+    finally:
+        close_old_connections()
@@ -0,0 +1,240 @@
+"""
+Фоновые задачи приложения.
+
+Задачи ставятся в очередь через ``posts.taskqueue.enqueue`` по пути
+к функции и выполняются ``manage.py run_worker``. Аргументы должны
+сериализоваться в JSON, а сама задача — быть идемпотентной: после
+сбоя воркера она может выполниться повторно.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    Comment, Like, Notification, Post, PostImage, PostRevision, UserStats,
+    purging,
+)
+from .partitioning import comments_since
+from .taskqueue import enqueue
+from .uploads import delete_stale
+
+# Сколько пачек удаляет одна задача purge_post, прежде чем поставить
+# продолжение в очередь и освободить поток воркера
+PURGE_BATCHES_PER_TASK = 20
+
+# Столько секунд после последнего использования файл изображения
+# не удаляется, даже если строк PostImage с ним нет: загрузка,
+# переиспользовавшая файл, еще может зафиксировать свою строку
+UNREFERENCED_IMAGE_GRACE = 600
+
+
+def delete_unreferenced_image(name, deleted_pk):
+    """
+    Удаляет файл изображения, если на него больше не ссылается
+    ни один PostImage.
+
+    Загрузка того же содержимого сначала переиспользует файл (обновляя
+    время его изменения) и только потом фиксирует свою строку
+    PostImage. Поэтому файл, использованный меньше
+    UNREFERENCED_IMAGE_GRACE секунд назад, не удаляется: проверка
+    откладывается до конца этого срока. В режиме TASKS_EAGER такой файл
+    остается на диске.
+
+    Args:
+        name: Имя файла в хранилище
+        deleted_pk: ID удаленного PostImage, который не учитывается
+    """
+    others = PostImage.objects.filter(image=name).exclude(pk=deleted_pk)
+    if others.exists():
+        return
+    storage = PostImage._meta.get_field('image').storage
+    try:
+        modified = storage.get_modified_time(name)
+    except FileNotFoundError:
+        return
+    age = (timezone.now() - modified).total_seconds()
+    if age < UNREFERENCED_IMAGE_GRACE:
+        if not settings.TASKS_EAGER:
+            enqueue(
+                'posts.tasks.delete_unreferenced_image', name, deleted_pk,
+                delay=UNREFERENCED_IMAGE_GRACE - age
+            )
+        return
+    storage.delete(name)
+
+
+def delete_stale_uploads():
+    """
+    Удаляет неподтвержденные файлы прямой загрузки, срок подтверждения
+    которых истек.
+    """
+    delete_stale(settings.UPLOAD_FINALIZE_TIMEOUT)
+
+
+def _new_events(verb, post, cursor):
+    """
+    Возвращает события поста с ID больше cursor.
+
+    События самого автора поста не учитываются.
+
+    Returns:
+        tuple: (queryset, имя поля с ID пользователя-участника)
+    """
+    if verb == Notification.LIKE:
+        events, actor = Like.objects.filter(
+            post_id=post['pk'], post_created_at=post['created_at']
+        ), 'user_id'
+    else:
+        events, actor = Comment.objects.filter(
+            post_id=post['pk'],
+            created_at__gte=comments_since(post['created_at'])
+        ), 'author_id'
+    events = events.filter(pk__gt=cursor).exclude(
+        **{actor: post['author_id']}
+    )
+    return events, actor
+
+
+def flush_notifications(post_id, verb):
+    """
+    Добавляет новые лайки или комментарии поста в уведомление автора.
+
+    Новые события (с ID больше last_event_id последнего уведомления)
+    прибавляются к непрочитанному уведомлению или создают новое.
+    События моложе CHANGES_SAFE_HORIZON секунд откладываются до
+    следующего запуска: транзакции с меньшими ID могли еще не
+    зафиксироваться, и курсор перескочил бы через них. В режиме
+    TASKS_EAGER задача выполняется после фиксации события и учитывает
+    его сразу.
+    Строка поста блокируется, поэтому параллельные задачи для одного
+    поста выполняются по очереди и не считают события дважды.
+
+    Args:
+        post_id: ID поста
+        verb: Вид событий (Notification.LIKE или Notification.COMMENT)
+    """
+    with transaction.atomic():
+        post = (
+            Post.objects.select_for_update()
+            .filter(pk=post_id)
+            .values('pk', 'author_id', 'created_at')
+            .first()
+        )
+        if post is None:
+            return
+        latest = (
+            Notification.objects.select_for_update()
+            .filter(post_id=post_id, verb=verb)
+            .order_by('-id')
+            .first()
+        )
+        cursor = latest.last_event_id if latest else 0
+        events, actor = _new_events(verb, post, cursor)
+        if not settings.TASKS_EAGER:
+            events = events.filter(created_at__lt=timezone.now() - (
+                datetime.timedelta(seconds=settings.CHANGES_SAFE_HORIZON)
+            ))
+        total = events.count()
+        if not total:
+            return
+        last_event_id, last_actor_id = (
+            events.order_by('-pk').values_list('pk', actor)[0]
+        )
+
+        if latest is not None and not latest.is_read:
+            Notification.objects.filter(pk=latest.pk).update(
+                count=F('count') + total,
+                last_actor_id=last_actor_id,
+                last_event_id=last_event_id,
+                updated_at=timezone.now(),
+            )
+        else:
+            Notification.objects.create(
+                recipient_id=post['author_id'],
+                post_id=post_id,
+                verb=verb,
+                count=total,
+                last_actor_id=last_actor_id,
+                last_event_id=last_event_id,
+            )
+            UserStats.objects.filter(user_id=post['author_id']).update(
+                unread_notifications=F('unread_notifications') + 1
+            )
+
+
+def _delete_batch(queryset, batch_size):
+    """
+    Удаляет до batch_size строк queryset в отдельной транзакции.
+
+    Returns:
+        int: Количество удаленных строк
+    """
+    ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return 0
+    with transaction.atomic(), purging():
+        queryset.model._base_manager.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def purge_post(post_id):
+    """
+    Удаляет мягко удаленный пост вместе со связанными строками.
+
+    Уведомления, изображения (файлы — задачей delete_unreferenced_image),
+    лайки, комментарии и история удаляются пачками по
+    PURGE_BATCH_SIZE строк с паузой PURGE_BATCH_PAUSE секунд, чтобы
+    не держать долгие блокировки. После PURGE_BATCHES_PER_TASK пачек
+    задача ставит свое продолжение в очередь.
+
+    Args:
+        post_id: ID поста
+    """
+    post = Post.all_objects.filter(
+        pk=post_id, deleted_at__isnull=False
+    ).values('created_at').first()
+    if post is None:
+        return
+    related = [
+        Notification.objects.filter(post_id=post_id),
+        PostImage.objects.filter(post_id=post_id),
+        Like.objects.filter(
+            post_id=post_id, post_created_at=post['created_at']
+        ),
+        Comment.all_objects.filter(
+            post_id=post_id,
+            created_at__gte=comments_since(post['created_at'])
+        ),
+        PostRevision.objects.filter(post_id=post_id),
+    ]
+    batch_size = settings.PURGE_BATCH_SIZE
+    batches = 0
+    for queryset in related:
+        # Неполная пачка означает, что строк этого вида не осталось
+        while _delete_batch(queryset, batch_size) == batch_size:
+            batches += 1
+            if batches >= PURGE_BATCHES_PER_TASK:
+                enqueue(
+                    'posts.tasks.purge_post', post_id,
+                    delay=settings.PURGE_BATCH_PAUSE
+                )
+                return
+            time.sleep(settings.PURGE_BATCH_PAUSE)
+    _delete_batch(Post.all_objects.filter(pk=post_id), 1)
+
+
+def purge_comment(comment_id):
+    """
+    Удаляет строку мягко удаленного комментария.
+
+    Args:
+        comment_id: ID комментария
+    """
+    _delete_batch(
+        Comment.all_objects.filter(pk=comment_id, deleted_at__isnull=False),
+        1
+    )
@@ -1,3 +1,1675 @@
-from django.test import TestCase
+import datetime
+import decimal
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.db.models.deletion import Collector
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .fast_serializers import CommentReadSerializer, PostReadSerializer
+from .images import ingest_image
+from .management.commands import bench_connections
+from .middleware import CompressionMiddleware
+from .pagination import EstimatedCountPaginator, _cache_key, estimate_count
+from . import renderers, taskqueue, uploads
+from .models import (
+    ChangeLog, Comment, Like, Notification, PendingUpload, Post, PostImage,
+    PostRevision, Task, UserStats
+)
+from .ranking import HOT_DECAY_SECONDS, hot_score
+from .serializers import CommentSerializer, PostSerializer
+from .exceptions import VersionConflict
+from .storage import (
+    CompressedManifestStaticFilesStorage, ContentAddressedStorage
+)
+from .admin import UserAdmin
+from .coalescing import coalesced, invalidate_post, post_key
+from .export import iter_chunks
+from .tasks import (
+    UNREFERENCED_IMAGE_GRACE, delete_unreferenced_image, flush_notifications,
+    purge_comment, purge_post
+)
+from .throttling import SlidingWindowThrottle, _closed_windows
+
+# Строгий манифест статики требует collectstatic: страницы админки
+# в тестах рендерятся с обычным хранилищем статики
+PLAIN_STATIC_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+def _api_request(user=None, path='/api/posts/'):
+    """Возвращает запрос DRF от имени user (по умолчанию анонимного)."""
+    raw = APIRequestFactory().get(path)
+    raw.user = user or AnonymousUser()
+    request = Request(raw)
+    request._user = raw.user
+    return request
+
+
+class TempMediaMixin:
+    """Подменяет MEDIA_ROOT временным каталогом на время теста."""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class FastSerializerTests(TestCase):
+    """
+    Быстрые сериализаторы дают тот же JSON, что и сериализаторы DRF,
+    за постоянное число запросов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        for i in range(30):
+            post = Post.objects.create(
+                author=cls.author if i % 2 else cls.staff,
+                text=f'текст {i} "в кавычках"'
+            )
+            for j in range(i % 3):
+                PostImage.objects.create(
+                    post=post, image=f'posts/img {i}_{j}ü.jpg'
+                )
+            # Пустое изображение в ответ не попадает
+            PostImage.objects.create(post=post, image='')
+            for j in range(i % 4):
+                Comment.objects.create(
+                    post=post, author=cls.staff, text=f'комментарий {j}'
+                )
+            if i % 2:
+                Like.objects.create(post=post, user=cls.staff)
+
+    def drf_posts(self):
+        """
+        Возвращает ленту для PostSerializer.
+
+        Порядок комментариев и изображений у PostSerializer не задан;
+        быстрый сериализатор выводит их по id, поэтому и здесь они
+        загружаются по id.
+        """
+        return Post.objects.order_by('-created_at', '-id').prefetch_related(
+            Prefetch('comments', Comment.objects.order_by('id')),
+            Prefetch('images', PostImage.objects.order_by('id')),
+        )
+
+    def render_posts(self, request):
+        """Возвращает JSON ленты обоими сериализаторами."""
+        slow = JSONRenderer().render(PostSerializer(
+            self.drf_posts(), many=True, context={'request': request}
+        ).data)
+        queryset = Post.objects.order_by('-created_at', '-id')
+        rows = list(PostReadSerializer.values(queryset))
+        fast = JSONRenderer().render(
+            PostReadSerializer(rows, request=request).data
+        )
+        return slow, fast
+
+    def test_posts_match_for_every_kind_of_user(self):
+        for user in (None, self.author, self.staff):
+            with self.subTest(user=user):
+                slow, fast = self.render_posts(_api_request(user))
+                self.assertEqual(slow, fast)
+
+    def test_comments_match(self):
+        queryset = Comment.objects.order_by('-created_at', '-id')
+        slow = JSONRenderer().render(
+            CommentSerializer(queryset, many=True).data
+        )
+        fast = JSONRenderer().render(CommentReadSerializer(
+            list(CommentReadSerializer.values(queryset))
+        ).data)
+        self.assertEqual(slow, fast)
+
+    def test_fast_path_query_count_is_constant(self):
+        request = _api_request(self.author)
+        queryset = Post.objects.order_by('-created_at', '-id')
+        # Посты, изображения и комментарии — по одному запросу на пачку
+        with self.assertNumQueries(3):
+            PostReadSerializer(
+                list(PostReadSerializer.values(queryset)), request=request
+            ).data
+        # Без prefetch сериализатор DRF делает запросы на каждый пост
+        with CaptureQueriesContext(connection) as slow:
+            PostSerializer(
+                queryset, many=True, context={'request': request}
+            ).data
+        self.assertGreater(len(slow), queryset.count())
+
+
+class RendererTests(TestCase):
+    """JSON через orjson совпадает с JSON стандартного рендерера DRF."""
+
+    data = {
+        'datetime': datetime.datetime(
+            2025, 3, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+        ),
+        'naive': datetime.datetime(2025, 3, 1, 12, 30),
+        'date': datetime.date(2025, 3, 1),
+        'decimal': decimal.Decimal('12.50'),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'text': 'текст "в кавычках" \u2028 и \u2029',
+        'nested': [1, 2.5, None, True, {'key': 'значение'}],
+    }
+
+    def drf(self, data):
+        """Возвращает JSON стандартного рендерера DRF."""
+        return JSONRenderer().render(data)
+
+    @skipIf(renderers.orjson is None, 'orjson не установлен')
+    def test_orjson_matches_drf(self):
+        self.assertEqual(renderers.dumps(self.data), self.drf(self.data))
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(self.data),
+            self.drf(self.data)
+        )
+
+    def test_fallback_without_orjson_matches_drf(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.dumps(self.data), self.drf(self.data))
+            self.assertEqual(
+                renderers.FastJSONRenderer().render(self.data),
+                self.drf(self.data)
+            )
+
+    def test_indent_uses_drf_renderer(self):
+        rendered = renderers.FastJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=2'
+        )
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+        self.assertEqual(renderers.FastJSONRenderer().render(None), b'')
+
+    def test_streamed_array(self):
+        for batches, expected in (
+            ([], []),
+            ([[], []], []),
+            ([[{'id': 1}]], [{'id': 1}]),
+            ([[1], [], [2, 3]], [1, 2, 3]),
+        ):
+            with self.subTest(batches=batches):
+                response = renderers.StreamingJSONResponse(iter(batches))
+                self.assertEqual(response['Content-Type'], 'application/json')
+                body = b''.join(response.streaming_content)
+                self.assertEqual(json.loads(body), expected)
+
+
+class CompressionMiddlewareTests(TestCase):
+    """Сжатие ответов не затрагивает потоки событий."""
+
+    def process(self, response):
+        """Пропускает ответ через CompressionMiddleware."""
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_large_json_is_compressed(self):
+        response = self.process(HttpResponse(
+            b'{"text": "' + b'x' * 4096 + b'"}',
+            content_type='application/json'
+        ))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_event_stream_is_not_compressed(self):
+        response = self.process(StreamingHttpResponse(
+            iter([b'data: 1\n\n']), content_type='text/event-stream'
+        ))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), b'data: 1\n\n')
+
+    def test_unbuffered_stream_is_not_compressed(self):
+        response = StreamingHttpResponse(
+            iter([b'{}']), content_type='application/json'
+        )
+        response['X-Accel-Buffering'] = 'no'
+        response = self.process(response)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class ServeMediaTests(TempMediaMixin, TestCase):
+    """Отдача файлов изображений: ETag, диапазоны и передача прокси."""
+
+    content = bytes(range(100))
+
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create(username='author')
+        self.post = Post.objects.create(author=author, text='текст')
+        self.name = 'posts/plain.png'
+        self.hashed = f'posts/ab/cd/{"ab" * 32}.png'
+        for name in (self.name, self.hashed):
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(self.content)
+            PostImage.objects.create(post=self.post, image=name)
+
+    def get(self, name=None, **headers):
+        """Запрашивает файл и возвращает ответ с прочитанным телом."""
+        response = self.client.get(
+            f'{settings.MEDIA_URL}{name or self.name}', **headers
+        )
+        if response.streaming:
+            response.body = b''.join(response.streaming_content)
+            response.close()
+        else:
+            response.body = response.content
+        return response
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertNotIn('Cache-Control', response)
+
+    def test_file_without_image_is_not_found(self):
+        PostImage.objects.filter(image=self.name).delete()
+        self.assertEqual(self.get().status_code, 404)
+
+    def test_hashed_file_is_immutable(self):
+        response = self.get(self.hashed)
+        self.assertEqual(response['ETag'], f'"{"ab" * 32}"')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_if_none_match(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.get(HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_single_range(self):
+        for header, expected in (
+            ('bytes=10-19', (10, 19)),
+            ('bytes=90-', (90, 99)),
+            ('bytes=-5', (95, 99)),
+            ('bytes=95-500', (95, 99)),
+        ):
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                start, end = expected
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response.body, self.content[start:end + 1])
+                self.assertEqual(
+                    response['Content-Range'], f'bytes {start}-{end}/100'
+                )
+                self.assertEqual(
+                    response['Content-Length'], str(end - start + 1)
+                )
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=100-', 'bytes=20-10', 'bytes=-0'):
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_unsupported_range_returns_whole_file(self):
+        for header in ('bytes=a-b', 'bytes=0-1,5-6', 'items=0-1', 'bytes=-'):
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.body, self.content)
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.body, self.content[:10])
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, self.content)
+
+    @override_settings(
+        MEDIA_SENDFILE='nginx', MEDIA_ACCEL_PREFIX='/protected-media/'
+    )
+    def test_nginx_accel_redirect(self):
+        response = self.get()
+        self.assertEqual(
+            response['X-Accel-Redirect'], f'/protected-media/{self.name}'
+        )
+        self.assertEqual(response.body, b'')
+        self.assertIn('ETag', response)
+
+    @override_settings(MEDIA_SENDFILE='apache')
+    def test_apache_sendfile(self):
+        response = self.get()
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(settings.MEDIA_ROOT, self.name)
+        )
+        self.assertEqual(response.body, b'')
+
+
+class ContentAddressedStorageTests(TempMediaMixin, TestCase):
+    """Одинаковые загрузки сохраняются в один файл."""
+
+    def test_same_content_gets_same_name(self):
+        storage = ContentAddressedStorage()
+        first = storage.save('a.jpg', ContentFile(b'image'))
+        second = storage.save('b.jpg', ContentFile(b'image'))
+        self.assertEqual(first, second)
+
+    def test_concurrent_save_returns_existing_name(self):
+        storage = ContentAddressedStorage()
+        name = storage.save('a.jpg', ContentFile(b'image'))
+        # Параллельная загрузка успела создать файл после проверки exists
+        with mock.patch.object(storage, 'exists', return_value=False):
+            again = storage.save('b.jpg', ContentFile(b'image'))
+        self.assertEqual(again, name)
+        self.assertTrue(storage.exists(name))
+
+
+@override_settings(TASKS_EAGER=True)
+class DeleteUnreferencedImageTests(TempMediaMixin, TestCase):
+    """Файл без ссылок удаляется, только если его давно не использовали."""
+
+    def setUp(self):
+        super().setUp()
+        self.storage = PostImage._meta.get_field('image').storage
+        self.name = self.storage.save('a.jpg', ContentFile(b'image'))
+
+    def age(self, seconds):
+        """Сдвигает время изменения файла на seconds секунд назад."""
+        moment = time.time() - seconds
+        os.utime(self.storage.path(self.name), (moment, moment))
+
+    def test_old_unreferenced_file_is_deleted(self):
+        self.age(UNREFERENCED_IMAGE_GRACE + 1)
+        delete_unreferenced_image(self.name, 0)
+        self.assertFalse(self.storage.exists(self.name))
+
+    def test_recently_used_file_is_kept(self):
+        self.age(UNREFERENCED_IMAGE_GRACE + 1)
+        # Параллельная загрузка переиспользует файл, но ее строка
+        # PostImage еще не зафиксирована
+        self.storage.save('b.jpg', ContentFile(b'image'))
+        delete_unreferenced_image(self.name, 0)
+        self.assertTrue(self.storage.exists(self.name))
+
+    def test_referenced_file_is_kept(self):
+        self.age(UNREFERENCED_IMAGE_GRACE + 1)
+        post = Post.objects.create(
+            author=User.objects.create(username='author'), text='текст'
+        )
+        PostImage.objects.create(post=post, image=self.name, format='jpeg')
+        delete_unreferenced_image(self.name, 0)
+        self.assertTrue(self.storage.exists(self.name))
+
+    @override_settings(TASKS_EAGER=False)
+    def test_recent_file_check_is_postponed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_unreferenced_image(self.name, 0)
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'posts.tasks.delete_unreferenced_image')
+        self.assertEqual(task.args, [self.name, 0])
+        self.assertTrue(self.storage.exists(self.name))
+
+
+def _image_file(image_format, frames=1, **options):
+    """Возвращает файл изображения Pillow с заданными параметрами."""
+    from PIL import Image
+
+    images = [
+        Image.new('RGB', (40, 20), color)
+        for color in ('red', 'green', 'blue')[:frames]
+    ]
+    buffer = io.BytesIO()
+    if frames > 1:
+        options.update(save_all=True, append_images=images[1:])
+    images[0].save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue(), name=f'a.{image_format.lower()}')
+
+
+class IngestImageTests(TestCase):
+    """Загрузка изображения извлекает метаданные и удаляет EXIF."""
+
+    def test_exif_is_removed(self):
+        from PIL import Image
+
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera'
+        content, meta = ingest_image(_image_file('JPEG', exif=exif))
+        self.assertIsNotNone(content)
+        self.assertFalse(Image.open(io.BytesIO(content)).getexif())
+        self.assertEqual(
+            (meta['width'], meta['height'], meta['format']), (40, 20, 'jpeg')
+        )
+        self.assertTrue(meta['placeholder'].startswith('data:image/jpeg'))
+
+    def test_clean_image_is_not_rewritten(self):
+        content, meta = ingest_image(_image_file('PNG'))
+        self.assertIsNone(content)
+        self.assertEqual(meta['format'], 'png')
+
+    def test_animated_image_keeps_frames_without_comment(self):
+        from PIL import Image, ImageSequence
+
+        content, meta = ingest_image(_image_file(
+            'GIF', frames=3, duration=[100, 200, 300], loop=0,
+            comment=b'secret'
+        ))
+        self.assertNotIn(b'secret', content)
+        image = Image.open(io.BytesIO(content))
+        durations = []
+        for frame in ImageSequence.Iterator(image):
+            frame.load()
+            durations.append(frame.info['duration'])
+        self.assertEqual(durations, [100, 200, 300])
+        self.assertEqual(meta['format'], 'gif')
+
+    def test_not_an_image(self):
+        self.assertEqual(
+            ingest_image(ContentFile(b'not an image', name='a.jpg')),
+            (None, {})
+        )
+
+    def test_decompression_bomb_is_rejected(self):
+        from PIL import Image
+
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 100):
+            with self.assertRaises(ValidationError):
+                ingest_image(_image_file('PNG'))
+
+
+@override_settings(TASKS_EAGER=False)
+class DirectUploadTests(TempMediaMixin, TestCase):
+    """Прямая загрузка изображений по подписанным ссылкам."""
+
+    def setUp(self):
+        super().setUp()
+        staging = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, staging, ignore_errors=True)
+        settings_override = override_settings(UPLOAD_STAGING_DIR=staging)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        caches[settings.THROTTLE_CACHE].clear()
+
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(author=self.author, text='текст')
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def slots(self, *files):
+        """Запрашивает слоты для файлов (имя, размер)."""
+        return self.client.post('/api/uploads/', {
+            'files': [{'name': name, 'size': size} for name, size in files]
+        }, format='json')
+
+    def upload(self, content, name='a.png'):
+        """Загружает файл по выданной ссылке и возвращает upload_id."""
+        slot = self.slots((name, len(content))).json()['uploads'][0]
+        response = self.client.generic(
+            'PUT', slot['url'], content, content_type='image/png'
+        )
+        self.assertEqual(response.status_code, 204)
+        return slot['upload_id']
+
+    def finalize(self, *upload_ids, post=None):
+        """Прикрепляет загрузки к посту."""
+        post = post or self.post
+        return self.client.post(
+            f'/api/posts/{post.pk}/images/', {'uploads': list(upload_ids)},
+            format='json'
+        )
+
+    def test_upload_is_attached_to_post(self):
+        upload_id = self.upload(_image_file('PNG').read())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['images']), 1)
+        self.assertEqual(self.post.images.get().format, 'png')
+        self.assertEqual(os.listdir(settings.UPLOAD_STAGING_DIR), [])
+
+    def test_forged_signature_is_rejected(self):
+        slot = self.slots(('a.png', 10)).json()['uploads'][0]
+        forged = slot['upload_id'][:-1] + (
+            'A' if slot['upload_id'][-1] != 'A' else 'B'
+        )
+        response = self.client.generic(
+            'PUT', f'/api/uploads/{forged}/', b'0' * 10
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.finalize(forged).status_code, 400)
+
+    def test_size_must_match_slot(self):
+        slot = self.slots(('a.png', 10)).json()['uploads'][0]
+        response = self.client.generic('PUT', slot['url'], b'0' * 9)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(os.listdir(settings.UPLOAD_STAGING_DIR), [])
+        self.assertEqual(
+            self.slots(('a.png', 5 * 1024 * 1024 + 1)).status_code, 400
+        )
+
+    def test_upload_of_other_user_is_rejected(self):
+        upload_id = self.upload(_image_file('PNG').read())
+        other = User.objects.create(username='other')
+        other_post = Post.objects.create(author=other, text='чужой')
+        self.assertEqual(
+            self.finalize(upload_id, post=other_post).status_code, 403
+        )
+        self.client.force_authenticate(other)
+        self.assertEqual(
+            self.finalize(upload_id, post=other_post).status_code, 400
+        )
+        self.assertFalse(PostImage.objects.exists())
+
+    def test_unsupported_format_is_rejected(self):
+        upload_id = self.upload(_image_file('BMP').read())
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('формат', response.json()['uploads'])
+        self.assertFalse(PostImage.objects.exists())
+
+    def test_replayed_upload_is_conflict(self):
+        upload_id = self.upload(_image_file('PNG').read())
+        self.assertTrue(PendingUpload.objects.exists())
+        self.assertEqual(self.finalize(upload_id).status_code, 201)
+        self.assertFalse(PendingUpload.objects.exists())
+        # Временный файл еще не удален: второе подтверждение отклоняется
+        # по записи слота
+        self.assertEqual(self.finalize(upload_id).status_code, 409)
+        self.assertEqual(self.post.images.count(), 1)
+
+    def test_images_per_post_are_limited(self):
+        PostImage.objects.bulk_create(
+            [PostImage(post=self.post) for _ in range(9)]
+        )
+        content = _image_file('PNG').read()
+        upload_ids = [self.upload(content), self.upload(content)]
+        response = self.finalize(*upload_ids)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('не более 10', response.json()['uploads'])
+        self.assertEqual(PendingUpload.objects.count(), 2)
+        self.assertEqual(self.finalize(upload_ids[0]).status_code, 201)
+        self.assertEqual(self.post.images.count(), 10)
+
+    def test_stale_slots_are_deleted(self):
+        self.upload(_image_file('PNG').read())
+        self.assertEqual(uploads.delete_stale(3600), 0)
+        self.assertTrue(PendingUpload.objects.exists())
+        with mock.patch('posts.uploads.time.time', return_value=2e9):
+            self.assertEqual(uploads.delete_stale(3600), 1)
+        self.assertTrue(PendingUpload.objects.exists())
+        PendingUpload.objects.update(
+            created_at=timezone.now() - datetime.timedelta(hours=2)
+        )
+        uploads.delete_stale(3600)
+        self.assertFalse(PendingUpload.objects.exists())
+
+    def test_pending_slots_are_limited(self):
+        for _ in range(3):
+            response = self.slots(*[('a.png', 10)] * 10)
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.slots(('a.png', 10)).status_code, 429)
+
+        other = User.objects.create(username='other')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.slots(('a.png', 10)).status_code, 201)
+
+
+class EventStreamTests(TestCase):
+    """Поток событий ленты."""
+
+    def test_stream_is_disabled_outside_asgi(self):
+        response = self.client.get('/api/events/')
+        self.assertEqual(response.status_code, 204)
+
+    def test_post_events_carry_only_ids(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='author'))
+        with mock.patch('posts.events.get_broker') as get_broker:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(
+                    '/api/posts/', {'text': 'новый пост'}, format='json'
+                )
+        self.assertEqual(response.status_code, 201)
+        get_broker.return_value.publish.assert_called_once_with(
+            {'type': 'post_created', 'post_id': response.data['id']}
+        )
+
+
+class DeleteCountersTests(TestCase):
+    """
+    Лайки и комментарии удаляются одним запросом, а счетчики постов
+    и профилей остаются верными.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.post = Post.objects.create(author=self.author, text='текст')
+
+    def stats(self):
+        """Возвращает счетчики автора и поста."""
+        stats = UserStats.objects.get(user=self.author)
+        self.post.refresh_from_db()
+        return (
+            stats.likes_received, stats.comments_received,
+            self.post.likes_count, self.post.comments_count
+        )
+
+    def test_likes_and_comments_are_fast_deleted(self):
+        collector = Collector(using=connection.alias)
+        self.assertTrue(collector.can_fast_delete(Like.objects.all()))
+        self.assertTrue(collector.can_fast_delete(Comment.objects.all()))
+
+    def test_deleting_like_and_comment_updates_counters(self):
+        like = Like.objects.create(post=self.post, user=self.reader)
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='комментарий'
+        )
+        self.assertEqual(self.stats(), (1, 1, 1, 1))
+        like.delete()
+        comment.delete()
+        self.assertEqual(self.stats(), (0, 0, 0, 0))
+        self.assertEqual(
+            ChangeLog.objects.filter(action=ChangeLog.DELETE).count(), 2
+        )
+
+    def test_deleting_user_updates_counters_of_other_posts(self):
+        Like.objects.create(post=self.post, user=self.reader)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='комментарий'
+        )
+        self.reader.delete()
+        self.assertEqual(self.stats(), (0, 0, 0, 0))
+
+    def test_deleting_post_updates_author_counters(self):
+        Like.objects.create(post=self.post, user=self.reader)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='комментарий'
+        )
+        Post.objects.get(pk=self.post.pk).delete()
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(
+            (stats.posts_count, stats.likes_received,
+             stats.comments_received),
+            (0, 0, 0)
+        )
+        self.assertFalse(Like.objects.exists())
+
+
+@override_settings(
+    TASKS_EAGER=False, PURGE_BATCH_SIZE=1, PURGE_BATCH_PAUSE=0
+)
+class SoftDeleteTests(TestCase):
+    """Мягкое удаление, счетчики, выгрузка и фоновая очистка."""
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.post = Post.objects.create(author=self.author, text='текст')
+        self.like = Like.objects.create(post=self.post, user=self.reader)
+        self.comments = [
+            Comment.objects.create(
+                post=self.post, author=self.reader, text=f'комментарий {n}'
+            )
+            for n in range(2)
+        ]
+
+    def stats(self):
+        """Возвращает счетчики автора."""
+        stats = UserStats.objects.get(user=self.author)
+        return (
+            stats.posts_count, stats.likes_received, stats.comments_received
+        )
+
+    def exported(self, name):
+        """Возвращает ID строк выгрузки."""
+        return [row['id'] for chunk in iter_chunks(name) for row in chunk]
+
+    def test_soft_deleting_comment(self):
+        comment = self.comments[0]
+        self.assertTrue(comment.soft_delete())
+        self.assertFalse(comment.soft_delete())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.stats(), (1, 1, 1))
+        self.assertEqual(self.exported('comments'), [self.comments[1].pk])
+
+        purge_comment(comment.pk)
+        self.assertFalse(Comment.all_objects.filter(pk=comment.pk).exists())
+        purge_comment(self.comments[1].pk)
+        self.assertTrue(
+            Comment.objects.filter(pk=self.comments[1].pk).exists()
+        )
+
+    def test_soft_deleting_post(self):
+        self.comments[0].soft_delete()
+        self.assertTrue(self.post.soft_delete())
+        self.assertFalse(self.post.soft_delete())
+        self.assertEqual(self.stats(), (0, 0, 0))
+        self.assertFalse(Post.objects.exists())
+        for name in ('posts', 'comments', 'likes', 'images'):
+            self.assertEqual(self.exported(name), [])
+
+    def test_purge_post_deletes_related_rows(self):
+        purge_post(self.post.pk)
+        self.assertTrue(Post.objects.exists())
+
+        self.comments[0].soft_delete()
+        self.post.soft_delete()
+        purge_post(self.post.pk)
+        self.assertFalse(Post.all_objects.exists())
+        self.assertFalse(Comment.all_objects.exists())
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(self.stats(), (0, 0, 0))
+
+    def test_purge_post_continues_in_next_task(self):
+        self.post.soft_delete()
+        with mock.patch('posts.tasks.PURGE_BATCHES_PER_TASK', 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                purge_post(self.post.pk)
+        self.assertTrue(Post.all_objects.exists())
+        self.assertTrue(
+            Task.objects.filter(
+                name='posts.tasks.purge_post', args=[self.post.pk]
+            ).exists()
+        )
+        purge_post(self.post.pk)
+        self.assertFalse(Post.all_objects.exists())
+
+
+class StaticStorageTests(TestCase):
+    """Хранилище статики с манифестом."""
+
+    def test_missing_manifest_fails_loudly(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        storage = CompressedManifestStaticFilesStorage(location=directory)
+        with self.assertRaises(ValueError):
+            storage.url('posts/app.js')
+
+
+class ExportTests(TestCase):
+    """Потоковая выгрузка таблиц через API и export_social."""
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', is_staff=True)
+        self.posts = [
+            Post.objects.create(author=self.admin, text=f'пост номер {n}')
+            for n in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, table='posts', **params):
+        """Возвращает строки ответа /api/export/<table>/."""
+        response = self.client.get(f'/api/export/{table}/', params)
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content)
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_only_staff_can_export(self):
+        self.client.force_authenticate(
+            User.objects.create(username='reader')
+        )
+        response = self.client.get('/api/export/posts/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_ndjson_after_id(self):
+        rows = self.export()
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts]
+        )
+        self.assertEqual(rows[0]['author__username'], 'admin')
+        rows = self.export(after_id=self.posts[2].pk)
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts[3:]]
+        )
+
+    def test_columnar_layout(self):
+        [chunk] = self.export(layout='columnar', after_id=self.posts[0].pk)
+        self.assertEqual(chunk['rows'], 4)
+        self.assertEqual(
+            (chunk['first_id'], chunk['last_id']),
+            (self.posts[1].pk, self.posts[4].pk)
+        )
+        self.assertEqual(
+            chunk['columns']['text'],
+            [post.text for post in self.posts[1:]]
+        )
+
+    def test_invalid_parameters(self):
+        for params in ({'layout': 'xml'}, {'after_id': 'x'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/export/posts/', params)
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/export/users/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_resume_appends_gzip_member(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        output = os.path.join(directory, 'posts.ndjson.gz')
+
+        def run(**options):
+            call_command(
+                'export_social', 'posts', output=output, chunk_size=2,
+                stderr=io.StringIO(), **options
+            )
+
+        run()
+        with open(f'{output}.checkpoint') as file:
+            self.assertEqual(int(file.read()), self.posts[-1].pk)
+        added = Post.objects.create(author=self.admin, text='новый пост')
+        run(resume=True)
+
+        with open(output, 'rb') as file:
+            raw = file.read()
+        # Продолжение дописывается в файл вторым членом gzip
+        self.assertEqual(raw.count(b'\x1f\x8b\x08'), 2)
+        with gzip.open(output) as file:
+            ids = [json.loads(line)['id'] for line in file]
+        self.assertEqual(ids, [post.pk for post in self.posts] + [added.pk])
+
+    def test_resume_requires_output_file(self):
+        with self.assertRaises(CommandError):
+            call_command('export_social', 'posts', resume=True)
+
+
+@override_settings(CHANGES_SAFE_HORIZON=10)
+class ChangesViewTests(TestCase):
+    """Токен синхронизации не обгоняет недавние записи журнала."""
+
+    def setUp(self):
+        author = User.objects.create(username='author')
+        self.old = Post.objects.create(author=author, text='старый пост')
+        ChangeLog.objects.update(
+            created_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        self.since = ChangeLog.objects.order_by('id').first().pk - 1
+
+    def changes(self, since=None):
+        """Возвращает ответ /api/changes/."""
+        query = {} if since is None else {'since': since}
+        return self.client.get('/api/changes/', query).json()
+
+    def test_settled_changes_advance_token(self):
+        data = self.changes(self.since)
+        self.assertEqual([post['id'] for post in data['posts']], [self.old.pk])
+        token = int(data['next'])
+        self.assertEqual(self.changes(token)['posts'], [])
+        self.assertEqual(int(self.changes()['next']), token)
+
+    def test_recent_changes_are_returned_again(self):
+        token = int(self.changes(self.since)['next'])
+        recent = Post.objects.create(author=self.old.author, text='новый')
+        for _ in range(2):
+            data = self.changes(token)
+            self.assertEqual(
+                [post['id'] for post in data['posts']], [recent.pk]
+            )
+            self.assertEqual(int(data['next']), token)
+        self.assertEqual(int(self.changes()['next']), token)
+
+
+@override_settings(
+    TASKS_EAGER=False, NOTIFICATION_WINDOW=60, CHANGES_SAFE_HORIZON=10
+)
+class NotificationTests(TestCase):
+    """Уведомления объединяют события и не пропускают поздние."""
+
+    def setUp(self):
+        caches[settings.NOTIFICATIONS_CACHE].clear()
+        self.author = User.objects.create(username='author')
+        self.readers = [
+            User.objects.create(username=f'reader{n}') for n in range(3)
+        ]
+        self.post = Post.objects.create(author=self.author, text='текст')
+
+    def like_all(self):
+        """Ставит лайки от всех читателей и выполняет on_commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            for reader in self.readers:
+                Like.objects.create(post=self.post, user=reader)
+
+    def test_window_schedules_one_flush(self):
+        self.like_all()
+        tasks = Task.objects.filter(name='posts.tasks.flush_notifications')
+        self.assertEqual(tasks.count(), 1)
+        delay = (tasks.get().run_at - timezone.now()).total_seconds()
+        self.assertGreater(delay, 10 - 1)
+        self.assertLessEqual(delay, 60 + 10)
+
+    def test_recent_events_wait_for_horizon(self):
+        self.like_all()
+        flush_notifications(self.post.pk, Notification.LIKE)
+        self.assertFalse(Notification.objects.exists())
+
+        Like.objects.update(
+            created_at=timezone.now() - datetime.timedelta(seconds=11)
+        )
+        flush_notifications(self.post.pk, Notification.LIKE)
+        flush_notifications(self.post.pk, Notification.LIKE)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.count, 3)
+        self.assertEqual(
+            notification.last_event_id, Like.objects.latest('pk').pk
+        )
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_flushes_each_event(self):
+        self.like_all()
+        notification = Notification.objects.get()
+        self.assertEqual(notification.count, 3)
+
+
+@override_settings(POST_CACHE_TIMEOUT=30)
+class CoalescingTests(TestCase):
+    """Кеш данных постов вычисляет значение один раз на ключ."""
+
+    def setUp(self):
+        caches[settings.POST_CACHE].clear()
+        self.calls = 0
+
+    def compute(self):
+        """Считает вызовы и возвращает их номер."""
+        self.calls += 1
+        return self.calls
+
+    def test_value_is_cached_until_post_changes(self):
+        key = post_key(1, 'detail')
+        self.assertEqual(coalesced(key, self.compute), 1)
+        self.assertEqual(coalesced(key, self.compute), 1)
+        invalidate_post(1)
+        self.assertEqual(coalesced(post_key(1, 'detail'), self.compute), 2)
+
+    @override_settings(POST_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_cache(self):
+        with mock.patch('posts.coalescing._cache') as get_cache:
+            key = post_key(1, 'detail')
+            coalesced(key, self.compute)
+            self.assertEqual(coalesced(key, self.compute), 2)
+            invalidate_post(1)
+        self.assertIsNone(key)
+        get_cache.assert_not_called()
+
+    def test_concurrent_misses_compute_once(self):
+        key = post_key(1, 'detail')
+        barrier = threading.Barrier(8)
+        results = []
+
+        def slow_compute():
+            time.sleep(0.1)
+            return self.compute()
+
+        def worker():
+            barrier.wait()
+            results.append(coalesced(key, slow_compute))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((self.calls, results), (1, [1] * 8))
+
+    def test_stale_value_is_served_while_locked(self):
+        cache = caches[settings.POST_CACHE]
+        key = post_key(1, 'detail')
+        cache.set(key, ('старое', 0.1, time.time() - 1))
+        cache.add(f'{key}:lock', 'другой процесс')
+        self.assertEqual(coalesced(key, self.compute), 'старое')
+        self.assertEqual(self.calls, 0)
+
+    def test_comment_pages_are_keyed_by_page_number(self):
+        author = User.objects.create(username='author')
+        post = Post.objects.create(author=author, text='текст')
+        Comment.objects.create(post=post, author=author, text='комментарий')
+        path = f'/api/posts/{post.pk}/comments/'
+        first = self.client.get(path, {'page': 1, 'utm': 'a'})
+        self.assertEqual(first.json()['count'], 1)
+        with self.assertNumQueries(0):
+            second = self.client.get(path, {'utm': 'b'})
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.client.get(path, {'page': 'x'}).status_code, 404)
+        self.assertEqual(self.client.get(path, {'page': 2}).status_code, 404)
+
+
+@override_settings(COUNT_ESTIMATE_THRESHOLD=100, COUNT_CACHE_TIMEOUT=60)
+class EstimatedCountTests(TestCase):
+    """Приблизительный count для больших таблиц без фильтров."""
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create(username='author')
+        self.posts = [
+            Post.objects.create(author=author, text=f'пост номер {n}')
+            for n in range(3)
+        ]
+
+    def paginator(self, queryset):
+        """Возвращает пагинатор по 10 строк."""
+        return EstimatedCountPaginator(queryset.order_by('-id'), 10)
+
+    def test_filtered_queryset_is_counted_exactly(self):
+        cache.set(_cache_key(Post.objects.all()), 10 ** 6)
+        paginator = self.paginator(
+            Post.objects.filter(author=self.posts[0].author)
+        )
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.estimated)
+        self.assertIsNone(estimate_count(Post.objects.filter(pk=1)))
+
+    def test_small_table_is_counted_and_cached(self):
+        paginator = self.paginator(Post.objects.all())
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.estimated)
+        if connection.vendor != 'postgresql':
+            self.assertEqual(estimate_count(Post.objects.all()), 3)
+
+    def test_estimate_is_flagged_in_response(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('оценка PostgreSQL берется из pg_class')
+        cache.set(_cache_key(Post.objects.all()), 1000)
+        data = self.client.get('/api/posts/').json()
+        self.assertEqual(
+            (data['count'], data['count_approximate']), (1000, True)
+        )
+        self.assertEqual(len(data['results']), 3)
+        self.assertIsNotNone(data['next'])
+
+        # Страница за пределами реальных строк, но в пределах оценки
+        response = self.client.get('/api/posts/', {'page': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+        response = self.client.get('/api/posts/', {'page': 101})
+        self.assertEqual(response.status_code, 404)
+
+    def test_exact_count_in_response(self):
+        data = self.client.get('/api/posts/').json()
+        self.assertEqual(
+            (data['count'], data['count_approximate']), (3, False)
+        )
+
+
+@override_settings(TASKS_EAGER=False)
+class UserStatsTests(TestCase):
+    """Посты пользователя и счетчики его профиля через API."""
+
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.client = APIClient()
+
+    def stats(self, username='author'):
+        """Возвращает ответ /api/users/<username>/stats/."""
+        return self.client.get(f'/api/users/{username}/stats/')
+
+    def as_user(self, user):
+        """Выполняет следующие запросы от имени user."""
+        self.client.force_authenticate(user)
+
+    def test_counters_follow_api_actions(self):
+        self.assertEqual(self.stats().json(), {
+            'username': 'author', 'posts_count': 0,
+            'likes_received': 0, 'comments_received': 0,
+        })
+        self.as_user(self.author)
+        post_id = self.client.post(
+            '/api/posts/', {'text': 'новый пост'}, format='json'
+        ).json()['id']
+        self.as_user(self.reader)
+        comment_id = self.client.post(
+            f'/api/posts/{post_id}/comments/', {'text': 'комментарий'},
+            format='json'
+        ).json()['id']
+        self.client.post(f'/api/posts/{post_id}/like/')
+        self.assertEqual(self.stats().json(), {
+            'username': 'author', 'posts_count': 1,
+            'likes_received': 1, 'comments_received': 1,
+        })
+
+        self.client.post(f'/api/posts/{post_id}/like/')
+        self.as_user(self.author)
+        self.client.delete(f'/api/comments/{comment_id}/delete/')
+        data = self.stats().json()
+        self.assertEqual(
+            (data['likes_received'], data['comments_received']), (0, 0)
+        )
+
+        self.client.post(
+            '/api/posts/', {'text': 'второй пост'}, format='json'
+        )
+        self.client.delete(f'/api/posts/{post_id}/')
+        self.assertEqual(self.stats().json()['posts_count'], 1)
+
+    def test_missing_counters_are_recalculated(self):
+        post = Post.objects.create(author=self.author, text='текст поста')
+        Like.objects.create(post=post, user=self.reader)
+        UserStats.objects.filter(user=self.author).delete()
+        self.assertEqual(self.stats().json(), {
+            'username': 'author', 'posts_count': 1,
+            'likes_received': 1, 'comments_received': 0,
+        })
+        self.assertTrue(UserStats.objects.filter(user=self.author).exists())
+
+    def test_unknown_user(self):
+        self.assertEqual(self.stats('nobody').status_code, 404)
+        response = self.client.get('/api/users/nobody/posts/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_posts_newest_first(self):
+        own = [
+            Post.objects.create(author=self.author, text=f'пост {n}')
+            for n in range(3)
+        ]
+        Post.objects.create(author=self.reader, text='чужой пост')
+        own[0].soft_delete()
+        data = self.client.get('/api/users/author/posts/').json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [own[2].pk, own[1].pk]
+        )
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class UserAdminTests(TestCase):
+    """Инлайн постов пользователя и счетчики в списках админки."""
+
+    def test_inline_shows_latest_posts_of_the_user(self):
+        admin_user = User.objects.create_superuser('admin', '', 'password')
+        author = User.objects.create(username='author')
+        own = [
+            Post.objects.create(author=author, text=f'пост {i}')
+            for i in range(3)
+        ]
+        # Посты других пользователей новее, чем посты автора
+        for i in range(25):
+            Post.objects.create(author=admin_user, text=f'чужой пост {i}')
+        self.client.force_login(admin_user)
+        with override_settings(COUNT_ESTIMATE_THRESHOLD=10 ** 9):
+            response = self.client.get(
+                f'/admin/auth/user/{author.pk}/change/'
+            )
+        self.assertEqual(response.status_code, 200)
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(
+            [post.pk for post in formset.get_queryset()],
+            [post.pk for post in reversed(own)]
+        )
+
+
+    def changelist(self, url):
+        """Возвращает список админки и выполненные им SQL-запросы."""
+        admin_user = User.objects.filter(is_superuser=True).first()
+        if admin_user is None:
+            admin_user = User.objects.create_superuser('admin', '', 'pwd')
+        self.client.force_login(admin_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_changelists_use_denormalized_counters(self):
+        author = User.objects.create(username='author')
+        reader = User.objects.create(username='reader')
+        post = Post.objects.create(author=author, text='текст поста')
+        Like.objects.create(post=post, user=reader)
+        Comment.objects.create(post=post, author=reader, text='комментарий')
+
+        response, queries = self.changelist('/admin/posts/post/')
+        result = response.context['cl'].result_list.get()
+        self.assertEqual((result.likes_count, result.comments_count), (1, 1))
+        self.assertFalse(
+            [sql for sql in queries
+             if 'posts_like' in sql or 'posts_comment' in sql]
+        )
+
+        # Сортировка по столбцу post_count (0 — флажок действий)
+        response, queries = self.changelist('/admin/auth/user/?o=-4')
+        users = list(response.context['cl'].result_list)
+        self.assertEqual(users[0].username, 'author')
+        self.assertEqual(
+            [UserAdmin.post_count(None, user) for user in users],
+            [1, 0, 0]
+        )
+        self.assertFalse([sql for sql in queries if 'posts_post' in sql])
+
+
+class _TestThrottle(SlidingWindowThrottle):
+    """Квота 3 запроса в минуту с управляемыми часами."""
+
+    scope = 'test'
+    rate = '3/min'
+    clock = 0.0
+
+    def timer(self):
+        return self.clock
+
+
+class SlidingWindowThrottleTests(TestCase):
+    """Скользящее окно ограничения частоты запросов."""
+
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        _closed_windows._data.clear()
+        self.request = Request(RequestFactory().get(
+            '/api/posts/', REMOTE_ADDR='10.0.0.1'
+        ))
+        self.request._user = AnonymousUser()
+
+    def allow(self, clock):
+        """Проверяет запрос в момент clock (секунды)."""
+        throttle = _TestThrottle()
+        throttle.clock = clock
+        return throttle.allow_request(self.request, None), throttle
+
+    def test_limit_within_one_window(self):
+        self.assertEqual(
+            [self.allow(60 + i)[0] for i in range(4)],
+            [True, True, True, False]
+        )
+
+    def test_previous_window_is_weighted(self):
+        for i in range(3):
+            self.allow(60 + i)
+        # Середина следующего окна: предыдущее учитывается с весом 1/2,
+        # 3 * 0.5 + 1 <= 3, но 3 * 0.5 + 2 > 3
+        self.assertTrue(self.allow(150)[0])
+        allowed, throttle = self.allow(150)
+        self.assertFalse(allowed)
+        self.assertGreater(throttle.wait(), 0)
+        # Через окно предыдущих запросов уже нет
+        self.assertTrue(self.allow(240)[0])
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        request = RequestFactory().get(
+            '/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.2.3.4'
+        )
+        self.assertEqual(_TestThrottle().get_ident(request), '10.0.0.1')
+
+    def test_api_answers_429_with_retry_after(self):
+        throttle = 'posts.throttling.ReadThrottle.rate'
+        with mock.patch(throttle, '2/min', create=True):
+            statuses = [
+                self.client.get('/api/changes/').status_code
+                for _ in range(3)
+            ]
+            response = self.client.get('/api/changes/')
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertIn('Retry-After', response)
+
+
+@override_settings(ALLOWED_HOSTS=['.example.com'])
+class ConnectionReuseTests(TransactionTestCase):
+    """Постоянные соединения переиспользуются между запросами."""
+
+    path = '/api/changes/'
+
+    def run_mode(self, max_age):
+        """Выполняет 40 запросов в 4 потоках с заданным CONN_MAX_AGE."""
+        settings_dict = connection.settings_dict
+        original = settings_dict['CONN_MAX_AGE']
+        settings_dict['CONN_MAX_AGE'] = max_age
+        try:
+            return bench_connections.Command()._run(
+                self.path, 40, 4, 'example.com'
+            )
+        finally:
+            settings_dict['CONN_MAX_AGE'] = original
+
+    def test_persistent_connections_are_reused(self):
+        latencies, opened, errors = self.run_mode(60)
+        self.assertEqual((len(latencies), errors), (40, 0))
+        self.assertLessEqual(opened, 4)
+        in_memory = (
+            connection.vendor == 'sqlite' and connection.is_in_memory_db()
+        )
+        if not in_memory:
+            # Соединение с базой в памяти не закрывается, поэтому
+            # переподключение видно только с настоящей базой
+            self.assertGreater(self.run_mode(0)[1], 4)
+
+    def test_check_fails_on_errors(self):
+        with self.assertRaisesMessage(CommandError, 'ответов с ошибкой'):
+            call_command(
+                'bench_connections', path='/api/missing/', requests=4,
+                concurrency=2, mode=['persistent'], check=True,
+                stdout=io.StringIO()
+            )
+
+
+@override_settings(ALLOWED_HOSTS=['.example.com'])
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class ProfileEndpointTests(TestCase):
+    """Команда profile_endpoint профилирует маршруты по имени."""
+
+    def profile(self, *args, **options):
+        """Выполняет команду и возвращает первую строку вывода."""
+        stdout = io.StringIO()
+        call_command(
+            'profile_endpoint', *args, runs=2, limit=1, stdout=stdout,
+            **options
+        )
+        return stdout.getvalue().splitlines()[0]
+
+    def test_api_route_is_profiled_under_api_prefix(self):
+        author = User.objects.create(username='author')
+        post = Post.objects.create(author=author, text='текст')
+        self.assertTrue(self.profile('post-list-create').startswith(
+            '/api/posts/: запросов 2'
+        ))
+        self.assertTrue(
+            self.profile('post-detail', url_args=[str(post.pk)])
+            .startswith(f'/api/posts/{post.pk}/:')
+        )
+
+    def test_site_route_is_profiled(self):
+        self.assertTrue(self.profile('index').startswith('/: запросов 2'))
+
+    def test_unknown_route(self):
+        with self.assertRaises(CommandError):
+            self.profile('missing')
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class PostVersionTests(TestCase):
+    """Версии постов, If-Match и история изменений."""
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(author=self.author, text='первый')
+        self.api = APIClient()
+        self.api.force_authenticate(self.author)
+
+    def put(self, text, if_match=None):
+        """Изменяет пост через API."""
+        headers = {'HTTP_IF_MATCH': if_match} if if_match else {}
+        return self.api.put(
+            f'/api/posts/{self.post.pk}/', {'text': text}, format='json',
+            **headers
+        )
+
+    def test_put_with_current_etag(self):
+        etag = self.api.get(f'/api/posts/{self.post.pk}/')['ETag']
+        response = self.put('второй текст', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"2"')
+        revision = PostRevision.objects.get(post=self.post)
+        self.assertEqual(
+            (revision.version, revision.text, revision.editor),
+            (1, 'первый', self.author)
+        )
+
+    def test_put_with_stale_etag_fails(self):
+        self.put('второй текст')
+        response = self.put('третий текст', '"1"')
+        self.assertEqual(response.status_code, 412)
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.text, self.post.version), ('второй текст', 2)
+        )
+
+    def test_same_text_keeps_version(self):
+        self.assertTrue(self.post.edit('первый', 1, self.author))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 1)
+        self.assertFalse(PostRevision.objects.exists())
+
+    def test_save_writes_revision(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'изменен в shell'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.version, 2)
+        self.assertEqual(
+            PostRevision.objects.get(post=post).text, 'первый'
+        )
+
+    def test_save_of_stale_instance_fails(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        self.put('второй текст')
+        stale.text = 'затирает второй'
+        with self.assertRaises(VersionConflict):
+            stale.save()
+
+    def admin_post(self, admin_user, text, version):
+        """Сохраняет пост через форму админки."""
+        self.client.force_login(admin_user)
+        path = f'/admin/posts/post/{self.post.pk}/change/'
+        return self.client.post(path, {
+            'author': self.author.pk, 'text': text,
+            'expected_version': version,
+            'images-TOTAL_FORMS': 0, 'images-INITIAL_FORMS': 0,
+        })
+
+    def test_admin_edit_goes_through_history(self):
+        admin_user = User.objects.create_superuser('admin', '', 'password')
+        response = self.admin_post(admin_user, 'правка сотрудника', 1)
+        self.assertEqual(response.status_code, 302)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+        revision = PostRevision.objects.get(post=self.post)
+        self.assertEqual(
+            (revision.text, revision.editor), ('первый', admin_user)
+        )
+
+    def test_admin_rejects_stale_form(self):
+        admin_user = User.objects.create_superuser('admin', '', 'password')
+        self.put('второй текст')
+        response = self.admin_post(admin_user, 'правка сотрудника', 1)
+        self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'второй текст')
+
+
+@override_settings(TASKS_EAGER=False)
+class OwnerPermissionTests(TestCase):
+    """Изменять посты и комментарии могут владелец и сотрудники."""
+
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        self.owner = User.objects.create(username='owner')
+        self.stranger = User.objects.create(username='stranger')
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.post = Post.objects.create(author=self.owner, text='текст поста')
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.stranger, text='комментарий'
+        )
+        self.client = APIClient()
+
+    def requests(self, user):
+        """Возвращает коды ответов на изменение поста и комментария."""
+        self.client.force_authenticate(user)
+        path = f'/api/posts/{self.post.pk}/'
+        return [
+            self.client.put(path, {'text': 'новый текст'}).status_code,
+            self.client.patch(path, {'text': 'другой текст'}).status_code,
+            self.client.delete(
+                f'/api/comments/{self.comment.pk}/delete/'
+            ).status_code,
+            self.client.delete(path).status_code,
+        ]
+
+    def test_stranger_is_forbidden(self):
+        self.assertEqual(self.requests(self.stranger), [403] * 4)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'текст поста')
+        self.assertIsNone(self.post.deleted_at)
+        self.assertTrue(Comment.objects.filter(pk=self.comment.pk).exists())
+
+    def test_anonymous_is_unauthorized(self):
+        self.assertEqual(self.requests(None), [401] * 4)
+
+    def test_owner_is_allowed(self):
+        self.assertEqual(self.requests(self.owner), [200] * 4)
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_staff_is_allowed(self):
+        self.assertEqual(self.requests(self.staff), [200] * 4)
+        self.assertEqual(
+            PostRevision.objects.filter(post=self.post).count(), 2
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_missing_post_is_not_found(self):
+        self.client.force_authenticate(self.stranger)
+        response = self.client.delete(f'/api/posts/{self.post.pk + 1}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class HotRankingTests(TestCase):
+    """Рейтинг «горячих» постов."""
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.readers = [
+            User.objects.create(username=f'reader{n}') for n in range(3)
+        ]
+
+    def assertScoreMatches(self, post):
+        """Проверяет, что сохраненный рейтинг совпадает с формулой."""
+        post.refresh_from_db()
+        self.assertAlmostEqual(
+            post.hot_score,
+            hot_score(post.likes_count, post.comments_count, post.created_at),
+            places=3
+        )
+
+    def test_decay_equals_tenfold_engagement(self):
+        created_at = timezone.now()
+        later = created_at + datetime.timedelta(seconds=HOT_DECAY_SECONDS)
+        self.assertAlmostEqual(
+            hot_score(10, 0, created_at), hot_score(1, 0, later)
+        )
+        self.assertEqual(
+            hot_score(0, 0, created_at), hot_score(1, 0, created_at)
+        )
+        self.assertAlmostEqual(
+            hot_score(0, 1, created_at), hot_score(2, 0, created_at)
+        )
+
+    def test_score_follows_likes_and_comments(self):
+        post = Post.objects.create(author=self.author, text='текст')
+        self.assertScoreMatches(post)
+        likes = [
+            Like.objects.create(post=post, user=reader)
+            for reader in self.readers
+        ]
+        comment = Comment.objects.create(
+            post=post, author=self.readers[0], text='комментарий'
+        )
+        self.assertScoreMatches(post)
+        likes[0].delete()
+        comment.soft_delete()
+        self.assertScoreMatches(post)
+
+    def test_hot_ordering(self):
+        quiet = Post.objects.create(author=self.author, text='тихий')
+        popular = Post.objects.create(author=self.author, text='популярный')
+        newest = Post.objects.create(author=self.author, text='новый')
+        for reader in self.readers:
+            Like.objects.create(post=popular, user=reader)
+        response = self.client.get('/api/posts/', {'ordering': 'hot'})
+        self.assertEqual(
+            [post['id'] for post in response.json()['results']],
+            [popular.pk, newest.pk, quiet.pk]
+        )
+
+
+_task_calls = []
+
+
+def _record_task(*args, **kwargs):
+    """Задача для тестов очереди: запоминает аргументы."""
+    _task_calls.append((args, kwargs))
+
+
+def _failing_task():
+    """Задача для тестов очереди: всегда завершается ошибкой."""
+    raise RuntimeError('сбой задачи')
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TransactionTestCase):
+    """Очередь фоновых задач в базе данных."""
+
+    def setUp(self):
+        _task_calls.clear()
+
+    def test_task_is_added_after_commit(self):
+        with transaction.atomic():
+            taskqueue.enqueue('posts.tests._record_task', 1, key='a')
+            self.assertFalse(Task.objects.exists())
+        task = Task.objects.get()
+        self.assertEqual((task.args, task.kwargs), ([1], {'key': 'a'}))
+
+    def test_claimed_task_runs_once(self):
+        taskqueue.enqueue('posts.tests._record_task', 1)
+        [task] = taskqueue.claim(10)
+        self.assertEqual((task.status, task.attempts), (Task.RUNNING, 1))
+        self.assertEqual(taskqueue.claim(10), [])
+        self.assertTrue(taskqueue.run(task))
+        self.assertEqual(_task_calls, [((1,), {})])
+        self.assertFalse(Task.objects.exists())
+
+    def test_delayed_task_waits(self):
+        taskqueue.enqueue('posts.tests._record_task', delay=60)
+        self.assertEqual(taskqueue.claim(10), [])
+
+    def test_expired_lease_is_claimed_again(self):
+        taskqueue.enqueue('posts.tests._record_task')
+        taskqueue.claim(10, lease=0)
+        [task] = taskqueue.claim(10)
+        self.assertEqual(task.attempts, 2)
+
+    def test_failed_task_is_retried_then_marked_failed(self):
+        taskqueue.enqueue('posts.tests._failing_task', max_attempts=2)
+        [task] = taskqueue.claim(10)
+        self.assertFalse(taskqueue.run(task))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('сбой задачи', task.last_error)
+
+        Task.objects.update(run_at=timezone.now())
+        [task] = taskqueue.claim(10)
+        self.assertFalse(taskqueue.run(task))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(taskqueue.claim(10), [])
+
+    def test_backoff_grows_up_to_limit(self):
+        for attempt, delay in ((1, 10), (2, 20), (20, taskqueue.BACKOFF_MAX)):
+            self.assertGreaterEqual(taskqueue.backoff(attempt), delay / 2)
+            self.assertLessEqual(taskqueue.backoff(attempt), delay)
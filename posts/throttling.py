@@ -0,0 +1,207 @@
+"""
+Ограничение частоты запросов к API скользящим окном.
+
+Вместо списка отметок времени, который ``SimpleRateThrottle`` читает
+и перезаписывает целиком, для каждого окна хранится один счетчик,
+увеличиваемый атомарно (``cache.incr``, в Redis — INCR). Число запросов
+за последние duration секунд оценивается как
+
+    previous * (1 - elapsed / duration) + current
+
+где current — счетчик текущего окна, previous — предыдущего. Счетчик
+закрытого окна больше не меняется и запоминается в процессе, поэтому
+обычный запрос стоит одного обращения к кешу. Если кеш недоступен,
+счетчики временно ведутся в памяти процесса.
+
+Чтения и записи ограничиваются раздельно: ReadThrottle (scope read)
+пропускает только безопасные методы, WriteThrottle — остальные, с более
+строгой квотой. Представление может задать свою квоту записи атрибутом
+``throttle_scope``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class _LocalCounters:
+    """
+    Счетчики в памяти процесса с ограниченным размером.
+
+    Используются для запомненных значений закрытых окон и как замена
+    кешу, если он недоступен.
+    """
+
+    max_size = 10000
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Возвращает значение или None, если его нет или оно истекло."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                return None
+            return item[0]
+
+    def set(self, key, value, timeout):
+        """Сохраняет значение на timeout секунд."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def incr(self, key, timeout):
+        """Увеличивает счетчик на 1 и возвращает новое значение."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                item = (0, time.monotonic() + timeout)
+            self._data[key] = (item[0] + 1, item[1])
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            return item[0] + 1
+
+
+_closed_windows = _LocalCounters()
+_fallback = _LocalCounters()
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Ограничение по пользователю (или IP для анонимов) скользящим окном.
+
+    Attributes:
+        cache_format: Шаблон ключа счетчика в кеше
+    """
+
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def get_cache_key(self, request, view):
+        """
+        Возвращает ключ счетчика для пользователя или IP-адреса.
+
+        Args:
+            request: HTTP-запрос
+            view: Представление
+
+        Returns:
+            str: Ключ без номера окна
+        """
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def _incr(self, key, timeout):
+        """Атомарно увеличивает счетчик окна в кеше."""
+        cache = caches[settings.THROTTLE_CACHE]
+        try:
+            try:
+                return cache.incr(key)
+            except ValueError:
+                # Первый запрос в окне: ключа еще нет
+                if cache.add(key, 1, timeout):
+                    return 1
+                return cache.incr(key)
+        except Exception:
+            return _fallback.incr(key, timeout)
+
+    def _closed_count(self, key, timeout):
+        """Возвращает счетчик закрытого окна, запоминая его в процессе."""
+        count = _closed_windows.get(key)
+        if count is None:
+            try:
+                count = caches[settings.THROTTLE_CACHE].get(key)
+            except Exception:
+                count = _fallback.get(key)
+            count = count or 0
+            _closed_windows.set(key, count, timeout)
+        return count
+
+    def allow_request(self, request, view):
+        """
+        Учитывает запрос и проверяет, не превышена ли квота.
+
+        Args:
+            request: HTTP-запрос
+            view: Представление
+
+        Returns:
+            bool: True, если запрос разрешен
+        """
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.elapsed = self.now - window * self.duration
+        self.current = self._incr(f'{key}:{window}', 2 * self.duration)
+        self.previous = self._closed_count(
+            f'{key}:{window - 1}', self.duration - self.elapsed
+        )
+        weight = 1 - self.elapsed / self.duration
+        return self.previous * weight + self.current <= self.num_requests
+
+    def wait(self):
+        """
+        Возвращает число секунд до момента, когда запрос будет разрешен.
+
+        Returns:
+            float: Рекомендуемая пауза для заголовка Retry-After
+        """
+        if self.current > self.num_requests:
+            # Текущее окно исчерпано: ждать, пока оно станет предыдущим
+            # и его вес уменьшится достаточно для одного запроса
+            share = (self.num_requests - 1) / self.current
+            return (self.duration - self.elapsed) + self.duration * (
+                1 - share
+            )
+        share = (self.num_requests - self.current) / self.previous
+        return max(self.duration * (1 - share) - self.elapsed, 1)
+
+
+class ReadThrottle(SlidingWindowThrottle):
+    """Квота на чтение (GET, HEAD, OPTIONS)."""
+
+    scope = 'read'
+
+    def allow_request(self, request, view):
+        """Пропускает небезопасные методы без учета."""
+        if request.method not in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
+
+
+class WriteThrottle(SlidingWindowThrottle):
+    """
+    Квота на запись (POST, PUT, PATCH, DELETE).
+
+    Если у представления задан ``throttle_scope``, используется квота
+    с этим именем из DEFAULT_THROTTLE_RATES, иначе — квота write.
+    """
+
+    scope = 'write'
+
+    def allow_request(self, request, view):
+        """Учитывает только небезопасные методы."""
+        if request.method in SAFE_METHODS:
+            return True
+        scope = getattr(view, 'throttle_scope', None)
+        if scope and scope != self.scope:
+            self.scope = scope
+            self.rate = self.get_rate()
+            self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
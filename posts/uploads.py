@@ -0,0 +1,274 @@
+"""
+Прямая загрузка изображений по подписанным ссылкам.
+
+Загрузка идет в два этапа, поэтому рабочие процессы приложения
+обрабатывают только небольшие JSON-запросы:
+
+1. Клиент запрашивает слоты (``create_slots``): для каждого файла
+   выдается подписанный токен и ссылка для PUT, действующая
+   UPLOAD_URL_TIMEOUT секунд.
+2. Клиент отправляет байты файла по ссылке. Локальная замена
+   объектного хранилища (``store``) пишет их в UPLOAD_STAGING_DIR;
+   за фронтовым прокси или в S3-совместимом хранилище ссылку
+   обслуживает оно, а не Django.
+3. Клиент подтверждает загрузку (``open_staged``): проверенные файлы
+   становятся PostImage поста, временные файлы удаляются.
+
+Токен — это подписанные ``django.core.signing`` пользователь, ключ
+временного файла и заявленный размер. Кроме того, для каждого слота
+создается запись PendingUpload: подтверждение удаляет ее
+(``claim_slots``), поэтому токен нельзя подтвердить дважды.
+Неподтвержденные файлы и записи удаляет задача delete_stale_uploads
+после истечения UPLOAD_FINALIZE_TIMEOUT. Число слотов, выданных
+пользователю за UPLOAD_URL_TIMEOUT секунд, ограничено
+MAX_PENDING_UPLOADS: иначе временные файлы могли бы занять весь диск.
+"""
+import datetime
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+from .models import PendingUpload
+from .taskqueue import enqueue
+
+
+UPLOAD_SALT = 'posts.uploads'
+
+ALLOWED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+# Форматы Pillow (PostImage.format) для ALLOWED_EXTENSIONS: расширение
+# заявляет клиент, формат определяется по содержимому файла
+ALLOWED_FORMATS = ('jpeg', 'png', 'gif', 'webp')
+
+# Как в validate_image_size
+MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+
+# Как при загрузке изображений вместе с постом
+MAX_UPLOAD_FILES = 10
+
+# Столько слотов пользователь может получить за UPLOAD_URL_TIMEOUT секунд
+MAX_PENDING_UPLOADS = 3 * MAX_UPLOAD_FILES
+
+SLOTS_CACHE_PREFIX = 'upload-slots:'
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Загруженный файл не соответствует слоту."""
+
+
+class SlotClaimed(UploadError):
+    """Слот уже подтвержден или устарел."""
+
+
+def staging_storage():
+    """Возвращает хранилище временных файлов загрузок."""
+    return FileSystemStorage(location=settings.UPLOAD_STAGING_DIR)
+
+
+def _reserve_slots(user, count):
+    """
+    Учитывает новые слоты пользователя.
+
+    Счетчики хранятся в THROTTLE_CACHE по окнам UPLOAD_URL_TIMEOUT
+    секунд. Действующий слот выдан в текущем или предыдущем окне,
+    поэтому ограничение проверяется по сумме двух счетчиков.
+
+    Args:
+        user: Пользователь, загружающий файлы
+        count: Число новых слотов
+
+    Raises:
+        UploadError: Если слотов стало бы больше MAX_PENDING_UPLOADS
+    """
+    timeout = settings.UPLOAD_URL_TIMEOUT
+    number = int(time.time() // timeout)
+    key = f'{SLOTS_CACHE_PREFIX}{user.pk}:{number}'
+    cache = caches[settings.THROTTLE_CACHE]
+    try:
+        previous = cache.get(f'{SLOTS_CACHE_PREFIX}{user.pk}:{number - 1}')
+        if cache.add(key, count, 2 * timeout):
+            issued = count
+        else:
+            issued = cache.incr(key, count)
+    except Exception:
+        # Кеш недоступен: загрузки важнее ограничения
+        return
+    if (previous or 0) + issued > MAX_PENDING_UPLOADS:
+        try:
+            cache.decr(key, count)
+        except Exception:
+            pass
+        raise UploadError(
+            'Слишком много незавершенных загрузок, повторите позже'
+        )
+
+
+def create_slots(user, files):
+    """
+    Выдает слоты для загрузки файлов.
+
+    Args:
+        user: Пользователь, загружающий файлы
+        files: Список словарей name (нужно только расширение)
+            и size (заявленный размер в байтах)
+
+    Returns:
+        list: Токены слотов — идентификаторы загрузок и части ссылок
+        для PUT — в порядке файлов
+
+    Raises:
+        UploadError: Если превышено MAX_PENDING_UPLOADS
+    """
+    _reserve_slots(user, len(files))
+    tokens = []
+    pending = []
+    for file in files:
+        extension = os.path.splitext(file['name'])[1].lower()
+        key = uuid.uuid4().hex + extension
+        tokens.append(signing.dumps(
+            {'user': user.pk, 'key': key, 'size': file['size']},
+            salt=UPLOAD_SALT
+        ))
+        pending.append(PendingUpload(key=key, user=user))
+    PendingUpload.objects.bulk_create(pending)
+    # К этому времени файлы слотов устареют; задача удаляет все
+    # устаревшие файлы, поэтому ее повтор или раннее выполнение
+    # (TASKS_EAGER) безвредны
+    enqueue(
+        'posts.tasks.delete_stale_uploads',
+        delay=settings.UPLOAD_URL_TIMEOUT + settings.UPLOAD_FINALIZE_TIMEOUT
+    )
+    return tokens
+
+
+def read_slot(token, max_age):
+    """
+    Проверяет подпись и срок действия токена загрузки.
+
+    Args:
+        token: Токен слота
+        max_age: Срок действия в секундах
+
+    Returns:
+        dict: Поля user, key и size слота
+
+    Raises:
+        signing.BadSignature: Если токен поддельный или просрочен
+    """
+    return signing.loads(token, salt=UPLOAD_SALT, max_age=max_age)
+
+
+def claim_slots(user, keys):
+    """
+    Забирает слоты для подтверждения.
+
+    Вызывается в транзакции, сохраняющей изображения: записи слотов
+    удаляются одним DELETE, и из одновременных подтверждений одного
+    слота строки получает только одно, остальные ждут его фиксации
+    и не находят их.
+
+    Args:
+        user: Пользователь, подтверждающий загрузку
+        keys: Ключи временных файлов слотов
+
+    Raises:
+        SlotClaimed: Если хотя бы один слот уже подтвержден или устарел
+    """
+    deleted, _ = PendingUpload.objects.filter(
+        user=user, key__in=keys
+    ).delete()
+    if deleted != len(keys):
+        raise SlotClaimed('Загрузка уже подтверждена или устарела')
+
+
+def store(slot, stream, length):
+    """
+    Записывает тело запроса во временный файл слота.
+
+    Файл появляется под своим именем только целиком, поэтому
+    подтверждение не увидит недописанный файл.
+
+    Args:
+        slot: Данные слота из read_slot
+        stream: Файловый объект с телом запроса
+        length: Значение Content-Length
+
+    Raises:
+        UploadError: Если размер не совпадает с заявленным в слоте
+    """
+    if length != slot['size']:
+        raise UploadError('Размер файла не совпадает с заявленным')
+    path = staging_storage().path(slot['key'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Свое имя частичного файла: повторная отправка по той же ссылке
+    # не смешается с текущей
+    partial = f'{path}.{uuid.uuid4().hex}.part'
+    written = 0
+    try:
+        with open(partial, 'wb') as file:
+            while chunk := stream.read(CHUNK_SIZE):
+                written += len(chunk)
+                if written > length:
+                    break
+                file.write(chunk)
+        if written != length:
+            raise UploadError('Файл загружен не полностью')
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def open_staged(key):
+    """
+    Открывает загруженный временный файл.
+
+    Raises:
+        FileNotFoundError: Если файл не загружен
+    """
+    return staging_storage().open(key, 'rb')
+
+
+def delete_staged(key):
+    """Удаляет временный файл загрузки, если он есть."""
+    staging_storage().delete(key)
+
+
+def delete_stale(max_age):
+    """
+    Удаляет временные файлы, записанные больше max_age секунд назад,
+    в том числе недописанные, и записи слотов, выданных раньше.
+
+    Args:
+        max_age: Возраст файла в секундах
+
+    Returns:
+        int: Число удаленных файлов
+    """
+    PendingUpload.objects.filter(
+        created_at__lt=timezone.now() - datetime.timedelta(seconds=max_age)
+    ).delete()
+    storage = staging_storage()
+    try:
+        _, names = storage.listdir('')
+    except FileNotFoundError:
+        return 0
+    deadline = time.time() - max_age
+    deleted = 0
+    for name in names:
+        path = storage.path(name)
+        try:
+            if os.path.getmtime(path) < deadline:
+                os.remove(path)
+                deleted += 1
+        except FileNotFoundError:
+            pass
+    return deleted
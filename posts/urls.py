@@ -4,16 +4,29 @@ from .views import (
     PostListCreateView,
     PostDetailView,
     CommentCreateView,
+    CommentExportView,
     LikeToggleView,
     index,
     RegisterView,
     DeleteImageView,
     DeleteCommentView,
+    UploadSlotsView,
+    PostImagesView,
+    upload_put,
+    ChangesView,
+    ExportView,
+    UserPostsView,
+    UserStatsView,
+    NotificationListView,
+    NotificationUnreadCountView,
+    NotificationReadView,
+    event_stream,
 )
 
 
-urlpatterns = [
-    path('', index, name='index'),
+# Маршруты API без главной страницы: их же подключает
+# social_media.urls_api для процессов, обслуживающих только /api/
+api_urlpatterns = [
     path('posts/', PostListCreateView.as_view(), name='post-list-create'),
     path('posts/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
     path(
@@ -21,12 +34,49 @@ urlpatterns = [
         CommentCreateView.as_view(),
         name='comment-create'
     ),
+    path(
+        'posts/<int:post_id>/comments/export/',
+        CommentExportView.as_view(),
+        name='comment-export'
+    ),
     path(
         'posts/<int:post_id>/like/',
         LikeToggleView.as_view(),
         name='like-toggle'
     ),
     path('register/', RegisterView.as_view(), name='register'),
+    path(
+        'users/<str:username>/posts/',
+        UserPostsView.as_view(),
+        name='user-posts'
+    ),
+    path(
+        'users/<str:username>/stats/',
+        UserStatsView.as_view(),
+        name='user-stats'
+    ),
+    path(
+        'notifications/',
+        NotificationListView.as_view(),
+        name='notification-list'
+    ),
+    path(
+        'notifications/unread_count/',
+        NotificationUnreadCountView.as_view(),
+        name='notification-unread-count'
+    ),
+    path(
+        'notifications/read/',
+        NotificationReadView.as_view(),
+        name='notification-read'
+    ),
+    path('uploads/', UploadSlotsView.as_view(), name='upload-slots'),
+    path('uploads/<str:token>/', upload_put, name='upload-put'),
+    path(
+        'posts/<int:pk>/images/',
+        PostImagesView.as_view(),
+        name='post-images'
+    ),
     path(
         'posts/<int:pk>/delete_image/',
         DeleteImageView.as_view(),
@@ -37,4 +87,11 @@ urlpatterns = [
         DeleteCommentView.as_view(),
         name='delete-comment'
     ),
+    path('events/', event_stream, name='event-stream'),
+    path('changes/', ChangesView.as_view(), name='changes'),
+    path('export/<str:table>/', ExportView.as_view(), name='export'),
 ]
+
+urlpatterns = [
+    path('', index, name='index'),
+] + api_urlpatterns
@@ -1,17 +1,71 @@
+import asyncio
+import datetime
+import mimetypes
+from contextlib import ExitStack
+from functools import lru_cache, partial
+from pathlib import Path
+
 from rest_framework import generics, permissions, status, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import Throttled, ValidationError
 from django.core.exceptions import ValidationError as DjangoValidationError
-from .models import Post, Comment, Like, PostImage
+from .models import (
+    Post, Comment, Like, PostImage, ChangeLog, UserStats, Notification
+)
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import DateTimeField, ExpressionWrapper, F, Subquery
+from django.core import signing
+from django.core.files import File
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.encoding import escape_uri_path
+from django.utils.http import http_date
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from django.views.static import was_modified_since
 from .serializers import (
     PostSerializer,
     CommentSerializer,
     UserRegisterSerializer,
-    LikeSerializer
+    UserStatsSerializer,
+    NotificationSerializer,
+    LikeSerializer,
+    UploadSlotsSerializer,
+    FinalizeImagesSerializer
+)
+from .fast_serializers import (
+    PostReadSerializer,
+    CommentReadSerializer,
+    iter_batches,
+    media_url_prefix
 )
+from .renderers import StreamingJSONResponse, dumps
+from .events import get_broker, publish_event
+from . import export
+from .middleware import choose_encoding
+from .partitioning import CLOCK_SKEW_MARGIN, comments_since
+from .exceptions import Conflict, PreconditionFailed
+from .permissions import IsOwnerOrStaff, OwnerScopedMixin, owned_by
+from .storage import is_content_addressed
+from .coalescing import coalesced, post_key
+from . import uploads
 
 
 def index(request):
@@ -19,6 +73,268 @@ def index(request):
     return render(request, 'posts/index.html')
 
 
+@lru_cache(maxsize=1)
+def _hashed_static_names():
+    """Возвращает множество имен статики с хешем содержимого."""
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve_static(request, path):
+    """
+    Отдает статику из STATIC_ROOT с заранее сжатыми копиями.
+
+    Файлы с хешем в имени кешируются клиентом на год.
+
+    Args:
+        request: HTTP-запрос
+        path: Путь к файлу относительно STATIC_ROOT
+
+    Returns:
+        FileResponse: Содержимое файла
+    """
+    try:
+        fullpath = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404
+    if not fullpath.is_file():
+        raise Http404
+    statobj = fullpath.stat()
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'), statobj.st_mtime
+    ):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(fullpath.name)[0]
+    available = [
+        encoding for encoding, suffix in (('br', '.br'), ('gzip', '.gz'))
+        if fullpath.with_name(fullpath.name + suffix).is_file()
+    ]
+    encoding = choose_encoding(
+        request.META.get('HTTP_ACCEPT_ENCODING', ''), available
+    ) if available else None
+    if encoding:
+        suffix = '.br' if encoding == 'br' else '.gz'
+        fullpath = fullpath.with_name(fullpath.name + suffix)
+
+    response = FileResponse(
+        fullpath.open('rb'),
+        content_type=content_type or 'application/octet-stream'
+    )
+    response.headers['Last-Modified'] = http_date(statobj.st_mtime)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if available:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    if path in _hashed_static_names():
+        response.headers['Cache-Control'] = (
+            'public, max-age=31536000, immutable'
+        )
+    return response
+
+
+async def event_stream(request):
+    """
+    Поток событий ленты в формате Server-Sent Events.
+
+    Работает только под ASGI (social_media.asgi): соединение удерживается
+    без занятия рабочего потока. Под WSGI поток занял бы поток воркера
+    навсегда, поэтому возвращается 204 — по спецификации SSE браузер
+    не переподключается, и клиент переходит на периодическую загрузку
+    ленты. Каждые EVENTS_HEARTBEAT секунд отправляется комментарий,
+    чтобы прокси не закрывали соединение.
+
+    События содержат только ID: данные поста клиент загружает сам,
+    с учетом своих прав и абсолютными URL изображений.
+
+    Args:
+        request: HTTP-запрос
+
+    Returns:
+        StreamingHttpResponse | HttpResponse: Поток событий
+        text/event-stream или пустой ответ 204 вне ASGI
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+    heartbeat = settings.EVENTS_HEARTBEAT
+
+    async def stream():
+        async with get_broker().subscribe() as queue:
+            yield b'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    event = None
+                if event is None:
+                    yield b': ping\n\n'
+                else:
+                    yield b'data: ' + dumps(event) + b'\n\n'
+
+    response = StreamingHttpResponse(
+        stream(), content_type='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class _RangeFile:
+    """
+    Файловый объект, который читает только заданный диапазон байтов.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        self.file.seek(start)
+
+    def read(self, size=-1):
+        """Читает не больше оставшейся части диапазона."""
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        """Закрывает исходный файл."""
+        self.file.close()
+
+
+def _parse_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном байтов.
+
+    Args:
+        header: Значение заголовка Range
+        size: Размер файла
+
+    Returns:
+        tuple | None: (начало, конец) включительно или None, если заголовок
+        не поддерживается и нужно отдать файл целиком
+
+    Raises:
+        ValueError: Если диапазон невыполним
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None
+    start, _, end = spec.strip().partition('-')
+    try:
+        if start:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+        elif end:
+            start = max(size - int(end), 0)
+            end = size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def serve_media(request, path):
+    """
+    Отдает загруженные изображения постов.
+
+    Файл отдается, только если он принадлежит существующему PostImage.
+    При MEDIA_SENDFILE = 'nginx' или 'apache' передача файла делегируется
+    фронтовому прокси через X-Accel-Redirect или X-Sendfile. Иначе файл
+    отдается через FileResponse, который WSGI-сервер передает
+    через os.sendfile. Поддерживаются ETag и запросы диапазонов байтов.
+
+    Args:
+        request: HTTP-запрос
+        path: Путь к файлу относительно MEDIA_ROOT
+
+    Returns:
+        HttpResponse: Содержимое файла или ответ для прокси
+    """
+    if not PostImage.objects.filter(
+        image=path, post__deleted_at__isnull=True
+    ).exists():
+        raise Http404
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+        statobj = fullpath.stat()
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+
+    immutable = is_content_addressed(path)
+    if immutable:
+        etag = '"%s"' % fullpath.stem
+    else:
+        etag = '"%x-%x"' % (statobj.st_mtime_ns, statobj.st_size)
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=int(statobj.st_mtime)
+    )
+    if conditional is not None:
+        return conditional
+
+    content_type = (
+        mimetypes.guess_type(fullpath.name)[0] or 'application/octet-stream'
+    )
+    backend = settings.MEDIA_SENDFILE
+    if backend == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Accel-Redirect'] = escape_uri_path(
+            settings.MEDIA_ACCEL_PREFIX + path
+        )
+    elif backend == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Sendfile'] = str(fullpath)
+    else:
+        response = _file_response(request, fullpath, statobj, content_type,
+                                  etag)
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(statobj.st_mtime)
+    if immutable:
+        response.headers['Cache-Control'] = (
+            'public, max-age=31536000, immutable'
+        )
+    return response
+
+
+def _file_response(request, fullpath, statobj, content_type, etag):
+    """
+    Создает FileResponse для всего файла или для запрошенного диапазона.
+    """
+    size = statobj.st_size
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = 'bytes */%d' % size
+            return response
+
+    if byte_range is None:
+        response = FileResponse(fullpath.open('rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            _RangeFile(fullpath.open('rb'), start, length),
+            content_type=content_type,
+            status=206
+        )
+        response.headers['Content-Length'] = str(length)
+        response.headers['Content-Range'] = 'bytes %d-%d/%d' % (
+            start, end, size
+        )
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
 class PostListCreateView(generics.ListCreateAPIView):
     """
     Представление для отображения списка постов и создания новых.
@@ -32,13 +348,38 @@ class PostListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         """
-        Возвращает список постов, отсортированных по дате
+        Возвращает список постов, отсортированных по дате или, при
+        ?ordering=hot, по рейтингу «горячих» постов.
 
         Returns:
             QuerySet: Отсортированные посты
         """
+        if self.request.query_params.get('ordering') == 'hot':
+            return Post.objects.all().order_by('-hot_score', '-id')
         return Post.objects.all().order_by('-created_at')
 
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает страницу постов через быстрый сериализатор.
+
+        Args:
+            request: HTTP-запрос
+            args: Дополнительные аргументы
+            kwargs: Дополнительные именованные аргументы
+
+        Returns:
+            Response: Список постов
+        """
+        queryset = PostReadSerializer.values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            data = PostReadSerializer(page, request=request).data
+            return self.get_paginated_response(data)
+        data = PostReadSerializer(list(queryset), request=request).data
+        return Response(data)
+
     def perform_create(self, serializer):
         """
         Создает новый пост и связанные изображения.
@@ -59,18 +400,120 @@ class PostListCreateView(generics.ListCreateAPIView):
                 post.delete()
                 raise serializers.ValidationError({'images': str(e)})
 
+        publish_event('post_created', post_id=post.pk)
+
+
+def _post_etag(version):
+    """Возвращает значение заголовка ETag для версии поста."""
+    return '"%d"' % version
+
+
+def _if_match(request, version):
+    """
+    Проверяет заголовок If-Match запроса на изменение поста.
+
+    Слабые теги (W/"3") принимаются: их выставляет CompressionMiddleware
+    при сжатии ответа.
 
-class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
+    Args:
+        request: HTTP-запрос
+        version: Текущая версия поста
+
+    Returns:
+        bool: True, если заголовка нет, он равен * или содержит
+        ETag текущей версии
+    """
+    header = request.headers.get('If-Match')
+    if not header or header.strip() == '*':
+        return True
+    tags = {
+        tag.strip().removeprefix('W/') for tag in header.split(',')
+    }
+    return _post_etag(version) in tags
+
+
+def _load_post(pk):
+    """
+    Загружает данные поста для кеша, не зависящие от запроса.
+
+    Args:
+        pk: ID поста
+
+    Returns:
+        dict | None: data — пост со ссылками на изображения без хоста
+        и can_edit = None, author_id и version; None, если поста нет
+    """
+    rows = list(PostReadSerializer.values(Post.objects.filter(pk=pk)))
+    if not rows:
+        return None
+    return {
+        'data': PostReadSerializer(rows).data[0],
+        'author_id': rows[0]['author_id'],
+        'version': rows[0]['version'],
+    }
+
+
+def _personalize_post(cached, request):
+    """
+    Дополняет данные поста из кеша полями, зависящими от запроса.
+
+    Args:
+        cached: Результат _load_post
+        request: HTTP-запрос
+
+    Returns:
+        dict: Данные поста, как их возвращает PostReadSerializer
+    """
+    data = dict(cached['data'])
+    base = media_url_prefix()
+    prefix = media_url_prefix(request)
+    data['image_details'] = [
+        dict(image, url=prefix + image['url'][len(base):])
+        for image in data['image_details']
+    ]
+    data['images'] = [image['url'] for image in data['image_details']]
+    can_edit = PostReadSerializer((), request=request).get_can_edit()
+    data['can_edit'] = can_edit(cached['author_id'])
+    return data
+
+
+class PostDetailView(OwnerScopedMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Представление для отображения, обновления и удаления конкретного поста.
 
+    Изменять и удалять пост может автор или сотрудник; права проверяются
+    по флагу is_owner, загруженному вместе с постом.
+
+    Ответы GET и PUT содержат ETag с версией поста. Если PUT/PATCH
+    передает его в If-Match, а пост за это время изменили, возвращается
+    412 Precondition Failed.
+
     GET: Получить детали поста
     PUT: Обновить пост
     DELETE: Удалить пост
     """
     queryset = Post.objects.all()
     serializer_class = PostSerializer
-    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    permission_classes = [
+        permissions.IsAuthenticatedOrReadOnly, IsOwnerOrStaff
+    ]
+
+    def get_object(self):
+        """
+        Возвращает пост, загружая его один раз за запрос.
+
+        put(), update() и perform_update() обращаются к объекту
+        по очереди; без кеширования каждый вызов выполнял бы SELECT.
+
+        Returns:
+            Post: Пост
+
+        Raises:
+            Http404: Если пост не найден
+        """
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
 
     def get_serializer_context(self):
         """
@@ -83,9 +526,36 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
         context['request'] = self.request
         return context
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Возвращает пост через быстрый сериализатор.
+
+        Данные поста берутся из кеша (posts.coalescing): при промахе
+        их загружает из базы один запрос на пост, остальные ждут его
+        или получают предыдущую версию.
+
+        Args:
+            request: HTTP-запрос
+            args: Дополнительные аргументы
+            kwargs: Дополнительные именованные аргументы
+
+        Returns:
+            Response: Данные поста
+
+        Raises:
+            Http404: Если пост не найден
+        """
+        pk = self.kwargs[self.lookup_field]
+        cached = coalesced(post_key(pk, 'detail'), partial(_load_post, pk))
+        if cached is None:
+            raise Http404
+        response = Response(_personalize_post(cached, request))
+        response['ETag'] = _post_etag(cached['version'])
+        return response
+
     def delete(self, request, *args, **kwargs):
         """
-        Удаляет пост, если пользователь является его автором.
+        Удаляет пост.
 
         Args:
             request: HTTP-запрос
@@ -94,23 +564,19 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
 
         Returns:
             Response: Ответ с сообщением об успешном удалении
-            или ошибкой доступа
+
+        Raises:
+            PermissionDenied: Если пользователь не автор и не сотрудник
         """
-        post = self.get_object()
-        if post.author != request.user:
-            return Response(
-                {'error': 'You are not the owner of this post'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        self.perform_destroy(post)
+        self.perform_destroy(self.get_object())
         return Response(
             {'message': 'Пост успешно удален'},
             status=status.HTTP_200_OK
         )
 
-    def put(self, request, *args, **kwargs):
+    def update(self, request, *args, **kwargs):
         """
-        Обновляет пост, если пользователь является его автором.
+        Обновляет пост и возвращает ETag новой версии.
 
         Args:
             request: HTTP-запрос
@@ -118,15 +584,11 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
             kwargs: Дополнительные именованные аргументы
 
         Returns:
-            Response: Ответ с результатом операции
+            Response: Обновленный пост
         """
-        post = self.get_object()
-        if post.author != request.user:
-            return Response(
-                {'error': 'You are not the owner of this post'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        return super().put(request, *args, **kwargs)
+        response = super().update(request, *args, **kwargs)
+        response['ETag'] = _post_etag(self.get_object().version)
+        return response
 
     def perform_update(self, serializer):
         """
@@ -136,27 +598,26 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
             serializer: Сериализатор с валидированными данными
 
         Raises:
-            PermissionDenied: Если пользователь не имеет прав на редактирование
+            PreconditionFailed: Если If-Match не совпадает с версией поста
         """
         post = self.get_object()
-        if post.author != self.request.user and not self.request.user.is_staff:
-            raise PermissionDenied("Вы не можете редактировать этот пост")
-        serializer.save()
+        if not _if_match(self.request, post.version):
+            raise PreconditionFailed()
+        post = serializer.save(editor=self.request.user)
+        publish_event('post_updated', post_id=post.pk)
 
     def perform_destroy(self, instance):
         """
-        Выполняет удаление поста.
+        Помечает пост удаленным.
+
+        Комментарии, лайки и файлы изображений удаляются фоновой
+        задачей, поэтому ответ не ждет каскадного удаления.
 
         Args:
             instance: Экземпляр модели Post
-
-        Raises:
-            PermissionDenied: Если пользователь не имеет прав на удаление
         """
-        if (instance.author != self.request.user
-                and not self.request.user.is_staff):
-            raise PermissionDenied("Вы не можете удалить этот пост")
-        instance.delete()
+        if instance.soft_delete():
+            publish_event('post_deleted', post_id=instance.pk)
 
 
 class CommentCreateView(generics.ListCreateAPIView):
@@ -168,6 +629,7 @@ class CommentCreateView(generics.ListCreateAPIView):
     """
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    throttle_scope = 'comment'
 
     def get_permissions(self):
         """
@@ -184,11 +646,87 @@ class CommentCreateView(generics.ListCreateAPIView):
         """
         Возвращает список комментариев к определенному посту.
 
+        Нижняя граница created_at по дате поста позволяет PostgreSQL
+        не читать секции старше поста.
+
         Returns:
             QuerySet: Комментарии, отфильтрованные по ID поста
         """
         post_id = self.kwargs['post_id']
-        return Comment.objects.filter(post_id=post_id).order_by('-created_at')
+        post_created_at = Post.objects.filter(pk=post_id).values(
+            'created_at'
+        )[:1]
+        return Comment.objects.filter(
+            post_id=post_id,
+            created_at__gte=ExpressionWrapper(
+                Subquery(post_created_at) - CLOCK_SKEW_MARGIN,
+                output_field=DateTimeField()
+            )
+        ).order_by('-created_at')
+
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает страницу комментариев через быстрый сериализатор.
+
+        Страница кешируется (posts.coalescing) до следующего изменения
+        комментариев поста. Ключ составляется из проверенного номера
+        страницы, а не из строки запроса: лишние параметры не должны
+        плодить записи кеша. Порядок у комментариев один
+        (-created_at), поэтому в ключ он не входит. Хост и путь
+        в ключе нужны для ссылок next и previous; хост проверен
+        по ALLOWED_HOSTS.
+
+        Args:
+            request: HTTP-запрос
+            args: Дополнительные аргументы
+            kwargs: Дополнительные именованные аргументы
+
+        Returns:
+            Response: Список комментариев
+
+        Raises:
+            NotFound: Если страницы нет
+        """
+        page = self._page_number()
+        if page is None:
+            return Response(self._list_data())
+        key = post_key(
+            self.kwargs['post_id'], 'comments', request.scheme,
+            request.get_host(), request.path, page
+        )
+        return Response(coalesced(key, self._list_data))
+
+    def _page_number(self):
+        """
+        Возвращает запрошенный номер страницы для ключа кеша.
+
+        Returns:
+            int | str | None: Номер страницы, строка последней страницы
+            ('last') или None, если номер некорректен и страница
+            не кешируется
+        """
+        paginator = self.paginator
+        if paginator is None:
+            return 1
+        page = self.request.query_params.get(paginator.page_query_param, 1)
+        if page in paginator.last_page_strings:
+            return page
+        try:
+            number = int(page)
+        except (TypeError, ValueError):
+            return None
+        return number if number > 0 else None
+
+    def _list_data(self):
+        """Возвращает данные ответа со страницей комментариев."""
+        queryset = CommentReadSerializer.values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            data = CommentReadSerializer(page).data
+            return self.get_paginated_response(data).data
+        return CommentReadSerializer(list(queryset)).data
 
     def perform_create(self, serializer):
         """
@@ -198,7 +736,45 @@ class CommentCreateView(generics.ListCreateAPIView):
             serializer: Сериализатор с валидированными данными
         """
         post = get_object_or_404(Post, id=self.kwargs['post_id'])
-        serializer.save(post=post, author=self.request.user)
+        comment = serializer.save(post=post, author=self.request.user)
+        publish_event(
+            'comment_added',
+            post_id=post.pk,
+            comment=CommentSerializer(comment).data
+        )
+
+
+class CommentExportView(APIView):
+    """
+    Представление для выгрузки всех комментариев к посту.
+
+    GET: Потоково отдать комментарии к посту одним JSON-массивом
+    """
+    permission_classes = [permissions.AllowAny]
+    chunk_size = 500
+
+    def get(self, request, post_id):
+        """
+        Отдает комментарии пачками, не загружая их все в память.
+
+        Args:
+            request: HTTP-запрос
+            post_id: ID поста
+
+        Returns:
+            StreamingJSONResponse: Потоковый ответ со списком комментариев
+        """
+        post = get_object_or_404(Post, id=post_id)
+        rows = CommentReadSerializer.values(
+            Comment.objects.filter(
+                post_id=post_id,
+                created_at__gte=comments_since(post.created_at)
+            ).order_by('id')
+        ).iterator(chunk_size=self.chunk_size)
+        return StreamingJSONResponse(
+            CommentReadSerializer(batch).data
+            for batch in iter_batches(rows, self.chunk_size)
+        )
 
 
 class LikeToggleView(generics.CreateAPIView):
@@ -210,6 +786,7 @@ class LikeToggleView(generics.CreateAPIView):
     queryset = Like.objects.all()
     serializer_class = LikeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'like'
 
     def create(self, request, *args, **kwargs):
         """
@@ -227,10 +804,19 @@ class LikeToggleView(generics.CreateAPIView):
         post = get_object_or_404(Post, id=post_id)
         user = request.user
 
-        like, created = Like.objects.get_or_create(post=post, user=user)
+        likes = Like.objects.filter(post_created_at=post.created_at)
+        like, created = likes.get_or_create(post=post, user=user)
 
         if not created:
             like.delete()
+        post.refresh_from_db(fields=['likes_count'])
+        publish_event(
+            'like_changed',
+            post_id=post.pk,
+            likes_count=post.likes_count
+        )
+
+        if not created:
             return Response(
                 {'status': 'unliked'},
                 status=status.HTTP_200_OK
@@ -242,6 +828,344 @@ class LikeToggleView(generics.CreateAPIView):
         )
 
 
+class ChangesView(APIView):
+    """
+    Представление для синхронизации изменений.
+
+    GET: Получить изменения постов, комментариев и лайков после токена since
+
+    Без параметра since возвращает только текущий токен, с которого
+    клиент начинает следить за изменениями. За один запрос обрабатывается
+    не больше limit записей журнала; если есть еще, has_more = true.
+
+    Параллельные транзакции фиксируются не по порядку id, поэтому запись
+    с меньшим id может появиться позже. Токен не продвигается дальше
+    записей старше CHANGES_SAFE_HORIZON секунд: более новые изменения
+    возвращаются и в следующем ответе (перекрытие), а запись, которую
+    транзакция еще не зафиксировала, попадет в один из следующих.
+    Клиент применяет изменения повторно без вреда: это последнее
+    состояние объектов.
+    """
+    permission_classes = [permissions.AllowAny]
+    default_limit = 500
+    max_limit = 1000
+
+    def get(self, request):
+        """
+        Возвращает пачку изменений после токена.
+
+        Args:
+            request: HTTP-запрос
+
+        Returns:
+            Response: Измененные объекты, удаленные ID и следующий токен
+        """
+        try:
+            since = request.query_params.get('since')
+            since = int(since) if since is not None else None
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response(
+                {'error': 'since и limit должны быть целыми числами'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, self.max_limit))
+
+        horizon = timezone.now() - datetime.timedelta(
+            seconds=settings.CHANGES_SAFE_HORIZON
+        )
+        if since is None:
+            latest = ChangeLog.objects.filter(
+                created_at__lt=horizon
+            ).order_by('-id').values_list('id', flat=True).first()
+            return Response({'next': str(latest or 0), 'has_more': False})
+
+        entries = list(
+            ChangeLog.objects.filter(id__gt=since)
+            .order_by('id')
+            .values_list(
+                'id', 'entity', 'entity_id', 'post_id', 'action',
+                'created_at'
+            )[:limit + 1]
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        settled = [entry[0] for entry in entries if entry[5] < horizon]
+        next_token = settled[-1] if settled else since
+        # Если токен не сдвинулся, оставшиеся записи еще слишком новые:
+        # повторный запрос сразу вернул бы ту же пачку
+        has_more = has_more and next_token > since
+
+        # Для каждого объекта важно только последнее изменение
+        latest = {}
+        for _, entity, entity_id, post_id, action, _ in entries:
+            latest[entity, entity_id] = (post_id, action)
+
+        changed_posts, changed_comments, liked_posts = set(), set(), set()
+        deleted = {'posts': [], 'comments': [], 'images': []}
+        for (entity, entity_id), (post_id, action) in latest.items():
+            if entity == ChangeLog.LIKE:
+                liked_posts.add(post_id)
+            elif action == ChangeLog.DELETE:
+                deleted[entity + 's'].append(entity_id)
+                if entity == ChangeLog.IMAGE:
+                    changed_posts.add(post_id)
+            elif entity == ChangeLog.POST:
+                changed_posts.add(entity_id)
+            elif entity == ChangeLog.COMMENT:
+                changed_comments.add(entity_id)
+            elif entity == ChangeLog.IMAGE:
+                changed_posts.add(post_id)
+
+        changed_posts -= set(deleted['posts'])
+        liked_posts -= set(deleted['posts']) | changed_posts
+
+        post_rows = list(PostReadSerializer.values(
+            Post.objects.filter(pk__in=changed_posts).order_by('id')
+        ))
+        comment_rows = list(CommentReadSerializer.values(
+            Comment.objects.filter(pk__in=changed_comments).order_by('id')
+        ))
+        comments = CommentReadSerializer(comment_rows).data
+        for row, data in zip(comment_rows, comments):
+            data['post_id'] = row['post_id']
+        likes = dict(
+            Post.objects.filter(pk__in=liked_posts)
+            .values_list('id', 'likes_count')
+        )
+
+        return Response({
+            'next': str(next_token),
+            'has_more': has_more,
+            'posts': PostReadSerializer(
+                post_rows, request=request, include_comments=False
+            ).data,
+            'comments': comments,
+            'likes': [
+                {'post_id': post_id, 'likes_count': likes.get(post_id, 0)}
+                for post_id in sorted(liked_posts)
+            ],
+            'deleted': deleted,
+        })
+
+
+class ExportView(APIView):
+    """
+    Представление для потоковой выгрузки таблицы (только администраторы).
+
+    GET: Выгрузить posts, comments, likes или images в NDJSON
+    (layout=ndjson) или колоночными пачками (layout=columnar),
+    начиная с id больше after_id
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, table):
+        """
+        Отдает строки таблицы потоком с постоянным расходом памяти.
+
+        Args:
+            request: HTTP-запрос
+            table: Имя выгрузки
+
+        Returns:
+            StreamingHttpResponse: Поток строк NDJSON
+        """
+        if table not in export.EXPORTS:
+            raise Http404
+        encode = export.ENCODERS.get(
+            request.query_params.get('layout', 'ndjson')
+        )
+        try:
+            after_id = int(request.query_params.get('after_id', 0))
+        except ValueError:
+            after_id = None
+        if encode is None or after_id is None:
+            return Response(
+                {'error': 'Неверный формат или after_id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        chunks = export.iter_chunks(table, after_id=after_id)
+        return StreamingHttpResponse(
+            (encode(chunk) for chunk in chunks),
+            content_type='application/x-ndjson'
+        )
+
+
+class UserPostsView(generics.ListAPIView):
+    """
+    Представление для отображения постов одного пользователя.
+
+    GET: Получить посты пользователя, новые первыми
+    """
+    serializer_class = PostSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        """
+        Возвращает посты пользователя в порядке индекса
+        (author_id, created_at DESC, id).
+
+        Returns:
+            QuerySet: Посты пользователя
+
+        Raises:
+            Http404: Если пользователь не найден
+        """
+        user = get_object_or_404(User, username=self.kwargs['username'])
+        return Post.objects.filter(author_id=user.pk).order_by(
+            '-created_at', 'id'
+        )
+
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает страницу постов через быстрый сериализатор.
+
+        Args:
+            request: HTTP-запрос
+            args: Дополнительные аргументы
+            kwargs: Дополнительные именованные аргументы
+
+        Returns:
+            Response: Список постов пользователя
+        """
+        queryset = PostReadSerializer.values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            data = PostReadSerializer(page, request=request).data
+            return self.get_paginated_response(data)
+        data = PostReadSerializer(list(queryset), request=request).data
+        return Response(data)
+
+
+class UserStatsView(generics.RetrieveAPIView):
+    """
+    Представление для статистики профиля пользователя.
+
+    GET: Получить количество постов, полученных лайков и комментариев
+    """
+    serializer_class = UserStatsSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_object(self):
+        """
+        Возвращает счетчики пользователя.
+
+        Если счетчиков еще нет (пользователь создан в обход сигналов),
+        они пересчитываются по данным таблиц.
+
+        Returns:
+            UserStats: Счетчики пользователя
+
+        Raises:
+            Http404: Если пользователь не найден
+        """
+        username = self.kwargs['username']
+        stats = UserStats.objects.select_related('user').filter(
+            user__username=username
+        ).first()
+        if stats is None:
+            user = get_object_or_404(User, username=username)
+            stats = UserStats.recalculate(user)
+        return stats
+
+
+class NotificationListView(generics.ListAPIView):
+    """
+    Представление для уведомлений текущего пользователя.
+
+    GET: Получить уведомления, сначала обновленные последними
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        """
+        Возвращает уведомления текущего пользователя.
+
+        Returns:
+            QuerySet: Уведомления с последним участником
+        """
+        return Notification.objects.filter(
+            recipient=self.request.user
+        ).select_related('last_actor').order_by('-updated_at', '-id')
+
+
+def _unread_notifications(user):
+    """Возвращает счетчик непрочитанных уведомлений пользователя."""
+    unread = UserStats.objects.filter(user=user).values_list(
+        'unread_notifications', flat=True
+    ).first()
+    if unread is None:
+        unread = UserStats.recalculate(user).unread_notifications
+    return unread
+
+
+class NotificationUnreadCountView(APIView):
+    """
+    Представление для количества непрочитанных уведомлений.
+
+    GET: Получить счетчик из UserStats (без подсчета строк)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """
+        Возвращает количество непрочитанных уведомлений.
+
+        Args:
+            request: HTTP-запрос
+
+        Returns:
+            Response: Словарь с полем unread
+        """
+        return Response({'unread': _unread_notifications(request.user)})
+
+
+class NotificationReadView(APIView):
+    """
+    Представление для отметки уведомлений прочитанными.
+
+    POST: Отметить прочитанными уведомления из ids или все
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """
+        Отмечает уведомления прочитанными и уменьшает счетчик.
+
+        Args:
+            request: HTTP-запрос
+
+        Returns:
+            Response: Количество отмеченных и оставшихся непрочитанных
+        """
+        notifications = Notification.objects.filter(
+            recipient=request.user, is_read=False
+        )
+        ids = request.data.get('ids')
+        if ids is not None:
+            if not isinstance(ids, list) or not all(
+                isinstance(pk, int) for pk in ids
+            ):
+                return Response(
+                    {'error': 'ids должен быть списком чисел'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            notifications = notifications.filter(pk__in=ids)
+        with transaction.atomic():
+            marked = notifications.update(is_read=True)
+            if marked:
+                UserStats.objects.filter(user=request.user).update(
+                    unread_notifications=F('unread_notifications') - marked
+                )
+        return Response({
+            'marked': marked,
+            'unread': _unread_notifications(request.user),
+        })
+
+
 class RegisterView(generics.CreateAPIView):
     """
     Представление для регистрации новых пользователей.
@@ -251,6 +1175,229 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegisterSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
+
+
+class UploadSlotsView(APIView):
+    """
+    Выдает подписанные ссылки для прямой загрузки изображений.
+
+    Байты файлов не проходят через этот запрос: клиент отправляет их
+    PUT-запросом по выданным ссылкам, а затем подтверждает загрузку
+    через PostImagesView.
+
+    POST: Получить ссылки для списка файлов (files: name, size)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """
+        Создает слоты загрузки.
+
+        Args:
+            request: HTTP-запрос
+
+        Returns:
+            Response: uploads — список upload_id, url, method и
+            expires_in (секунды) в порядке файлов запроса
+
+        Raises:
+            Throttled: Если у пользователя слишком много незавершенных
+            загрузок
+        """
+        serializer = UploadSlotsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            tokens = uploads.create_slots(
+                request.user, serializer.validated_data['files']
+            )
+        except uploads.UploadError as e:
+            raise Throttled(detail=str(e))
+        slots = [
+            {
+                'upload_id': token,
+                'url': request.build_absolute_uri(
+                    reverse('upload-put', args=[token])
+                ),
+                'method': 'PUT',
+                'expires_in': settings.UPLOAD_URL_TIMEOUT,
+            }
+            for token in tokens
+        ]
+        return Response({'uploads': slots}, status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+@require_http_methods(['PUT'])
+def upload_put(request, token):
+    """
+    Принимает байты файла по подписанной ссылке.
+
+    Локальная замена объектного хранилища: подпись ссылки заменяет
+    авторизацию, тело запроса пишется во временный файл частями.
+    Под ASGI тело буферизуется сервером до вызова представления,
+    поэтому медленная загрузка не занимает рабочий поток.
+
+    Args:
+        request: HTTP-запрос с содержимым файла
+        token: Токен слота из UploadSlotsView
+
+    Returns:
+        HttpResponse: 204 после записи файла
+    """
+    try:
+        slot = uploads.read_slot(token, settings.UPLOAD_URL_TIMEOUT)
+    except signing.BadSignature:
+        return JsonResponse(
+            {'error': 'Ссылка на загрузку недействительна или устарела'},
+            status=403
+        )
+    try:
+        length = int(request.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {'error': 'Требуется заголовок Content-Length'}, status=411
+        )
+    try:
+        uploads.store(slot, request, length)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return HttpResponse(status=204)
+
+
+class PostImagesView(APIView):
+    """
+    Прикрепляет к посту изображения, загруженные по подписанным ссылкам.
+
+    POST: Подтвердить загрузки (uploads — список upload_id)
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrStaff]
+
+    def _read_slots(self, tokens):
+        """
+        Проверяет токены загрузок текущего пользователя.
+
+        Returns:
+            list: Данные слотов без повторов
+
+        Raises:
+            ValidationError: Если токен поддельный, устарел или выдан
+            другому пользователю
+        """
+        slots = {}
+        for token in tokens:
+            try:
+                slot = uploads.read_slot(
+                    token, settings.UPLOAD_FINALIZE_TIMEOUT
+                )
+            except signing.BadSignature:
+                slot = None
+            if slot is None or slot['user'] != self.request.user.pk:
+                raise ValidationError({
+                    'uploads': 'Ссылка на загрузку недействительна '
+                               'или устарела'
+                })
+            slots[slot['key']] = slot
+        return list(slots.values())
+
+    def post(self, request, pk):
+        """
+        Создает PostImage из загруженных файлов.
+
+        Каждый файл проверяется декодированием (ingest); если хотя бы
+        один не загружен или не является изображением допустимого
+        формата (uploads.ALLOWED_FORMATS), пост не меняется. Число
+        изображений поста проверяется под блокировкой строки поста,
+        а слоты забираются в той же транзакции (uploads.claim_slots).
+
+        Args:
+            request: HTTP-запрос
+            pk: ID поста
+
+        Returns:
+            Response: Пост с новыми изображениями
+
+        Raises:
+            Http404: Если пост не найден
+            PermissionDenied: Если пользователь не автор поста
+            и не сотрудник
+            ValidationError: Если загрузка не подтверждена или у поста
+            стало бы больше uploads.MAX_UPLOAD_FILES изображений
+            Conflict: Если загрузка уже подтверждена другим запросом
+        """
+        post = get_object_or_404(
+            owned_by(Post.objects.all(), request.user, 'author'), pk=pk
+        )
+        self.check_object_permissions(request, post)
+        serializer = FinalizeImagesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        slots = self._read_slots(serializer.validated_data['uploads'])
+
+        with ExitStack() as stack:
+            # Сначала проверяются все файлы: отклоненная загрузка
+            # не оставляет в хранилище файлов остальных
+            images = []
+            for slot in slots:
+                try:
+                    staged = stack.enter_context(
+                        uploads.open_staged(slot['key'])
+                    )
+                except FileNotFoundError:
+                    raise ValidationError({'uploads': 'Файл не загружен'})
+                image = PostImage(
+                    post=post, image=File(staged, name=slot['key'])
+                )
+                try:
+                    image.ingest()
+                except DjangoValidationError as e:
+                    raise ValidationError({'uploads': e.messages})
+                if not image.format:
+                    raise ValidationError({
+                        'uploads': 'Файл не является изображением'
+                    })
+                if image.format not in uploads.ALLOWED_FORMATS:
+                    raise ValidationError({
+                        'uploads': 'Неподдерживаемый формат изображения. '
+                                   'Допустимые форматы: JPG, JPEG, PNG, '
+                                   'GIF, WEBP'
+                    })
+                images.append(image)
+            with transaction.atomic():
+                # Одновременные подтверждения для поста выполняются
+                # по очереди, и каждое видит изображения предыдущих
+                locked = (
+                    Post.objects.select_for_update()
+                    .filter(pk=post.pk)
+                    .values('pk')
+                    .first()
+                )
+                if locked is None:
+                    raise Http404
+                if (
+                    PostImage.objects.filter(post=post).count() + len(images)
+                    > uploads.MAX_UPLOAD_FILES
+                ):
+                    raise ValidationError({
+                        'uploads': 'У поста может быть не более '
+                                   f'{uploads.MAX_UPLOAD_FILES} изображений'
+                    })
+                try:
+                    uploads.claim_slots(
+                        request.user, [slot['key'] for slot in slots]
+                    )
+                except uploads.SlotClaimed as e:
+                    raise Conflict(detail=str(e))
+                for image, slot in zip(images, slots):
+                    image.save()
+                    transaction.on_commit(
+                        partial(uploads.delete_staged, slot['key'])
+                    )
+
+        publish_event('post_updated', post_id=post.pk)
+        return Response(
+            _personalize_post(_load_post(post.pk), request),
+            status=status.HTTP_201_CREATED
+        )
 
 
 class DeleteImageView(APIView):
@@ -259,26 +1406,25 @@ class DeleteImageView(APIView):
 
     POST: Удалить указанное изображение
     """
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrStaff]
 
     def post(self, request, pk):
         """
         Удаляет изображение из поста.
 
+        Изображение и флаг владельца поста загружаются одним запросом.
+
         Args:
             request: HTTP-запрос
             pk: ID поста
 
         Returns:
             Response: Ответ с результатом операции
-        """
-        post = get_object_or_404(Post, id=pk)
-        if post.author != request.user and not request.user.is_staff:
-            return Response(
-                {'error': 'You are not the owner of this post'},
-                status=status.HTTP_403_FORBIDDEN
-            )
 
+        Raises:
+            PermissionDenied: Если пользователь не автор поста
+            и не сотрудник
+        """
         image_name = request.data.get('image_name')
         if not image_name:
             return Response(
@@ -286,39 +1432,53 @@ class DeleteImageView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            image = post.images.get(image__endswith=image_name)
-            try:
-                image.image.delete(save=False)
-                image.delete()
-                return Response(
-                    {'status': 'image deleted'},
-                    status=status.HTTP_200_OK
-                )
-            except Exception as e:
-                return Response(
-                    {'error': f'Error deleting image file: {str(e)}'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-        except PostImage.DoesNotExist:
+        # Имена файлов — хеши содержимого, поэтому полное имя
+        # восстанавливается из URL и ищется по индексу
+        field = PostImage._meta.get_field('image')
+        name = field.storage.locate(field.upload_to, image_name)
+        images = PostImage.objects.filter(post_id=pk)
+        if name:
+            images = images.filter(image=name)
+        else:
+            images = images.filter(image__endswith=image_name)
+
+        image = owned_by(images, request.user, 'post__author').first()
+        if image is None:
             return Response(
                 {'error': 'Image not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        self.check_object_permissions(request, image)
+        try:
+            # Файл удаляется сигналом, когда на него не останется ссылок
+            image.delete()
+            publish_event('post_updated', post_id=pk)
+            return Response(
+                {'status': 'image deleted'},
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Error deleting image file: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
 
-class DeleteCommentView(generics.DestroyAPIView):
+class DeleteCommentView(OwnerScopedMixin, generics.DestroyAPIView):
     """
     Представление для удаления комментария.
 
+    Удалить комментарий может автор поста или сотрудник.
+
     DELETE: Удалить комментарий
     """
-    queryset = Comment.objects.all()
-    permission_classes = [permissions.IsAuthenticated]
+    queryset = Comment.objects.filter(post__deleted_at__isnull=True)
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrStaff]
+    owner_field = 'post__author'
 
     def delete(self, request, *args, **kwargs):
         """
-        Удаляет комментарий, если пользователь является автором поста.
+        Удаляет комментарий.
 
         Args:
             request: HTTP-запрос
@@ -327,15 +1487,17 @@ class DeleteCommentView(generics.DestroyAPIView):
 
         Returns:
             Response: Ответ с результатом операции
+
+        Raises:
+            PermissionDenied: Если пользователь не автор поста
+            и не сотрудник
         """
         comment = self.get_object()
-        post = comment.post
-        if post.author != request.user and not request.user.is_staff:
-            return Response(
-                {'error': 'У вас нет прав на удаление этого комментария'},
-                status=status.HTTP_403_FORBIDDEN
+        if comment.soft_delete():
+            publish_event(
+                'comment_removed', post_id=comment.post_id,
+                comment_id=comment.pk
             )
-        comment.delete()
         return Response(
             {'message': 'Комментарий успешно удален'},
             status=status.HTTP_200_OK
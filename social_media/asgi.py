@@ -3,6 +3,10 @@ ASGI config for social_media project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live feed stream (/api/events/) holds connections open, so it must be
+served through this module by an ASGI server (e.g. uvicorn or daphne).
+Under WSGI the stream answers 204 and the web client polls instead.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,15 @@
+"""
+ASGI config for API-only worker processes.
+
+Same as ``social_media.asgi`` but loads ``social_media.settings_api``,
+which skips the admin, sessions, messages and templates. The live feed
+stream (/api/events/) is served by this module as well.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media.settings_api')
+
+application = get_asgi_application()
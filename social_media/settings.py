@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'posts.middleware.ProfilingMiddleware',
+    'posts.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -88,9 +90,30 @@ DATABASES = {
         'PASSWORD': config('DATABASE_PASSWORD'),
         'HOST': config('DATABASE_HOST', default='localhost'),
         'PORT': config('DATABASE_PORT', default='5432'),
+        # Переиспользование соединения между запросами одного потока
+        # (секунд, 0 — закрывать после каждого запроса, None — бессрочно)
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=60, cast=int),
+        # Проверка соединения перед повторным использованием
+        'CONN_HEALTH_CHECKS': config(
+            'DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool
+        ),
+        'OPTIONS': {},
     }
 }
 
+# Пул соединений psycopg 3 (pip install "psycopg[binary,pool]") вместо
+# постоянных соединений; рекомендуется для ASGI. Пул создается в каждом
+# процессе: max_size — не меньше числа потоков воркера, а число
+# процессов * max_size должно укладываться в max_connections PostgreSQL
+DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+if DATABASE_POOL:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DATABASE_POOL_MAX_SIZE', default=8, cast=int),
+        'timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=int),
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -133,15 +156,115 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'posts/static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Отдавать статику из STATIC_ROOT средствами Django (сжатые копии и
+# долгое кеширование для файлов с хешем в имени)
+SERVE_STATIC = config('SERVE_STATIC', default=DEBUG, cast=bool)
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'posts.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Минимальный размер ответа в байтах, начиная с которого он сжимается
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Передача медиафайлов фронтовому прокси: '' (отдает Django),
+# 'nginx' (X-Accel-Redirect) или 'apache' (X-Sendfile)
+MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='')
+# Внутренний location nginx, указывающий на MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Рассылка событий ленты (SSE, /api/events/)
+EVENTS_BACKEND = config(
+    'EVENTS_BACKEND', default='posts.events.InProcessBroker'
+)
+# Интервал служебных сообщений в потоке событий, секунд
+EVENTS_HEARTBEAT = config('EVENTS_HEARTBEAT', default=15, cast=int)
+
+# Кеш со счетчиками ограничения частоты запросов (см. CACHES). Для
+# нескольких процессов нужен общий кеш, например Redis
+THROTTLE_CACHE = config('THROTTLE_CACHE', default='default')
+
+# Выполнять фоновые задачи сразу после фиксации транзакции, без воркера.
+# Режим для разработки и тестов: задержки задач не соблюдаются,
+# поэтому уведомления пишутся на каждое событие без объединения
+TASKS_EAGER = config('TASKS_EAGER', default=False, cast=bool)
+
+# Уведомления о лайках и комментариях записываются фоновой задачей
+# не чаще раза в NOTIFICATION_WINDOW секунд на пост. Кеш отсекает
+# повторную постановку задачи в окне; общий кеш (Redis) делает это
+# для всех процессов сразу
+NOTIFICATION_WINDOW = config('NOTIFICATION_WINDOW', default=60, cast=int)
+NOTIFICATIONS_CACHE = config('NOTIFICATIONS_CACHE', default='default')
+
+# Записи журнала изменений моложе CHANGES_SAFE_HORIZON секунд
+# /api/changes/ отдает, но не продвигает за них токен: запись
+# с меньшим id может появиться позже, если ее транзакция еще
+# не зафиксирована. Значение должно превышать самую долгую пишущую
+# транзакцию и расхождение часов серверов. На столько же откладывается
+# учет новых лайков и комментариев в уведомлениях
+CHANGES_SAFE_HORIZON = config('CHANGES_SAFE_HORIZON', default=10, cast=int)
+
+# Мягко удаленные посты и комментарии удаляет фоновая задача пачками
+# по PURGE_BATCH_SIZE строк с паузой PURGE_BATCH_PAUSE секунд
+PURGE_BATCH_SIZE = config('PURGE_BATCH_SIZE', default=500, cast=int)
+PURGE_BATCH_PAUSE = config('PURGE_BATCH_PAUSE', default=0.5, cast=float)
+
+# Данные поста и страницы его комментариев кешируются на
+# POST_CACHE_TIMEOUT секунд (0 — без кеша); при промахе их загружает
+# один запрос, остальные ждут до POST_CACHE_LOCK_TIMEOUT секунд или
+# получают прежнюю версию. POST_CACHE_BETA > 1 обновляет записи раньше.
+# Кеш по умолчанию (CACHES не задан) — память процесса: изменение поста
+# сбрасывает записи только в процессе, который его выполнил, остальные
+# отдавали бы старые данные. Поэтому кеш выключен, пока POST_CACHE
+# не указывает на общий кеш (Redis)
+POST_CACHE = config('POST_CACHE', default='default')
+POST_CACHE_TIMEOUT = config('POST_CACHE_TIMEOUT', default=0, cast=int)
+POST_CACHE_LOCK_TIMEOUT = config(
+    'POST_CACHE_LOCK_TIMEOUT', default=5, cast=int
+)
+POST_CACHE_BETA = config('POST_CACHE_BETA', default=1.0, cast=float)
+
+# Прямая загрузка изображений (posts.uploads): ссылка для PUT действует
+# UPLOAD_URL_TIMEOUT секунд, подтвердить загрузку можно в течение
+# UPLOAD_FINALIZE_TIMEOUT секунд, после чего временный файл удаляется
+UPLOAD_STAGING_DIR = config(
+    'UPLOAD_STAGING_DIR', default=str(BASE_DIR / 'uploads')
+)
+UPLOAD_URL_TIMEOUT = config('UPLOAD_URL_TIMEOUT', default=900, cast=int)
+UPLOAD_FINALIZE_TIMEOUT = config(
+    'UPLOAD_FINALIZE_TIMEOUT', default=3600, cast=int
+)
+
+# Профилирование запросов (posts.profiling): сотрудник включает его
+# заголовком X-Profile: 1 или параметром ?profile=1; кроме того,
+# профилируется один запрос из PROFILE_SAMPLE_RATE (0 — выключено).
+# PROFILER: cprofile или pyinstrument (если установлен)
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0, cast=int)
+PROFILER = config('PROFILER', default='cprofile')
+
+# Начиная с этого числа строк списки без фильтров (лента, админка)
+# показывают приблизительное количество из статистики PostgreSQL или кеша
+COUNT_ESTIMATE_THRESHOLD = config(
+    'COUNT_ESTIMATE_THRESHOLD', default=100000, cast=int
+)
+# Время жизни закешированного количества строк, секунд
+COUNT_CACHE_TIMEOUT = config('COUNT_CACHE_TIMEOUT', default=60, cast=int)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:8000',
@@ -156,7 +279,27 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'posts.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'posts.throttling.ReadThrottle',
+        'posts.throttling.WriteThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'read': config('THROTTLE_READ_RATE', default='600/min'),
+        'write': config('THROTTLE_WRITE_RATE', default='60/min'),
+        'like': config('THROTTLE_LIKE_RATE', default='30/min'),
+        'comment': config('THROTTLE_COMMENT_RATE', default='10/min'),
+        'register': config('THROTTLE_REGISTER_RATE', default='5/hour'),
+    },
+    # Число доверенных прокси перед приложением: адрес клиента для
+    # ограничения частоты берется из X-Forwarded-For с учетом только
+    # их записей. При 0 заголовок, который клиент может подделать,
+    # не читается, используется REMOTE_ADDR
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
     'DEFAULT_PAGINATION_CLASS':
-        'rest_framework.pagination.PageNumberPagination',
+        'posts.pagination.EstimatedPageNumberPagination',
     'PAGE_SIZE': 10,
 }
@@ -0,0 +1,47 @@
+"""
+Settings for API-only worker processes.
+
+Extends ``social_media.settings`` and drops everything that /api/ does
+not use: the admin, sessions, messages, static files, the template
+engine and the browsable API. Authentication is JWT only, so the
+session, CSRF, authentication and message middleware are removed too.
+
+Serve it with ``social_media.wsgi_api`` or ``social_media.asgi_api``;
+the admin and the index page stay on workers running the full settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS
+    if app not in (
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    )
+]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in (
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+    )
+]
+
+ROOT_URLCONF = 'social_media.urls_api'
+
+TEMPLATES = []
+
+WSGI_APPLICATION = 'social_media.wsgi_api.application'
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': (
+        'posts.renderers.FastJSONRenderer',
+    ),
+}
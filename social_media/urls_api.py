@@ -0,0 +1,34 @@
+"""
+URL configuration for API-only worker processes (settings_api).
+
+Only /api/, the JWT token endpoints and media files are routed here.
+"""
+import re
+
+from django.urls import path, include, re_path
+from django.conf import settings
+from posts.urls import api_urlpatterns
+from posts.views import serve_media
+from rest_framework_simplejwt.views import (
+    TokenObtainPairView,
+    TokenRefreshView,
+)
+
+
+urlpatterns = [
+    path('api/', include(api_urlpatterns)),
+    path(
+        'api/token/',
+        TokenObtainPairView.as_view(),
+        name='token_obtain_pair'
+    ),
+    path(
+        'api/token/refresh/',
+        TokenRefreshView.as_view(),
+        name='token_refresh'
+    ),
+    re_path(
+        r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        serve_media
+    ),
+]
@@ -0,0 +1,14 @@
+"""
+WSGI config for API-only worker processes.
+
+Same as ``social_media.wsgi`` but loads ``social_media.settings_api``,
+which skips the admin, sessions, messages and templates.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media.settings_api')
+
+application = get_wsgi_application()